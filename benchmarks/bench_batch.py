@@ -0,0 +1,72 @@
+"""
+Benchmark of the batched flow solves in flow.batch against one
+flow.fd_solver.solve_flow_2d call per sample, on an ensemble of random
+binary permeability fields of one grid size.
+
+Run from the repository root:
+
+    python benchmarks/bench_batch.py
+"""
+
+import time
+import numpy as np
+from scipy import ndimage
+
+from flow.batch import fd_system_template, fill_fd_system, solve_flow_batch
+from flow.fd_solver import assemble_fd_system, solve_flow_2d
+
+
+def make_ensemble(num_samples, n, k_min=1E-12, k_max=1E-2):
+    """
+    Random n x n fields of 65% pores (k_max) and soil matrix (k_min), one seed
+    per sample
+    """
+    coeffs = []
+    for seed in range(num_samples):
+        rng = np.random.default_rng(seed)
+        field = ndimage.uniform_filter(rng.random((n, n)), size=5)
+        coeffs.append(
+            np.where(field > np.quantile(field, 0.35), k_max, k_min))
+    return coeffs
+
+
+def bench_batch(num_samples=32, sizes=(100, 200, 400), workers=(1, None)):
+    """
+    Time the assembly of all systems against the template fill, and the
+    per-sample loop against the batched solves (serial and with one worker per
+    CPU) for each grid size
+    """
+    print('%6s %8s %12s %12s %12s %12s %12s' %
+          ('n', 'samples', 'assembly', 'fill', 'loop', 'batch', 'batch pool'))
+    for n in sizes:
+        coeffs = make_ensemble(num_samples, n)
+        dx = dy = 1 / (n - 1)
+
+        start = time.perf_counter()
+        for coeff in coeffs:
+            assemble_fd_system(coeff, dx, dy, 2.0, 1.0)
+        t_assembly = time.perf_counter() - start
+
+        start = time.perf_counter()
+        template = fd_system_template(coeffs[0].shape, dx, dy, 2.0, 1.0)
+        for coeff in coeffs:
+            fill_fd_system(template, coeff)
+        t_fill = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for coeff in coeffs:
+            solve_flow_2d(coeff, dx, dy, 2.0, 1.0)
+        t_loop = time.perf_counter() - start
+
+        times = []
+        for num_workers in workers:
+            start = time.perf_counter()
+            solve_flow_batch(coeffs, dx, dy, 2.0, 1.0, workers=num_workers)
+            times.append(time.perf_counter() - start)
+
+        print('%6d %8d %10.3f s %10.3f s %10.2f s %10.2f s %10.2f s' %
+              (n, num_samples, t_assembly, t_fill, t_loop, times[0], times[1]))
+
+
+if __name__ == "__main__":
+    bench_batch()
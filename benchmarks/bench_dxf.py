@@ -0,0 +1,59 @@
+"""
+Benchmark of the DXF writers in pore2chip.export: network2dxf (ezdxf document,
+one circle and hatch per circle) against network2dxf_bulk (arrays streamed to
+an R12 file).
+
+Run from the repository root:
+
+    python benchmarks/bench_dxf.py
+"""
+
+import os
+import tempfile
+import time
+import numpy as np
+
+from pore2chip.generate import generate_network
+from pore2chip.export import network2dxf, network2dxf_bulk
+
+
+def make_network(n):
+    """
+    Generate an n x n network with fixed random properties
+    """
+    rng = np.random.default_rng(0)
+    pore_diameters = rng.normal(20, 5, 500)
+    throat_diameters = rng.normal(8, 2, 500)
+    coordination_nums = np.array([2, 3, 3, 4, 4, 5, 6])
+    return generate_network(n, n, pore_diameters, throat_diameters,
+                            coordination_nums, None, None, None, 5, 40, 3, 15,
+                            sd=0)
+
+
+def bench_dxf(sizes=(10, 20, 40, 60)):
+    """
+    Time both DXF writers (build and save) for each network size
+    """
+    print('%6s %8s %14s %14s %8s' %
+          ('n', 'pores', 'network2dxf', 'bulk', 'speedup'))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n in sizes:
+            network = make_network(n)
+
+            np.random.seed(0)
+            start = time.perf_counter()
+            network2dxf(network).saveas(os.path.join(tmp_dir, 'doc.dxf'))
+            t_doc = time.perf_counter() - start
+
+            np.random.seed(0)
+            start = time.perf_counter()
+            network2dxf_bulk(network, os.path.join(tmp_dir, 'bulk.dxf'))
+            t_bulk = time.perf_counter() - start
+
+            print('%6d %8d %12.2f s %12.2f s %7.1fx' %
+                  (n, len(network['pore.coords']), t_doc, t_bulk,
+                   t_doc / t_bulk))
+
+
+if __name__ == "__main__":
+    bench_dxf()
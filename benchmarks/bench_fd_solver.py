@@ -0,0 +1,101 @@
+"""
+Benchmark of the finite-difference Darcy solver in flow.fd_solver against the
+loop assembly of example 6 (one lil_matrix entry at a time), on random binary
+permeability fields.
+
+Run from the repository root:
+
+    python benchmarks/bench_fd_solver.py
+"""
+
+import time
+import numpy as np
+from scipy import ndimage
+from scipy.sparse import lil_matrix
+
+from flow.fd_solver import assemble_fd_system, solve_flow_2d
+
+
+def make_coeff(n, k_min=1E-25, k_max=1E-2, rho=998, mu=1.002E-6):
+    """
+    Random n x n field of 65% pores (k_max) and soil matrix (k_min), returned as
+    k * rho / mu like in example 6
+    """
+    rng = np.random.default_rng(0)
+    field = ndimage.uniform_filter(rng.random((n, n)), size=5)
+    perm_field = np.where(field > np.quantile(field, 0.35), k_max, k_min)
+    return perm_field * rho / mu
+
+
+def notebook_assembly(coeff, dx, dy, dP_dy1=0, dP_dy2=0):
+    """
+    Pressure system assembly of example 6
+    """
+    ny, nx = coeff.shape
+    a = 1 / dx**2
+    b1 = 1 / dy**2
+    c = -2 * (a + b1)
+    A = lil_matrix((nx * ny, nx * ny))
+    b = np.zeros(nx * ny)
+    for k in range(nx * ny):
+        i = k // ny
+        j = k % ny
+        if i == 0:
+            A[k, k] = -1 / dy
+            A[k, k + ny] = 1 / dy
+            b[k] = dP_dy1
+        elif i == nx - 1:
+            A[k, k] = 1 / dy
+            A[k, k - ny] = -1 / dy
+            b[k] = dP_dy2
+        elif j == 0:
+            A[k, k] = 1
+            b[k] = 2
+        elif j == ny - 1:
+            A[k, k] = 1
+            b[k] = 1
+        else:
+            A[k, k - ny] = coeff[i, j] * a
+            A[k, k - 1] = coeff[i, j] * b1
+            A[k, k] = coeff[i, j] * c
+            A[k, k + 1] = coeff[i, j] * b1
+            A[k, k + ny] = coeff[i, j] * a
+    return A.tocsr(), b
+
+
+def bench_fd_solver(sizes=(50, 100, 200, 400, 1000)):
+    """
+    Time both assemblies for each grid size, and the full vectorised solve
+    with and without the elimination of solid nodes. The notebook loop is skipped above 400 x 400.
+    """
+    print('%6s %14s %14s %8s %14s %14s' %
+          ('n', 'loop', 'vectorised', 'speedup', 'solve', 'solve (pores)'))
+    for n in sizes:
+        coeff = make_coeff(n)
+        dx = dy = 1 / (n - 1)
+
+        start = time.perf_counter()
+        assemble_fd_system(coeff, dx, dy, 2.0, 1.0)
+        t_vec = time.perf_counter() - start
+
+        start = time.perf_counter()
+        solve_flow_2d(coeff, dx, dy, 2.0, 1.0)
+        t_solve = time.perf_counter() - start
+
+        start = time.perf_counter()
+        solve_flow_2d(coeff, dx, dy, 2.0, 1.0, eliminate_solids=True)
+        t_pores = time.perf_counter() - start
+
+        if n <= 400:
+            start = time.perf_counter()
+            notebook_assembly(coeff, dx, dy)
+            t_loop = time.perf_counter() - start
+            print('%6d %12.3f s %12.3f s %7.0fx %12.3f s %12.3f s' %
+                  (n, t_loop, t_vec, t_loop / t_vec, t_solve, t_pores))
+        else:
+            print('%6d %14s %12.3f s %8s %12.3f s %12.3f s' %
+                  (n, '-', t_vec, '-', t_solve, t_pores))
+
+
+if __name__ == "__main__":
+    bench_fd_solver()
@@ -0,0 +1,53 @@
+"""
+Benchmark of the pore-network flow solver in flow.network_flow against the
+pixel-level workflow of example 6 (rasterise the network with
+export.network2array, then solve with flow.fd_solver), on generated networks.
+
+Run from the repository root:
+
+    python benchmarks/bench_network_flow.py
+"""
+
+import time
+import numpy as np
+
+from pore2chip.export import network2array
+from flow.fd_solver import solve_flow_2d
+from flow.network_flow import solve_network_flow
+
+from bench_dxf import make_network
+
+# Image pixels per pore
+PIXELS = 20
+
+
+def bench_network_flow(sizes=(10, 20, 40)):
+    """
+    Time the network solve and the rasterise-and-solve workflow (with solid
+    nodes eliminated) for each network size
+    """
+    print('%6s %8s %14s %14s %14s %10s' %
+          ('n', 'pores', 'network', 'rasterise', 'fd solve', 'speedup'))
+    for n in sizes:
+        network = make_network(n)
+
+        start = time.perf_counter()
+        solve_network_flow(network, spacing=PIXELS)
+        t_network = time.perf_counter() - start
+
+        start = time.perf_counter()
+        image = network2array(network, n, n, n * PIXELS, n * PIXELS, rng=0)
+        t_raster = time.perf_counter() - start
+
+        coeff = np.where(image == 0, 1.0, 1E-25)
+        start = time.perf_counter()
+        solve_flow_2d(coeff, 1.0, 1.0, 1.0, 0.0, eliminate_solids=True)
+        t_fd = time.perf_counter() - start
+
+        print('%6d %8d %12.4f s %12.3f s %12.3f s %9.0fx' %
+              (n, len(network['pore.coords']), t_network, t_raster, t_fd,
+               (t_raster + t_fd) / t_network))
+
+
+if __name__ == "__main__":
+    bench_network_flow()
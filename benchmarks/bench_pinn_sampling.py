@@ -0,0 +1,68 @@
+"""
+Benchmark of mini-batch collocation sampling in flow.pinn_utilities.train_PINN
+against full-batch training on larger micromodels: time per epoch, and the
+full-batch loss reached after the same number of epochs.
+
+Run from the repository root:
+
+    python benchmarks/bench_pinn_sampling.py
+"""
+
+import tempfile
+import time
+import numpy as np
+import optax
+
+from flow.pinn_utilities import (generate_BCs_and_colloc_xct, init_params,
+                                 interior_coeff, loss_fun, train_PINN)
+
+from bench_fd_solver import make_coeff
+
+
+def bench_pinn_sampling(sizes=(200, 400),
+                        epochs=500,
+                        batch_size=4096,
+                        layers=(2, 20, 20, 20, 1)):
+    """
+    Time full-batch, uniform mini-batch and residual-based mini-batch training
+    for each grid size (including compilation), and evaluate the full-batch
+    loss of the best parameters
+    """
+    print('%6s %10s %12s %12s %12s' %
+          ('n', 'sampling', 'points', 'time', 'full loss'))
+    for n in sizes:
+        x = np.linspace(0, 1, n)
+        xx, yy = np.meshgrid(x, x)
+        *_, conds, colloc = generate_BCs_and_colloc_xct(
+            xx, yy, 1.0, 0.0, 0.0, 0.0)
+        coeff = make_coeff(n, k_min=1E-12)
+        norm_coeff = coeff / coeff.max()
+        params = init_params(list(layers))
+
+        runs = [('full', None, 'uniform'), ('uniform', batch_size, 'uniform'),
+                ('residual', batch_size, 'residual')]
+        for name, size, sampling in runs:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                start = time.perf_counter()
+                best_params, *_ = train_PINN(params,
+                                             epochs,
+                                             optax.adam(1E-3),
+                                             loss_fun,
+                                             colloc,
+                                             conds,
+                                             norm_coeff,
+                                             len(layers) - 2,
+                                             layers[1],
+                                             1E-3,
+                                             tmp_dir + '/',
+                                             batch_size=size,
+                                             sampling=sampling)
+                elapsed = time.perf_counter() - start
+            full_loss = loss_fun(best_params, colloc, conds,
+                                 interior_coeff(norm_coeff))
+            print('%6d %10s %12d %10.2f s %12.3e' %
+                  (n, name, size or len(colloc), elapsed, full_loss))
+
+
+if __name__ == "__main__":
+    bench_pinn_sampling()
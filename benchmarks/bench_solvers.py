@@ -0,0 +1,54 @@
+"""
+Benchmark of the linear solver backends in flow.solvers on the pressure
+systems of flow.fd_solver, to pick the fastest backend per problem size.
+
+Run from the repository root:
+
+    python benchmarks/bench_solvers.py
+"""
+
+from flow.fd_solver import assemble_fd_system
+from flow.solvers import solve_linear_system
+
+from bench_fd_solver import make_coeff
+
+BACKENDS = [('direct', None), ('pardiso', None), ('cg', 'jacobi'),
+            ('cg', 'ilu'), ('cg', 'amg'), ('bicgstab', 'amg')]
+
+
+def bench_solvers(sizes=(100, 200, 400, 1000), k_min=1E-12, maxiter=1000):
+    """
+    Time every backend (preconditioner setup and solve) for each grid size.
+    Example 6 uses k_min = 1E-25, which makes the system singular in double
+    precision; pass it to see the Krylov solvers fall back to direct solves.
+    """
+    print('%6s %10s %8s %6s %10s %10s %10s %9s' %
+          ('n', 'solver', 'precond', 'iters', 'setup', 'solve', 'total',
+           'residual'))
+    for n in sizes:
+        coeff = make_coeff(n, k_min=k_min)
+        A, b, _, _ = assemble_fd_system(coeff, 1 / (n - 1), 1 / (n - 1), 2.0,
+                                        1.0)
+        times = {}
+        for solver, preconditioner in BACKENDS:
+            _, info = solve_linear_system(A,
+                                          b,
+                                          solver=solver,
+                                          preconditioner=preconditioner,
+                                          maxiter=maxiter)
+            total = info['setup_time'] + info['solve_time']
+            name = solver if preconditioner is None else '%s+%s' % (
+                solver, preconditioner)
+            if info['fallback']:
+                name += ' (fallback: %s)' % info['solver']
+            times[name] = total
+            print('%6d %10s %8s %6d %8.3f s %8.3f s %8.3f s %9.1e%s' %
+                  (n, solver, preconditioner, info['iterations'],
+                   info['setup_time'], info['solve_time'], total,
+                   info['residual'],
+                   '  fallback' if info['fallback'] else ''))
+        print('%6d fastest: %s' % (n, min(times, key=times.get)))
+
+
+if __name__ == "__main__":
+    bench_solvers()
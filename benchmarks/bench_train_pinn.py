@@ -0,0 +1,80 @@
+"""
+Benchmark of the PINN training engine in flow.pinn_utilities.train_PINN
+(value_and_grad steps in chunks of jax.lax.scan) against the previous
+per-epoch Python loop (a jitted update, a second loss evaluation and a host
+sync every epoch), on a small micromodel.
+
+Run from the repository root:
+
+    python benchmarks/bench_train_pinn.py
+"""
+
+import tempfile
+import time
+import numpy as np
+import jax
+import optax
+
+from flow.pinn_utilities import (generate_BCs_and_colloc_xct, init_params,
+                                 interior_coeff, loss_fun, train_PINN)
+
+from bench_fd_solver import make_coeff
+
+
+def loop_training(params, epochs, optimizer, colloc, conds, norm_coeff):
+    """
+    Training loop of the previous train_PINN
+    """
+
+    @jax.jit
+    def update(opt_state, params, colloc, conds, norm_coeff):
+        grads = jax.grad(loss_fun, argnums=0)(params, colloc, conds,
+                                              norm_coeff)
+        updates, opt_state = optimizer.update(grads, opt_state, params)
+        return opt_state, optax.apply_updates(params, updates)
+
+    opt_state = optimizer.init(params)
+    best_params, best_loss, all_losses = params, float('inf'), []
+    for epoch in range(epochs + 1):
+        opt_state, params = update(opt_state, params, colloc, conds,
+                                   norm_coeff)
+        current_loss = loss_fun(params, colloc, conds, norm_coeff)
+        all_losses.append(current_loss)
+        if current_loss < best_loss:
+            best_loss, best_params = current_loss, params
+    return best_params, best_loss, all_losses
+
+
+def bench_train_pinn(sizes=(20, 50), epochs=5000, layers=(2, 20, 20, 20, 1)):
+    """
+    Time both training loops (including compilation) for each grid size
+    """
+    print('%6s %8s %12s %12s %10s' % ('n', 'epochs', 'loop', 'scan',
+                                      'speedup'))
+    for n in sizes:
+        x = np.linspace(0, 1, n)
+        xx, yy = np.meshgrid(x, x)
+        *_, conds, colloc = generate_BCs_and_colloc_xct(
+            xx, yy, 1.0, 0.0, 0.0, 0.0)
+        coeff = make_coeff(n, k_min=1E-12)
+        norm_coeff = interior_coeff(coeff / coeff.max())
+        params = init_params(list(layers))
+
+        start = time.perf_counter()
+        loop_training(params, epochs, optax.adam(1E-3), colloc, conds,
+                      norm_coeff)
+        t_loop = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            start = time.perf_counter()
+            train_PINN(params, epochs, optax.adam(1E-3), loss_fun, colloc,
+                       conds, norm_coeff, len(layers) - 2, layers[1], 1E-3,
+                       tmp_dir + '/')
+            t_scan = time.perf_counter() - start
+
+        print('%6d %8d %10.2f s %10.2f s %9.1fx' %
+              (n, epochs, t_loop, t_scan, t_loop / t_scan))
+
+
+if __name__ == "__main__":
+    bench_train_pinn()
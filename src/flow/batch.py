@@ -0,0 +1,277 @@
+"""
+Batched finite-difference flow solves for ensembles of micromodels. All
+samples of one grid size share the sparsity pattern, the boundary masks and
+the mapping from face transmissibilities to matrix entries, so these are
+computed once per grid size (and per worker process) and only the values
+are refilled for every sample.
+"""
+
+# Samples are solved in a process pool like the tiles of `export.network2tiles`.
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import scipy.sparse as sp
+
+from flow.fd_solver import (assemble_fd_system, face_fluxes,
+                            face_transmissibilities, harmonic_mean,
+                            solve_flow_2d)
+from flow.postprocess import column_fluxes, upscaled_permeability
+from flow.solvers import solve_linear_system
+
+# Templates built in this process, by grid size and boundary conditions
+_TEMPLATES = {}
+
+
+def fd_system_template(shape, dx, dy, P1, P2, dP_dy1=0, dP_dy2=0):
+    """
+    Precomputes everything of the `fd_solver.assemble_fd_system` system that
+    does not depend on the coefficient values: the CSR sparsity pattern, the
+    boundary masks, and sparse maps from the face transmissibilities and the
+    boundary row coefficients to the matrix entries and the load vector.
+
+    Args:
+        shape (tuple): Grid shape (ny, nx).
+        dx (float): Node spacing along x.
+        dy (float): Node spacing along y.
+        P1 (float): Pressure at the left boundary (x = 0).
+        P2 (float): Pressure at the right boundary (x = 1).
+        dP_dy1 (float): Derivative of pressure with respect to y at the bottom boundary (y = 0).
+        dP_dy2 (float): Derivative of pressure with respect to y at the top boundary (y = 1).
+
+    Returns:
+        dict: Dictionary with keys 'shape', 'indices' and 'indptr' (CSR pattern),
+            'matrix_map' (transmissibilities to matrix entries), 'load_map' (transmissibilities
+            to load vector), 'neumann_map' (bottom and top row coefficients to load vector),
+            'unknown' and 'dirichlet' (see `fd_solver.assemble_fd_system`).
+    """
+    ny, nx = shape
+
+    # Unit transmissibilities give the structure; every face is its own entry
+    t_x, t_y = face_transmissibilities(np.ones(shape), dx, dy)
+    _, _, unknown, dirichlet = assemble_fd_system(np.ones(shape), dx, dy, P1,
+                                                  P2)
+    number = np.full(ny * nx, -1)
+    number[unknown.ravel()] = np.arange(np.count_nonzero(unknown))
+    num_unknowns = np.count_nonzero(unknown)
+
+    # Faces in the order of `face_transmissibilities` (x faces, then y faces)
+    node = np.arange(ny * nx).reshape(ny, nx)
+    first = np.concatenate([node[:, :-1].ravel(), node[:-1, :].ravel()])
+    second = np.concatenate([node[:, 1:].ravel(), node[1:, :].ravel()])
+    scale = np.concatenate([t_x.ravel(), t_y.ravel()])
+    face = np.arange(len(first))
+    p = number[first]
+    q = number[second]
+
+    # Contributions (row, column, face, factor) to the matrix entries
+    p_unknown = p >= 0
+    q_unknown = q >= 0
+    both = p_unknown & q_unknown
+    rows = np.concatenate([p[p_unknown], q[q_unknown], p[both], q[both]])
+    cols = np.concatenate([p[p_unknown], q[q_unknown], q[both], p[both]])
+    faces = np.concatenate(
+        [face[p_unknown], face[q_unknown], face[both], face[both]])
+    factors = np.concatenate([
+        scale[p_unknown], scale[q_unknown], -scale[both], -scale[both]
+    ])
+
+    # CSR positions of the (summed) entries, in row-major order
+    keys, position = np.unique(rows * num_unknowns + cols, return_inverse=True)
+    indptr = np.searchsorted(keys // num_unknowns, np.arange(num_unknowns + 1))
+    matrix_map = sp.csr_matrix((factors, (position, faces)),
+                               shape=(len(keys), len(first)))
+
+    # Known pressures of Dirichlet neighbors
+    fixed = dirichlet.ravel()
+    to_fixed = p_unknown & ~q_unknown
+    from_fixed = ~p_unknown & q_unknown
+    load_map = sp.csr_matrix(
+        (np.concatenate([
+            scale[to_fixed] * fixed[second[to_fixed]],
+            scale[from_fixed] * fixed[first[from_fixed]]
+        ]), (np.concatenate([p[to_fixed], q[from_fixed]]),
+             np.concatenate([face[to_fixed], face[from_fixed]]))),
+        shape=(num_unknowns, len(first)))
+
+    # Neumann fluxes of the bottom and top rows (see `assemble_fd_system`)
+    length = np.full(nx, dx)
+    length[[0, -1]] = 0.5 * dx
+    bottom = number[node[0, :]]
+    top = number[node[-1, :]]
+    neumann_map = sp.csr_matrix(
+        (np.concatenate([
+            -dP_dy1 * length[bottom >= 0], dP_dy2 * length[top >= 0]
+        ]), (np.concatenate([bottom[bottom >= 0], top[top >= 0]]),
+             np.concatenate([np.flatnonzero(bottom >= 0),
+                             nx + np.flatnonzero(top >= 0)]))),
+        shape=(num_unknowns, 2 * nx))
+
+    return {
+        'shape': tuple(shape),
+        'indices': (keys % num_unknowns).astype(np.int32),
+        'indptr': indptr.astype(np.int32),
+        'matrix_map': matrix_map,
+        'load_map': load_map,
+        'neumann_map': neumann_map,
+        'unknown': unknown,
+        'dirichlet': dirichlet
+    }
+
+
+def fill_fd_system(template, coeff):
+    """
+    Fills the pressure system of a template with the values of one
+    coefficient field. The result is the same as `fd_solver.assemble_fd_system`.
+
+    Args:
+        template (dict): Template returned by `fd_system_template`.
+        coeff (np.ndarray): A 2D array of flow coefficients (k * rho / mu) of the template's shape.
+
+    Returns:
+        tuple: Contains the sparse system.
+            - A: scipy.sparse.csr_matrix of the pressure system.
+            - b: The load vector.
+    """
+    coeff = np.asarray(coeff, dtype=float)
+    if coeff.shape != template['shape']:
+        raise ValueError("coeff has shape %s, the template %s" %
+                         (coeff.shape, template['shape']))
+
+    # Harmonic face means (the face lengths and spacings are in the maps)
+    trans = np.concatenate([
+        harmonic_mean(coeff[:, :-1], coeff[:, 1:]).ravel(),
+        harmonic_mean(coeff[:-1, :], coeff[1:, :]).ravel()
+    ])
+
+    num_unknowns = len(template['indptr']) - 1
+    A = sp.csr_matrix((template['matrix_map'] @ trans, template['indices'],
+                       template['indptr']),
+                      shape=(num_unknowns, num_unknowns))
+    b = template['load_map'] @ trans + template['neumann_map'] @ np.concatenate(
+        [coeff[0, :], coeff[-1, :]])
+    return A, b
+
+
+def _solve_sample(task):
+    """
+    Helper function for solve_flow_batch(). Solves one sample with the
+    template of its grid size (built once per process) and computes its
+    flow metrics.
+    """
+    (index, coeff, dx, dy, P1, P2, dP_dy1, dP_dy2, rho, mu, solver,
+     preconditioner, tol, eliminate_solids) = task
+    coeff = np.asarray(coeff, dtype=float)
+
+    start = time.perf_counter()
+    if eliminate_solids:
+        # The spanning pore space, and so the structure, differs per sample
+        pressure, _, _, info = solve_flow_2d(coeff,
+                                             dx,
+                                             dy,
+                                             P1,
+                                             P2,
+                                             dP_dy1,
+                                             dP_dy2,
+                                             solver=solver,
+                                             preconditioner=preconditioner,
+                                             tol=tol,
+                                             eliminate_solids=True,
+                                             return_info=True)
+    else:
+        key = (coeff.shape, dx, dy, P1, P2, dP_dy1, dP_dy2)
+        if key not in _TEMPLATES:
+            _TEMPLATES[key] = fd_system_template(*key)
+        template = _TEMPLATES[key]
+        A, b = fill_fd_system(template, coeff)
+        solution, info = solve_linear_system(A,
+                                             b,
+                                             solver=solver,
+                                             preconditioner=preconditioner,
+                                             tol=tol)
+        pressure = template['dirichlet'].copy()
+        pressure[template['unknown']] = solution
+    solve_time = time.perf_counter() - start
+
+    q_x, _ = face_fluxes(pressure, coeff, dx, dy)
+    return {
+        'sample': index,
+        'permeability': upscaled_permeability(pressure, coeff, dx, dy, rho,
+                                              mu),
+        'outlet_flux': column_fluxes(q_x, dy)[-1],
+        'solve_time': solve_time,
+        'iterations': info['iterations'],
+        'converged': info['converged'],
+        'solver': info['solver']
+    }
+
+
+def solve_flow_batch(coeffs,
+                     dx,
+                     dy,
+                     P1,
+                     P2,
+                     dP_dy1=0,
+                     dP_dy2=0,
+                     rho=1.0,
+                     mu=1.0,
+                     solver='direct',
+                     preconditioner=None,
+                     tol=1e-10,
+                     eliminate_solids=False,
+                     workers=None):
+    """
+    Solves 2D steady-state Darcy flow (see `fd_solver.solve_flow_2d`) for
+    every coefficient field of an ensemble in a process pool, and collects
+    the flow metrics of every sample in a table. The system structure is
+    built once per grid size in every worker, unless `eliminate_solids` is
+    True (the spanning pore space differs between samples).
+
+    Args:
+        coeffs (list): 2D arrays of flow coefficients (k * rho / mu), one per sample. Samples may
+            have different shapes but share the node spacing.
+        dx (float): Node spacing along x.
+        dy (float): Node spacing along y.
+        P1 (float): Pressure at the left boundary (x = 0).
+        P2 (float): Pressure at the right boundary (x = 1).
+        dP_dy1 (float): Derivative of pressure with respect to y at the bottom boundary (y = 0).
+        dP_dy2 (float): Derivative of pressure with respect to y at the top boundary (y = 1).
+        rho (float): Density of the fluid used in `coeffs`. Default is 1.0.
+        mu (float): Dynamic viscosity of the fluid used in `coeffs`. Default is 1.0.
+        solver (str): Linear solver backend (see `solvers.solve_linear_system`). Default is 'direct'.
+        preconditioner (str): Preconditioner of the Krylov solvers. Default is None.
+        tol (float): Relative residual norm at which the Krylov solvers stop. Default is 1e-10.
+        eliminate_solids (boolean): If True, solves only the spanning pore space of every sample.
+            Default is False.
+        workers (int): Number of worker processes. Default is None (one per CPU).
+
+    Returns:
+        dict: Results table with one array per column and one row per sample, in input order:
+            'sample', 'permeability' (see `postprocess.upscaled_permeability`), 'outlet_flux',
+            'solve_time' (seconds, including the system fill and, for the first sample of a grid
+            size in a worker, the template), 'iterations', 'converged' and
+            'solver'. It can be passed directly to `pandas.DataFrame`.
+    """
+    tasks = [(index, coeff, dx, dy, P1, P2, dP_dy1, dP_dy2, rho, mu, solver,
+              preconditioner, tol, eliminate_solids)
+             for index, coeff in enumerate(coeffs)]
+
+    if workers is None:
+        workers = os.cpu_count()
+    if workers > 1:
+        # Spawn the workers, forking after JAX has started threads can deadlock
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')) as executor:
+            rows = list(executor.map(_solve_sample, tasks))
+    else:
+        rows = [_solve_sample(task) for task in tasks]
+
+    columns = [
+        'sample', 'permeability', 'outlet_flux', 'solve_time', 'iterations',
+        'converged', 'solver'
+    ]
+    return {
+        column: np.array([row[column] for row in rows]) for column in columns
+    }
@@ -0,0 +1,299 @@
+"""
+Finite-difference solver for 2D steady-state Darcy flow on heterogeneous
+permeability fields (for example the XCT based fields of example 6).
+
+∂/∂x(coeff * ∂P/∂x) + ∂/∂y(coeff * ∂P/∂y) = 0
+
+Arrays are indexed [i, j] with i along y (rows, bottom to top) and j along x
+(columns, left to right), the same as ``np.meshgrid(x, y)``. Pressure is fixed
+on the left (x = 0) and right (x = 1) columns and ∂P/∂y is fixed on the bottom
+(y = 0) and top (y = 1) rows. The corner nodes belong to the Dirichlet columns.
+
+With `eliminate_solids`, only the pore space connected to both Dirichlet
+columns is solved; the other nodes get NaN pressures and no flux.
+"""
+
+# `scipy.sparse` is used to assemble the pressure system, `flow.solvers` to solve it.
+import numpy as np
+import scipy.sparse as sp
+from scipy import ndimage
+
+from flow.solvers import solve_linear_system
+
+
+def harmonic_mean(a, b):
+    """
+    Computes the element-wise harmonic mean of two arrays, 2ab / (a + b), with
+    a mean of 0 where both values are 0.
+
+    Args:
+        a (np.ndarray): First array.
+        b (np.ndarray): Second array (same shape as `a`).
+
+    Returns:
+        np.ndarray: The harmonic mean of `a` and `b`.
+    """
+    total = a + b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(total > 0, 2 * a * b / total, 0.0)
+    return mean
+
+
+def face_transmissibilities(coeff, dx, dy):
+    """
+    Computes the transmissibilities of all faces between neighboring nodes.
+    The coefficient on a face is the harmonic mean of the two nodes' `coeff`,
+    multiplied by the face length over the node distance. Nodes on the bottom
+    and top rows only own half a cell, so their x faces are half as long.
+
+    Args:
+        coeff (np.ndarray): A 2D array of flow coefficients (k * rho / mu) at the nodes.
+        dx (float): Node spacing along x.
+        dy (float): Node spacing along y.
+
+    Returns:
+        tuple: Contains the transmissibilities of the x faces and y faces.
+            - t_x: Array of shape (ny, nx - 1), face between nodes [i, j] and [i, j + 1].
+            - t_y: Array of shape (ny - 1, nx), face between nodes [i, j] and [i + 1, j].
+    """
+    coeff = np.asarray(coeff, dtype=float)
+
+    t_x = harmonic_mean(coeff[:, :-1], coeff[:, 1:]) * dy / dx
+    t_x[[0, -1], :] *= 0.5
+    t_y = harmonic_mean(coeff[:-1, :], coeff[1:, :]) * dx / dy
+    return t_x, t_y
+
+
+def spanning_pore_space(coeff, pore_threshold=None):
+    """
+    Finds the pore nodes connected (through pore nodes and the 5-point
+    stencil) to both the left and the right column. Solid nodes and pore
+    clusters that do not span the domain carry no flow between the Dirichlet
+    boundaries, so they can be eliminated from the pressure system.
+
+    Args:
+        coeff (np.ndarray): A 2D array of flow coefficients (k * rho / mu) at the nodes.
+        pore_threshold (float): Nodes with `coeff` above this value are pore nodes.
+            Default is None (every node above the minimum of `coeff`, or every node if `coeff`
+            is uniform).
+
+    Returns:
+        np.ndarray: Boolean array (same shape as `coeff`), True for the spanning pore nodes.
+    """
+    coeff = np.asarray(coeff, dtype=float)
+    if pore_threshold is not None:
+        pore = coeff > pore_threshold
+    elif coeff.min() < coeff.max():
+        pore = coeff > coeff.min()
+    else:
+        # A uniform field has no solid nodes
+        pore = np.ones(coeff.shape, dtype=bool)
+
+    # Connected components of the pore nodes (4-connectivity)
+    labels, _ = ndimage.label(pore)
+    spanning = np.intersect1d(labels[:, 0], labels[:, -1])
+    spanning = spanning[spanning > 0]
+    return np.isin(labels, spanning)
+
+
+def assemble_fd_system(coeff,
+                       dx,
+                       dy,
+                       P1,
+                       P2,
+                       dP_dy1=0,
+                       dP_dy2=0,
+                       active=None):
+    """
+    Assembles the 5-point pressure system for the nodes that are not on the
+    Dirichlet columns, from vectorised face transmissibilities. Every face
+    adds its transmissibility to the two nodes' diagonals and subtracts it
+    from their coupling. Faces to a Dirichlet node move the known pressure to
+    the load vector and the Neumann fluxes are added on the bottom and top
+    rows. The matrix is symmetric positive definite.
+
+    Args:
+        coeff (np.ndarray): A 2D array of flow coefficients (k * rho / mu) at the nodes.
+        dx (float): Node spacing along x.
+        dy (float): Node spacing along y.
+        P1 (float): Pressure at the left boundary (x = 0).
+        P2 (float): Pressure at the right boundary (x = 1).
+        dP_dy1 (float): Derivative of pressure with respect to y at the bottom boundary (y = 0).
+        dP_dy2 (float): Derivative of pressure with respect to y at the top boundary (y = 1).
+        active (np.ndarray): Boolean array (same shape as `coeff`) of the nodes to solve for, for
+            example from `spanning_pore_space`. Faces to other nodes carry no flow.
+            Default is None (all nodes).
+
+    Returns:
+        tuple: Contains the system matrix, load vector and node masks.
+            - A: Sparse matrix (CSR) over the unknown nodes.
+            - b: Load vector over the unknown nodes.
+            - unknown: Boolean array (same shape as `coeff`), True for the unknown nodes.
+            - dirichlet: Array (same shape as `coeff`) with the fixed pressures and NaN elsewhere.
+    """
+    coeff = np.asarray(coeff, dtype=float)
+    ny, nx = coeff.shape
+    if active is None:
+        active = np.ones((ny, nx), dtype=bool)
+
+    # Index masks of the Dirichlet columns and the unknown nodes
+    dirichlet = np.full((ny, nx), np.nan)
+    dirichlet[:, 0] = P1
+    dirichlet[:, -1] = P2
+    dirichlet[~active] = np.nan
+    unknown = active & np.isnan(dirichlet)
+
+    # Unknown number of each node (-1 for Dirichlet and inactive nodes)
+    number = np.full(ny * nx, -1)
+    number[unknown.ravel()] = np.arange(np.count_nonzero(unknown))
+    num_unknowns = np.count_nonzero(unknown)
+
+    # Node pairs and transmissibilities of all faces between active nodes
+    t_x, t_y = face_transmissibilities(coeff, dx, dy)
+    node = np.arange(ny * nx).reshape(ny, nx)
+    first = np.concatenate([node[:, :-1].ravel(), node[:-1, :].ravel()])
+    second = np.concatenate([node[:, 1:].ravel(), node[1:, :].ravel()])
+    trans = np.concatenate([t_x.ravel(), t_y.ravel()])
+    face_active = active.ravel()[first] & active.ravel()[second]
+    first = first[face_active]
+    second = second[face_active]
+    trans = trans[face_active]
+    p = number[first]
+    q = number[second]
+
+    # Diagonal entries for every unknown side of a face, couplings for
+    # faces between two unknowns (p < q, so these fill the upper triangle)
+    p_unknown = p >= 0
+    q_unknown = q >= 0
+    diagonal = np.zeros(num_unknowns)
+    diagonal += np.bincount(p[p_unknown],
+                            trans[p_unknown],
+                            minlength=num_unknowns)
+    diagonal += np.bincount(q[q_unknown],
+                            trans[q_unknown],
+                            minlength=num_unknowns)
+    both = p_unknown & q_unknown
+    upper = sp.csr_matrix((-trans[both], (p[both], q[both])),
+                          shape=(num_unknowns, num_unknowns))
+    A = (upper + upper.T + sp.diags(diagonal)).tocsr()
+
+    # Known pressures of Dirichlet neighbors
+    fixed = dirichlet.ravel()
+    to_fixed = p_unknown & ~q_unknown
+    from_fixed = ~p_unknown & q_unknown
+    b = np.zeros(num_unknowns)
+    b += np.bincount(p[to_fixed],
+                     trans[to_fixed] * fixed[second[to_fixed]],
+                     minlength=num_unknowns)
+    b += np.bincount(q[from_fixed],
+                     trans[from_fixed] * fixed[first[from_fixed]],
+                     minlength=num_unknowns)
+
+    # Neumann fluxes through the bottom and top boundaries
+    # (half length faces next to the Dirichlet corners)
+    length = np.full(nx, dx)
+    length[[0, -1]] = 0.5 * dx
+    bottom = number[node[0, :]]
+    top = number[node[-1, :]]
+    b[bottom[bottom >= 0]] -= (coeff[0, :] * dP_dy1 * length)[bottom >= 0]
+    b[top[top >= 0]] += (coeff[-1, :] * dP_dy2 * length)[top >= 0]
+
+    return A, b, unknown, dirichlet
+
+
+def face_fluxes(pressure, coeff, dx, dy):
+    """
+    Computes the Darcy fluxes -coeff * ∂P/∂n on all faces between neighboring
+    nodes, with the harmonic mean of `coeff` on each face.
+
+    Args:
+        pressure (np.ndarray): A 2D array of pressures at the nodes.
+        coeff (np.ndarray): A 2D array of flow coefficients (k * rho / mu) at the nodes.
+        dx (float): Node spacing along x.
+        dy (float): Node spacing along y.
+
+    Returns:
+        tuple: Contains the fluxes of the x faces and y faces (0 on faces next to a NaN pressure).
+            - q_x: Array of shape (ny, nx - 1), flux from node [i, j] to node [i, j + 1].
+            - q_y: Array of shape (ny - 1, nx), flux from node [i, j] to node [i + 1, j].
+    """
+    coeff = np.asarray(coeff, dtype=float)
+    pressure = np.asarray(pressure, dtype=float)
+
+    # Eliminated nodes have NaN pressures and no flow
+    dp_x = np.nan_to_num(np.diff(pressure, axis=1), nan=0.0)
+    dp_y = np.nan_to_num(np.diff(pressure, axis=0), nan=0.0)
+    q_x = -harmonic_mean(coeff[:, :-1], coeff[:, 1:]) * dp_x / dx
+    q_y = -harmonic_mean(coeff[:-1, :], coeff[1:, :]) * dp_y / dy
+    return q_x, q_y
+
+
+def solve_flow_2d(coeff,
+                  dx,
+                  dy,
+                  P1,
+                  P2,
+                  dP_dy1=0,
+                  dP_dy2=0,
+                  solver='direct',
+                  preconditioner=None,
+                  tol=1e-10,
+                  initial_pressure=None,
+                  eliminate_solids=False,
+                  pore_threshold=None,
+                  return_info=False):
+    """
+    Solves 2D steady-state Darcy flow with the finite-difference method.
+
+    Args:
+        coeff (np.ndarray): A 2D array of flow coefficients (k * rho / mu) at the nodes.
+        dx (float): Node spacing along x.
+        dy (float): Node spacing along y.
+        P1 (float): Pressure at the left boundary (x = 0).
+        P2 (float): Pressure at the right boundary (x = 1).
+        dP_dy1 (float): Derivative of pressure with respect to y at the bottom boundary (y = 0).
+        dP_dy2 (float): Derivative of pressure with respect to y at the top boundary (y = 1).
+        solver (str): Linear solver backend, 'direct', 'pardiso', 'cg' or 'bicgstab'
+            (see `solvers.solve_linear_system`). Default is 'direct'.
+        preconditioner (str): Preconditioner of the Krylov solvers, None, 'jacobi', 'ilu' or 'amg'.
+            Default is None.
+        tol (float): Relative residual norm at which the Krylov solvers stop. Default is 1e-10.
+        initial_pressure (np.ndarray): Initial guess of the Krylov solvers (same shape as `coeff`).
+            Default is None.
+        eliminate_solids (boolean): If True, solves only for the pore nodes connected to both
+            Dirichlet columns (see `spanning_pore_space`). The pressure is NaN on all other nodes.
+            Default is False.
+        pore_threshold (float): Nodes with `coeff` above this value are pore nodes when
+            `eliminate_solids` is True. Default is None (see `spanning_pore_space`).
+        return_info (boolean): If True, also returns the solver report. Default is False.
+
+    Returns:
+        tuple: Contains the pressure and flux fields (and the solver report if `return_info` is True).
+            - pressure: Array (same shape as `coeff`) of pressures at the nodes.
+            - q_x: Array of shape (ny, nx - 1) of fluxes on the x faces.
+            - q_y: Array of shape (ny - 1, nx) of fluxes on the y faces.
+            - info: Dictionary returned by `solvers.solve_linear_system`.
+    """
+    active = None
+    if eliminate_solids:
+        active = spanning_pore_space(coeff, pore_threshold)
+    A, b, unknown, dirichlet = assemble_fd_system(coeff, dx, dy, P1, P2,
+                                                  dP_dy1, dP_dy2, active)
+
+    # Solve for the unknown nodes and insert them between the Dirichlet columns
+    x0 = None
+    if initial_pressure is not None:
+        x0 = np.asarray(initial_pressure, dtype=float)[unknown]
+    solution, info = solve_linear_system(A,
+                                         b,
+                                         solver=solver,
+                                         preconditioner=preconditioner,
+                                         tol=tol,
+                                         x0=x0)
+    pressure = dirichlet.copy()
+    pressure[unknown] = solution
+
+    q_x, q_y = face_fluxes(pressure, coeff, dx, dy)
+    if return_info:
+        return pressure, q_x, q_y, info
+    return pressure, q_x, q_y
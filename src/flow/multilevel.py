@@ -0,0 +1,208 @@
+"""
+Coarse-to-fine driver for the finite-difference Darcy solver of
+`fd_solver`. The permeability field is downsampled by harmonic averaging,
+the coarsest level is solved first, and the pressure of every level is
+prolonged (bilinear interpolation) as the initial guess of the iterative
+solve on the next finer level.
+
+Grids are node-centred on the same domain at every level: a level of n nodes
+along an axis has (n - 1) // factor + 1 nodes on the next coarser level.
+"""
+
+# `scipy.sparse` holds the interpolation weights between levels.
+import numpy as np
+import scipy.sparse as sp
+
+from flow.fd_solver import solve_flow_2d
+
+
+def _coarse_size(n, factor):
+    """
+    Helper function for coarsen_coeff(). Number of coarse nodes for n fine
+    nodes (at least 3).
+    """
+    return max((n - 1) // factor + 1, 3)
+
+
+def _nearest_coarse(n, m):
+    """
+    Helper function for coarsen_coeff(). Index of the nearest of m coarse
+    nodes for every one of n fine nodes on the same interval (ties go to the
+    next coarse node, so the blocks have the same size).
+    """
+    return np.floor(np.arange(n) * (m - 1) / (n - 1) + 0.5).astype(int)
+
+
+def coarsen_coeff(coeff, factor=2):
+    """
+    Downsamples a coefficient field by harmonic averaging: every coarse node
+    gets the harmonic mean of the fine nodes closest to it. Blocks that mix
+    pore and solid nodes become (almost) solid, like resistances in series.
+
+    Args:
+        coeff (np.ndarray): A 2D array of flow coefficients (k * rho / mu) at the nodes.
+        factor (int): Coarsening factor along both axes. Default is 2.
+
+    Returns:
+        np.ndarray: The coarse 2D array of flow coefficients.
+    """
+    coeff = np.asarray(coeff, dtype=float)
+    ny, nx = coeff.shape
+    my, mx = _coarse_size(ny, factor), _coarse_size(nx, factor)
+
+    # Coarse node of every fine node, flattened
+    coarse = (_nearest_coarse(ny, my)[:, None] * mx +
+              _nearest_coarse(nx, mx)[None, :]).ravel()
+    count = np.bincount(coarse, minlength=my * mx)
+    with np.errstate(divide='ignore'):
+        resistance = np.bincount(coarse, 1 / coeff.ravel(), minlength=my * mx)
+        return (count / resistance).reshape(my, mx)
+
+
+def _interpolation_weights(n, m):
+    """
+    Helper function for prolong_pressure(). Sparse (n, m) matrix of linear
+    interpolation weights from m coarse nodes to n fine nodes.
+    """
+    position = np.linspace(0, m - 1, n)
+    lower = np.minimum(position.astype(int), m - 2)
+    weight = position - lower
+    rows = np.arange(n)
+    return sp.csr_matrix(
+        (np.concatenate((1 - weight, weight)),
+         (np.concatenate((rows, rows)), np.concatenate((lower, lower + 1)))),
+        shape=(n, m))
+
+
+def prolong_pressure(pressure, shape, P1, P2):
+    """
+    Interpolates a coarse pressure field to a finer grid on the same domain
+    (bilinear interpolation). NaN pressures (nodes eliminated from the coarse
+    solve) are replaced by the linear profile between the boundary pressures.
+
+    Args:
+        pressure (np.ndarray): A 2D array of pressures at the coarse nodes.
+        shape (tuple): Shape (ny, nx) of the fine grid.
+        P1 (float): Pressure at the left boundary (x = 0).
+        P2 (float): Pressure at the right boundary (x = 1).
+
+    Returns:
+        np.ndarray: Array of the given shape of pressures at the fine nodes.
+    """
+    pressure = np.asarray(pressure, dtype=float)
+    my, mx = pressure.shape
+    linear = np.broadcast_to(np.linspace(P1, P2, mx), (my, mx))
+    pressure = np.where(np.isnan(pressure), linear, pressure)
+    return _interpolation_weights(shape[0], my) @ (
+        _interpolation_weights(shape[1], mx) @ pressure.T).T
+
+
+def solve_flow_multilevel(coeff,
+                          dx,
+                          dy,
+                          P1,
+                          P2,
+                          dP_dy1=0,
+                          dP_dy2=0,
+                          levels=3,
+                          factor=2,
+                          solver='cg',
+                          preconditioner='amg',
+                          tol=1e-10,
+                          coarse_tol=1e-6,
+                          eliminate_solids=False,
+                          pore_threshold=None,
+                          return_info=False):
+    """
+    Solves 2D steady-state Darcy flow with the finite-difference method from
+    coarse to fine grids. The coarsest level is solved directly, and the
+    prolonged pressure of every level is the initial guess of the iterative
+    solve on the next one. With a single level, the fine grid is solved with
+    `solver` without an initial guess.
+
+    Args:
+        coeff (np.ndarray): A 2D array of flow coefficients (k * rho / mu) at the nodes.
+        dx (float): Node spacing along x.
+        dy (float): Node spacing along y.
+        P1 (float): Pressure at the left boundary (x = 0).
+        P2 (float): Pressure at the right boundary (x = 1).
+        dP_dy1 (float): Derivative of pressure with respect to y at the bottom boundary (y = 0).
+        dP_dy2 (float): Derivative of pressure with respect to y at the top boundary (y = 1).
+        levels (int): Number of grid levels, including the fine grid (at least 1). Default is 3.
+        factor (int): Coarsening factor between levels. Default is 2.
+        solver (str): Linear solver backend above the coarsest level, 'cg' or 'bicgstab' (a direct
+            solver ignores the initial guess, see `solvers.solve_linear_system`). Default is 'cg'.
+        preconditioner (str): Preconditioner of the Krylov solvers, None, 'jacobi', 'ilu' or 'amg'.
+            Default is 'amg'.
+        tol (float): Relative residual norm at which the Krylov solver stops on the fine grid.
+            Default is 1e-10.
+        coarse_tol (float): Relative residual norm at which the Krylov solvers stop on the
+            intermediate levels, which only provide initial guesses. Default is 1e-6.
+        eliminate_solids (boolean): If True, solves only the spanning pore space on every level
+            (see `fd_solver.solve_flow_2d`). Default is False.
+        pore_threshold (float): Nodes with `coeff` above this value are pore nodes when
+            `eliminate_solids` is True. Default is None (every node above the minimum of `coeff`
+            on the fine grid, and above the geometric mean of the minimum and maximum on the
+            coarse grids; every node of a uniform field).
+        return_info (boolean): If True, also returns the solver reports. Default is False.
+
+    Returns:
+        tuple: Contains the fine-grid pressure and flux fields (and the solver reports if
+            `return_info` is True).
+            - pressure: Array (same shape as `coeff`) of pressures at the nodes.
+            - q_x: Array of shape (ny, nx - 1) of fluxes on the x faces.
+            - q_y: Array of shape (ny - 1, nx) of fluxes on the y faces.
+            - info: List of the dictionaries returned by `solvers.solve_linear_system` for every
+              level, from the coarsest to the fine grid.
+    """
+    if levels < 1:
+        raise ValueError("levels must be at least 1")
+
+    coeff = np.asarray(coeff, dtype=float)
+    ny, nx = coeff.shape
+
+    # Coefficient fields and node spacings from fine to coarse
+    fields = [coeff]
+    for _ in range(levels - 1):
+        fields.append(coarsen_coeff(fields[-1], factor))
+    spacings = [((nx - 1) * dx / (field.shape[1] - 1),
+                 (ny - 1) * dy / (field.shape[0] - 1)) for field in fields]
+
+    # Harmonic means of mixed blocks are close to the solid value, so the
+    # coarse levels only keep nodes well above it as pores (a uniform field
+    # has no solid nodes)
+    coarse_threshold = pore_threshold
+    if coarse_threshold is None and coeff.min() < coeff.max():
+        coarse_threshold = np.sqrt(coeff.min() * coeff.max())
+
+    reports = []
+    pressure = None
+    for level in range(levels - 1, -1, -1):
+        field = fields[level]
+        level_dx, level_dy = spacings[level]
+        initial_pressure = None
+        if pressure is not None:
+            initial_pressure = prolong_pressure(pressure, field.shape, P1, P2)
+
+        # Direct solve on the coarsest level, warm-started solves above it
+        coarsest = level == levels - 1 and levels > 1
+        pressure, q_x, q_y, info = solve_flow_2d(
+            field,
+            level_dx,
+            level_dy,
+            P1,
+            P2,
+            dP_dy1,
+            dP_dy2,
+            solver='direct' if coarsest else solver,
+            preconditioner=preconditioner,
+            tol=tol if level == 0 else max(tol, coarse_tol),
+            initial_pressure=initial_pressure,
+            eliminate_solids=eliminate_solids,
+            pore_threshold=pore_threshold if level == 0 else coarse_threshold,
+            return_info=True)
+        reports.append(info)
+
+    if return_info:
+        return pressure, q_x, q_y, reports
+    return pressure, q_x, q_y
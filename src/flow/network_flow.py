@@ -0,0 +1,283 @@
+"""
+Pore-network solver for steady-state Stokes flow on the OpenPNM networks of
+`pore2chip.generate.generate_network`, for screening micromodel designs
+without rasterising them.
+
+Every throat is a conduit of three cylinders in series (half of pore 1, the
+throat, half of pore 2), each with the Hagen-Poiseuille conductance
+g = pi * d^4 / (128 * mu * L). Mass conservation at the pores gives the
+symmetric system sum_j g_ij * (P_i - P_j) = 0, with the pressure fixed on the
+inlet and outlet pores. Pores that are not connected to both get NaN
+pressures and no flow.
+
+Pore coordinates of the generated networks are in lattice units (one unit per
+pore), while the diameters are in image units. `spacing` converts the
+coordinates, for example `d1 / n1` for the images of `export.network2svg`.
+"""
+
+# `scipy.sparse` is used to assemble the pressure system, `flow.solvers` to solve it.
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+from flow.solvers import solve_linear_system
+
+
+def _cylinder_conductance(diameter, length, mu):
+    """
+    Helper function for throat_conductance(). Hagen-Poiseuille conductance
+    of cylinders, 0 for missing (NaN) or non-positive diameters.
+    """
+    diameter = np.where(np.isfinite(diameter) & (diameter > 0), diameter, 0)
+    with np.errstate(divide='ignore'):
+        return np.pi * diameter**4 / (128 * mu * length)
+
+
+def throat_conductance(network, mu=1.0, spacing=1.0):
+    """
+    Computes the hydraulic conductance of every throat conduit from
+    'throat.diameter', 'pore.diameter' and the pore coordinates. The throat
+    length is the distance between the pore centers minus both pore radii
+    (at least 1% of the distance, for overlapping pores).
+
+    Args:
+        network (openpnm.network.Network): Network with 'pore.coords', 'throat.conns' and
+            'throat.diameter' ('pore.diameter' is optional, pores are ignored without it).
+        mu (float): Dynamic viscosity of the fluid. Default is 1.0.
+        spacing (float): Length of one coordinate unit in the units of the diameters.
+            Default is 1.0.
+
+    Returns:
+        np.ndarray: Array of the conduit conductances of all throats.
+    """
+    coords = np.asarray(network['pore.coords'], dtype=float)[:, :2] * spacing
+    conns = np.asarray(network['throat.conns'])
+    throat_diameter = np.asarray(network['throat.diameter'], dtype=float)
+    distance = np.linalg.norm(coords[conns[:, 1]] - coords[conns[:, 0]],
+                              axis=1)
+
+    if 'pore.diameter' not in network:
+        return _cylinder_conductance(throat_diameter, distance, mu)
+
+    # Half of each pore in series with the rest of the throat
+    radii = np.asarray(network['pore.diameter'], dtype=float)[conns] / 2
+    length = np.maximum(distance - radii.sum(axis=1), 0.01 * distance)
+    resistance = 1 / _cylinder_conductance(throat_diameter, length, mu)
+    for side in range(2):
+        resistance = resistance + 1 / _cylinder_conductance(
+            2 * radii[:, side], radii[:, side], mu)
+    with np.errstate(divide='ignore'):
+        return np.where(np.isfinite(resistance), 1 / resistance, 0.0)
+
+
+def boundary_pores(network, axis='x'):
+    """
+    Finds the inlet and outlet pores of a flow along `axis`: the pores
+    labelled 'pore.xmin' and 'pore.xmax' (or 'pore.ymin' and 'pore.ymax') by
+    OpenPNM, or otherwise the pores within a quarter of a coordinate unit of
+    the minimum and maximum coordinate.
+
+    Args:
+        network (openpnm.network.Network): Network with 'pore.coords'.
+        axis (str): Flow direction, 'x' or 'y'. Default is 'x'.
+
+    Returns:
+        tuple: Contains the pore indices at both ends of the network.
+            - inlets: Array of indices of the pores at the minimum coordinate.
+            - outlets: Array of indices of the pores at the maximum coordinate.
+    """
+    if 'pore.%smin' % axis in network and 'pore.%smax' % axis in network:
+        return (np.flatnonzero(network['pore.%smin' % axis]),
+                np.flatnonzero(network['pore.%smax' % axis]))
+    position = np.asarray(network['pore.coords'],
+                          dtype=float)[:, 'xy'.index(axis)]
+    return (np.flatnonzero(position <= position.min() + 0.25),
+            np.flatnonzero(position >= position.max() - 0.25))
+
+
+def spanning_pores(conns, conductance, num_pores, inlets, outlets):
+    """
+    Finds the pores connected (through throats with a positive conductance)
+    to both an inlet and an outlet pore. The other pores carry no flow.
+
+    Args:
+        conns (np.ndarray): Array of shape (K, 2) of the pores of every throat.
+        conductance (np.ndarray): Array of K throat conductances.
+        num_pores (int): Number of pores.
+        inlets (np.ndarray): Indices of the inlet pores.
+        outlets (np.ndarray): Indices of the outlet pores.
+
+    Returns:
+        np.ndarray: Boolean array of `num_pores` values, True for the spanning pores.
+    """
+    open_throats = conns[conductance > 0]
+    graph = sp.coo_matrix((np.ones(len(open_throats)),
+                           (open_throats[:, 0], open_throats[:, 1])),
+                          shape=(num_pores, num_pores))
+    _, labels = csgraph.connected_components(graph, directed=False)
+    spanning = np.intersect1d(labels[inlets], labels[outlets])
+    return np.isin(labels, spanning)
+
+
+def assemble_network_system(conns,
+                            conductance,
+                            num_pores,
+                            inlets,
+                            outlets,
+                            P_in,
+                            P_out,
+                            active=None):
+    """
+    Assembles the pore pressure system of a network in sparse format. The
+    inlet and outlet pressures are moved to the right-hand side, so the
+    matrix is symmetric positive definite (on each spanning cluster).
+
+    Args:
+        conns (np.ndarray): Array of shape (K, 2) of the pores of every throat.
+        conductance (np.ndarray): Array of K throat conductances.
+        num_pores (int): Number of pores.
+        inlets (np.ndarray): Indices of the inlet pores.
+        outlets (np.ndarray): Indices of the outlet pores.
+        P_in (float): Pressure at the inlet pores.
+        P_out (float): Pressure at the outlet pores.
+        active (np.ndarray): Boolean array of `num_pores` values, False for pores that are
+            left out of the system (NaN pressure). Default is None (all pores).
+
+    Returns:
+        tuple: Contains the sparse system and the mapping between pores and unknowns.
+            - A: scipy.sparse.csr_matrix of the pressure system.
+            - b: The load vector.
+            - unknown: Boolean array of `num_pores` values, True for the pores in the system.
+            - fixed: Array of `num_pores` pressures, set on the inlet and outlet pores and NaN
+              elsewhere.
+    """
+    conns = np.asarray(conns)
+    conductance = np.asarray(conductance, dtype=float)
+    if active is None:
+        active = np.ones(num_pores, dtype=bool)
+
+    fixed = np.full(num_pores, np.nan)
+    fixed[inlets] = P_in
+    fixed[outlets] = P_out
+    fixed[~active] = np.nan
+    unknown = active & np.isnan(fixed)
+
+    # Equation index of every pore (-1 for fixed and inactive pores)
+    index = np.full(num_pores, -1)
+    index[unknown] = np.arange(np.count_nonzero(unknown))
+    num_unknowns = np.count_nonzero(unknown)
+
+    # Throats within the active pores
+    keep = active[conns].all(axis=1) & (conductance > 0)
+    conns, conductance = conns[keep], conductance[keep]
+    rows = index[conns]
+
+    # Diagonal: sum of the conductances of every unknown pore's throats
+    diagonal = np.zeros(num_unknowns)
+    b = np.zeros(num_unknowns)
+    for side in range(2):
+        own, other = rows[:, side], conns[:, 1 - side]
+        in_system = own >= 0
+        diagonal += np.bincount(own[in_system],
+                                conductance[in_system],
+                                minlength=num_unknowns)
+
+        # Throats to a fixed pore move its pressure to the load vector
+        to_fixed = in_system & (index[other] < 0)
+        b += np.bincount(own[to_fixed],
+                         conductance[to_fixed] * fixed[other[to_fixed]],
+                         minlength=num_unknowns)
+
+    # Off-diagonals between two unknown pores (symmetric)
+    both = (rows >= 0).all(axis=1)
+    upper = sp.csr_matrix(
+        (-conductance[both], (rows[both, 0], rows[both, 1])),
+        shape=(num_unknowns, num_unknowns))
+    A = (sp.diags(diagonal) + upper + upper.T).tocsr()
+    return A, b, unknown, fixed
+
+
+def solve_network_flow(network,
+                       axis='x',
+                       P_in=1.0,
+                       P_out=0.0,
+                       mu=1.0,
+                       spacing=1.0,
+                       depth=None,
+                       solver='direct',
+                       preconditioner=None,
+                       tol=1e-10,
+                       return_info=False):
+    """
+    Solves steady-state Stokes flow through a pore network and computes its
+    absolute permeability K = Q * mu * L / (A * (P_in - P_out)), where L is the
+    distance between the inlet and outlet pores and A the width of the
+    network times `depth`.
+
+    Args:
+        network (openpnm.network.Network): Network from `generate.generate_network`
+            (see `throat_conductance`).
+        axis (str): Flow direction, 'x' or 'y' (see `boundary_pores`). Default is 'x'.
+        P_in (float): Pressure at the inlet pores. Default is 1.0.
+        P_out (float): Pressure at the outlet pores. Default is 0.0.
+        mu (float): Dynamic viscosity of the fluid. Default is 1.0.
+        spacing (float): Length of one coordinate unit in the units of the diameters.
+            Default is 1.0.
+        depth (float): Thickness of the network, in the units of the diameters. Default is None
+            (one coordinate unit, `spacing`).
+        solver (str): Linear solver backend, 'direct', 'pardiso', 'cg' or 'bicgstab'
+            (see `solvers.solve_linear_system`). Default is 'direct'.
+        preconditioner (str): Preconditioner of the Krylov solvers, None, 'jacobi', 'ilu' or 'amg'.
+            Default is None.
+        tol (float): Relative residual norm at which the Krylov solvers stop. Default is 1e-10.
+        return_info (boolean): If True, also returns the solver report. Default is False.
+
+    Returns:
+        tuple: Contains the pore pressures, throat flow rates and permeability (and the solver
+            report if `return_info` is True).
+            - pressure: Array of pore pressures (NaN for pores that carry no flow).
+            - rate: Array of throat flow rates, positive from the first to the second pore of
+              'throat.conns'.
+            - permeability: Absolute permeability of the network along `axis`.
+            - info: Dictionary returned by `solvers.solve_linear_system`.
+    """
+    if axis not in ('x', 'y'):
+        raise ValueError("Invalid axis: %s" % axis)
+    if depth is None:
+        depth = spacing
+
+    coords = np.asarray(network['pore.coords'], dtype=float)[:, :2] * spacing
+    conns = np.asarray(network['throat.conns'])
+    num_pores = len(coords)
+    conductance = throat_conductance(network, mu, spacing)
+    inlets, outlets = boundary_pores(network, axis)
+
+    active = spanning_pores(conns, conductance, num_pores, inlets, outlets)
+    A, b, unknown, fixed = assemble_network_system(conns, conductance,
+                                                   num_pores, inlets, outlets,
+                                                   P_in, P_out, active)
+    solution, info = solve_linear_system(A,
+                                         b,
+                                         solver=solver,
+                                         preconditioner=preconditioner,
+                                         tol=tol)
+    pressure = fixed.copy()
+    pressure[unknown] = solution
+
+    # Throat flow rates (zero outside the spanning clusters)
+    rate = np.nan_to_num(conductance *
+                         (pressure[conns[:, 0]] - pressure[conns[:, 1]]))
+
+    # Total flow out of the inlet pores
+    outflow = np.bincount(conns[:, 0], rate, minlength=num_pores) - \
+        np.bincount(conns[:, 1], rate, minlength=num_pores)
+    flow = outflow[inlets].sum()
+
+    along = 'xy'.index(axis)
+    length = coords[outlets, along].mean() - coords[inlets, along].mean()
+    width = np.ptp(coords[:, 1 - along])
+    permeability = flow * mu * length / (width * depth * (P_in - P_out))
+
+    if return_info:
+        return pressure, rate, permeability, info
+    return pressure, rate, permeability
@@ -11,6 +11,8 @@ Mentors: Maruti K. Mudunuru and Satish Karra
 
 # `jax` and `jax.numpy` are used for automatic differentiation and working with numerical arrays.
 # `optax` is a library that provides optimization algorithms.
+from functools import partial
+import numpy as np
 import jax
 import jax.numpy as jnp
 import optax
@@ -101,51 +103,66 @@ def generate_BCs_and_colloc_xct(xx, yy, P1, P2, dP_dy1, dP_dy2):
     return x_b1, y_b1, bc_1, x_b2, y_b2, bc_2, x_b3, y_b3, bc_3, x_b4, y_b4, bc_4, x_c, y_c, conds, colloc
 
 
+def interior_coeff(norm_coeff):
+    """
+    Extracts the normalization coefficients of the interior grid points (the
+    collocation points of `generate_BCs_and_colloc_xct`) as a column vector.
+    Call it once before training and pass the result to `loss_fun` instead of
+    the full grid.
+
+    Args:
+        norm_coeff (jnp.ndarray): A 2D array of normalization coefficients on the full grid.
+
+    Returns:
+        jnp.ndarray: A (N, 1) array of the coefficients at the N interior points, in the order of
+            the collocation points.
+    """
+    return jnp.asarray(norm_coeff[1:-1, 1:-1]).reshape(-1, 1)
+
+
+def _derivative(P, x, y, axis):
+    """
+    Helper function for pde_flow_2d_hetero_resiual() and loss_fun(). First
+    derivative of P with respect to x (axis 0) or y (axis 1) at every point,
+    in forward mode. The points are independent, so a tangent of ones gives
+    the derivative at every point in one pass.
+    """
+    ones, zeros = jnp.ones_like(x), jnp.zeros_like(y)
+    tangent = (ones, zeros) if axis == 0 else (zeros, ones)
+    return jax.jvp(P, (x, y), tangent)[1]
+
+
 def pde_flow_2d_hetero_resiual(x, y, P, norm_coeff):
     """
     Computes the residual of the 2D heterogeneous flow PDE.
     ∂/∂x(norm_coeff * ∂P/∂x) + ∂/∂y(norm_coeff * ∂P/∂y) = 0
 
+    The coefficients are constants at the collocation points, so the residual
+    is norm_coeff * (∂²P/∂x² + ∂²P/∂y²). The second derivatives are taken in
+    forward mode (`jax.jvp` of `jax.jvp`), which stores no reverse-mode
+    intermediates for the inner derivatives.
+
     Args:
         x (jnp.ndarray): A JAX array representing the x coordinates of collocation points.
         y (jnp.ndarray): A JAX array representing the y coordinates of collocation points.
         P (function): A callable function representing the neural network approximation of the pressure field..
-        norm_coeff (jnp.ndarray): A 2D JAX array representing the heterogeneous normalization coefficients.
+        norm_coeff (jnp.ndarray): The (N, 1) normalization coefficients at the collocation points
+            (see `interior_coeff`), or the 2D array of the full grid.
 
     Returns:
         jnp.ndarray: A JAX array representing the residuals of the PDE at the given collocation points.
     """
 
-    # Compute the gradient of pressure with respect to x
-    P_x = lambda x, y: jax.grad(lambda x, y: jnp.sum(P(x, y)), 0)(x, y)
-
-    # Compute the gradient of pressure with respect to y
-    P_y = lambda x, y: jax.grad(lambda x, y: jnp.sum(P(x, y)), 1)(x, y)
-    #print("P_x = ", P_x(x,y))
+    # Coefficients at the collocation points (only sliced if the full grid is given)
+    if norm_coeff.ndim == 2 and norm_coeff.shape[1] != 1:
+        norm_coeff = interior_coeff(norm_coeff)
 
-    # Extract k_x and k_y from the given field k_hetero
-    # Normalization coefficients for the interior points
-    norm_coeff_x = jnp.array(norm_coeff[1:-1, 1:-1])  # Convert to jnp.array
-    norm_coeff_x = norm_coeff_x.flatten()
-    norm_coeff_x = norm_coeff_x.reshape(-1, 1)
-    #print("K_x = ",k_x)
-
-    norm_coeff_y = jnp.array(norm_coeff[1:-1, 1:-1])  # Convert to jnp.array
-    norm_coeff_y = norm_coeff_y.flatten()
-    norm_coeff_y = norm_coeff_y.reshape(-1, 1)
-
-    # Define callable functions for term_x and term_y
-    # Define the terms involving the normalization coefficients and gradients
-    term_x = lambda x, y: (norm_coeff_x * P_x(x, y))
-    term_y = lambda x, y: (norm_coeff_y * P_y(x, y))
-    #print("term_x = ", term_x(x, y))
-
-    # Compute the second derivatives of term_x and term_y with respect to x and y
-    P_xx = lambda x, y: jax.grad(lambda x, y: jnp.sum(term_x(x, y)), 0)(x, y)
-    P_yy = lambda x, y: jax.grad(lambda x, y: jnp.sum(term_y(x, y)), 1)(x, y)
+    # Second derivatives of the pressure with respect to x and y
+    P_xx = _derivative(lambda x, y: _derivative(P, x, y, 0), x, y, 0)
+    P_yy = _derivative(lambda x, y: _derivative(P, x, y, 1), x, y, 1)
 
     # Return the residual of the PDE
-    return P_xx(x, y) + P_yy(x, y)
+    return norm_coeff * (P_xx + P_yy)
 
 
 def init_params(layers):
@@ -228,7 +245,8 @@ def loss_fun(params, colloc, conds, norm_coeff):
         params (list[dict]): List of parameters for the neural network.
         colloc (jnp.ndarray): Collocation points within the domain.
         conds (list[jnp.ndarray]): Boundary conditions for the domain.
-        norm_coeff (jnp.ndarray): Normalization coefficients for heterogeneity.
+        norm_coeff (jnp.ndarray): Normalization coefficients for heterogeneity, at the collocation
+            points (see `interior_coeff`) or on the full grid.
 
     Returns:
         jnp.ndarray: The total loss.
@@ -247,14 +265,126 @@ def loss_fun(params, colloc, conds, norm_coeff):
         loss += MSE(P_nn(x_b, y_b), u_b)
 
     # Compute Neumann BC loss (bottom and top boundaries)
-    P_nn_y = lambda x, y: jax.grad(lambda x, y: jnp.sum(P_nn(x, y)), 1)(
-        x, y)  # single derivative of P for Neumann BCs
     for cond in conds[2:4]:
         x_b, y_b, u_b = cond[:, [0]], cond[:, [1]], cond[:, [2]]
-        loss += MSE(P_nn_y(x_b, y_b), u_b)
+        loss += MSE(_derivative(P_nn, x_b, y_b, 1),
+                    u_b)  # single derivative of P for Neumann BCs
     return loss
 
 
+def interface_points(norm_coeff, pore_threshold=None):
+    """
+    Finds the collocation points on pore/solid interfaces: interior grid
+    points that are pores with a solid neighbour or solids with a pore
+    neighbour (4-neighbourhood). The pressure curvature, and so the PDE
+    residual, is largest there.
+
+    Args:
+        norm_coeff (np.ndarray): A 2D array of normalization coefficients on the full grid.
+        pore_threshold (float): Points with coefficients above this value are pores. Default is
+            None (the geometric mean of the minimum and maximum coefficient).
+
+    Returns:
+        np.ndarray: A boolean array of the N interior points, in the order of the collocation points.
+    """
+    norm_coeff = np.asarray(norm_coeff, dtype=float)
+    if pore_threshold is None:
+        pore_threshold = np.sqrt(norm_coeff.min() * norm_coeff.max())
+    pore = norm_coeff > pore_threshold
+
+    # Pore status differs from any of the four neighbours
+    center = pore[1:-1, 1:-1]
+    interface = ((center != pore[:-2, 1:-1]) | (center != pore[2:, 1:-1]) |
+                 (center != pore[1:-1, :-2]) | (center != pore[1:-1, 2:]))
+    return interface.ravel()
+
+
+@jax.jit
+def _residual(params, colloc, norm_coeff):
+    """
+    Helper function for residual_weights(). PDE residual of the network at
+    the collocation points.
+    """
+    P_nn = lambda x, y: neural_net(params, x, y)
+    return pde_flow_2d_hetero_resiual(colloc[:, [0]], colloc[:, [1]], P_nn,
+                                      norm_coeff)
+
+
+def residual_weights(params,
+                     colloc,
+                     norm_coeff,
+                     interface=None,
+                     k=1.0,
+                     c=1.0,
+                     interface_weight=1.0,
+                     chunk_size=65536):
+    """
+    Computes residual-based adaptive sampling weights of the collocation
+    points, |r|^k / mean(|r|^k) + c, where r is the PDE residual of the
+    current network. The constant `c` keeps a uniform share of the samples
+    everywhere. The residual is evaluated in chunks of points, so the weights
+    of large images fit in memory.
+
+    Args:
+        params (list[dict]): List of parameters for the neural network.
+        colloc (jnp.ndarray): An (N, 2) array of collocation points.
+        norm_coeff (jnp.ndarray): The (N, 1) normalization coefficients at the collocation points
+            (see `interior_coeff`).
+        interface (np.ndarray): Boolean array of the N points on pore/solid interfaces (see
+            `interface_points`), which get `interface_weight` added. Default is None.
+        k (float): Exponent of the residual. Default is 1.0.
+        c (float): Uniform part of the weights. Default is 1.0.
+        interface_weight (float): Weight added to the interface points. Default is 1.0.
+        chunk_size (int): Number of points per residual evaluation. Default is 65536.
+
+    Returns:
+        np.ndarray: Array of the N (unnormalized) sampling weights.
+    """
+    residual = np.concatenate([
+        np.asarray(
+            _residual(params, colloc[first:first + chunk_size],
+                      norm_coeff[first:first + chunk_size])).ravel()
+        for first in range(0, len(colloc), chunk_size)
+    ])
+    weights = np.abs(residual)**k
+    mean = weights.mean()
+    weights = (weights / mean if mean > 0 else weights) + c
+    if interface is not None:
+        weights += interface_weight * np.asarray(interface)
+    return weights
+
+
+def sample_collocation(key, colloc, norm_coeff, batch_size, weights=None):
+    """
+    Draws a mini-batch of collocation points (with replacement), uniformly or
+    with probabilities proportional to `weights`, together with the
+    normalization coefficients of the drawn points. The result can be passed
+    to `loss_fun` like the full set of points. It can be used inside `jax.jit`
+    with a static `batch_size`.
+
+    Args:
+        key (jax.random.PRNGKey): Random key.
+        colloc (jnp.ndarray): An (N, 2) array of collocation points.
+        norm_coeff (jnp.ndarray): The (N, 1) normalization coefficients at the collocation points
+            (see `interior_coeff`).
+        batch_size (int): Number of points to draw.
+        weights (jnp.ndarray): Array of N sampling weights (see `residual_weights`). Default is
+            None (uniform sampling).
+
+    Returns:
+        tuple: Contains the mini-batch.
+            - colloc: A (batch_size, 2) array of the drawn collocation points.
+            - norm_coeff: A (batch_size, 1) array of their normalization coefficients.
+    """
+    if weights is None:
+        index = jax.random.randint(key, (batch_size, ), 0, len(colloc))
+    else:
+        index = jax.random.choice(key,
+                                  len(colloc), (batch_size, ),
+                                  p=weights / jnp.sum(weights))
+    return colloc[index], norm_coeff[index]
+
+
 def save_training_data_to_file(sim_name, best_params, best_epoch, best_loss,
                                all_losses, all_epochs, results_dir):
     """
@@ -296,8 +426,21 @@ def save_training_data_to_file(sim_name, best_params, best_epoch, best_loss,
         pk.dump(data, f)
 
 
-def train_PINN(params, epochs, optimizer, loss_fun, colloc, conds, norm_coeff,
-               hidden_layers, hidden_nodes, lr, results_dir):
+def train_PINN(params,
+               epochs,
+               optimizer,
+               loss_fun,
+               colloc,
+               conds,
+               norm_coeff,
+               hidden_layers,
+               hidden_nodes,
+               lr,
+               results_dir,
+               chunk_size=100,
+               batch_size=None,
+               sampling='uniform',
+               seed=0):
     """
     Trains a Physics-Informed Neural Network (PINN) for a given problem. 
     This function performs the training process for a PINN model, 
@@ -307,6 +450,22 @@ def train_PINN(params, epochs, optimizer, loss_fun, colloc, conds, norm_coeff,
     the PINN trainable model parameters and loss during training, 
     and saves the trained params to a file as pickle object.
 
+    Each step computes the loss and its gradient together
+    (`jax.value_and_grad`), so the recorded loss of an epoch is the loss of
+    the parameters before that epoch's update. Chunks of `chunk_size` epochs
+    run inside one compiled `jax.lax.scan`, the best parameters are tracked
+    on the device, and the losses are copied to the host once per chunk.
+
+    With `batch_size`, every epoch evaluates the PDE residual on a mini-batch
+    of collocation points (see `sample_collocation`) instead of all of them.
+    The losses of different mini-batches are not comparable, so the recorded
+    losses, and the choice of the best parameters, use the loss on a fixed
+    evaluation batch of `batch_size` points drawn uniformly once. With
+    `sampling='residual'`, the sampling weights are recomputed from the
+    residual of the current parameters at the start of every chunk (see
+    `residual_weights`). If `norm_coeff` is given on the full grid, points on
+    pore/solid interfaces get extra weight (see `interface_points`).
+
     Args:
         params (list[dict]): List of initial parameters (weights and biases) for the deep neural network.
         epochs (int): The number of training epochs.
@@ -319,6 +478,12 @@ def train_PINN(params, epochs, optimizer, loss_fun, colloc, conds, norm_coeff,
         hidden_nodes (int): Number of nodes in each hidden layer.
         lr (float): Learning rate for the optimizer.
         results_dir (str): Directory to save the training results.
+        chunk_size (int): Number of epochs per compiled chunk (and between progress messages).
+            Default is 100.
+        batch_size (int): Number of collocation points per epoch. Default is None (all points).
+        sampling (str): Mini-batch sampling, 'uniform' or 'residual' (adaptive importance
+            sampling). Default is 'uniform'.
+        seed (int): Seed of the random evaluation batch and mini-batches. Default is 0.
 
     Returns:
         tuple: A tuple containing:
@@ -338,83 +503,130 @@ def train_PINN(params, epochs, optimizer, loss_fun, colloc, conds, norm_coeff,
     if not isinstance(optimizer, optax.GradientTransformation):
         raise optax.OptaxError("Invalid optimizer")
 
-    @jax.jit
-    def update(opt_state, params, colloc, conds, norm_coeff):
+    if sampling not in ('uniform', 'residual'):
+        raise ValueError("Sampling must be 'uniform' or 'residual'")
+
+    @partial(jax.jit, static_argnums=(6, 7, 8))
+    def train_chunk(carry, colloc, conds, norm_coeff, weights, evaluation,
+                    last, length, batch_size):
         """
-        Updates the neural network parameters using the optimizer and computed gradients. 
-        That is, get the gradient w.r.t to DNN trainable params (single step updates).
-        It calculates the gradients of the loss function with respect to the neural network parameters,
-        uses an optimizer to determine how to adjust the parameters based on these gradients, 
-        and then applies those updates to the parameters. This function is the core of training 
+        Runs `length` training epochs in one compiled `jax.lax.scan`. Every epoch
+        computes the loss and its gradient w.r.t. the DNN trainable params in one
+        pass, keeps the parameters if their loss is the lowest so far, and then
+        updates them with the optimizer. This function is the core of training 
         a physics-informed neural network, as it iteratively refines the parameters to 
         minimize the loss and improve the network's performance.
 
         Args:
-            opt_state (optax.OptState): Current state of the optimizer.
-            params (list[dict]): Current parameters of the deep neural network (weights and biases).
+            carry (tuple): Current parameters, optimizer state, best parameters, best loss,
+                best epoch, epoch number, and random key.
             colloc (jnp.ndarray): Array of collocation points used for evaluation of the PDE residual.
             conds (list[jnp.ndarray]): List of boundary condition for the model domain.
             norm_coeff (jnp.ndarray): Array of normalization coefficients for the heterogeneous properties of the micromodel.
+            weights (jnp.ndarray): Sampling weights of the collocation points (None for uniform sampling).
+            evaluation (tuple): Collocation points and coefficients of the evaluation batch
+                (None for full-batch training).
+            last (int): Last training epoch. Later epochs of the chunk leave the carry unchanged,
+                so every chunk has the same length and is compiled once.
+            length (int): Number of epochs in the chunk.
+            batch_size (int): Number of collocation points per epoch (None for all points).
 
         Returns:
             tuple: A tuple containing:
-                - opt_state: Updated state of the optimizer.
-                - params (list[dict]): Updated parameters of the neural network.
+                - carry (tuple): The updated carry.
+                - losses (jnp.ndarray): The loss (on the evaluation batch, if any) of every epoch
+                  of the chunk.
         """
 
-        # Get the gradient w.r.t to DNN trainable params
-        grads = jax.grad(loss_fun, argnums=0)(params, colloc, conds,
-                                              norm_coeff)
-
-        # Compute the parameter updates based on the gradients.
-        updates, opt_state = optimizer.update(
-            grads, opt_state,
-            params)  #Added params here for test_train_pinn.py
-
-        # Apply the updates to the parameters.
-        params = optax.apply_updates(params, updates)
-
-        return opt_state, params
+        def step(carry, _):
+            (params, opt_state, best_params, best_loss, best_epoch, epoch,
+             key) = carry
+
+            # Draw the collocation points of the epoch and their coefficients
+            batch_colloc, batch_coeff = colloc, norm_coeff
+            if batch_size is not None:
+                key, subkey = jax.random.split(key)
+                batch_colloc, batch_coeff = sample_collocation(
+                    subkey, colloc, norm_coeff, batch_size, weights)
+
+            # Get the loss and the gradient w.r.t to DNN trainable params
+            loss, grads = jax.value_and_grad(loss_fun, argnums=0)(
+                params, batch_colloc, conds, batch_coeff)
+
+            # Compare mini-batch epochs by the loss on the same evaluation batch
+            if evaluation is not None:
+                loss = loss_fun(params, evaluation[0], conds, evaluation[1])
+
+            # Keep track of the best-performing parameters (on the device)
+            active = epoch <= last
+            improved = active & (loss < best_loss)
+            best_params = jax.tree_util.tree_map(
+                lambda new, best: jnp.where(improved, new, best), params,
+                best_params)
+            best_loss = jnp.where(improved, loss, best_loss)
+            best_epoch = jnp.where(improved, epoch, best_epoch)
+
+            # Compute the parameter updates based on the gradients and apply them.
+            # Epochs past the last one keep the parameters and optimizer state.
+            updates, new_state = optimizer.update(
+                grads, opt_state,
+                params)  #Added params here for test_train_pinn.py
+            params, opt_state = jax.tree_util.tree_map(
+                lambda new, old: jnp.where(active, new, old),
+                (optax.apply_updates(params, updates), new_state),
+                (params, opt_state))
+
+            return (params, opt_state, best_params, best_loss, best_epoch,
+                    epoch + 1, key), loss
+
+        return jax.lax.scan(step, carry, None, length=length)
 
     try:
         # Initialize optimizer state
         opt_state = optimizer.init(params)
 
-        # Training loop: Initialize variables to keep track of the best parameters, loss, and epoch.
-        best_params = params
-        best_loss = float('inf')  # Start with an infinitely large loss.
-        best_epoch = 0
+        # Training state: current and best parameters, the best loss, the best epoch, the
+        # epoch number (with the dtypes the chunks return, so they are compiled only once)
+        # and the random key of the mini-batches.
+        key, evaluation_key = jax.random.split(jax.random.PRNGKey(seed))
+        carry = (params, opt_state, params, jnp.array(jnp.inf, dtype=float),
+                 jnp.array(0, dtype=int), jnp.array(0, dtype=int), key)
+
+        # Mini-batches are drawn from the coefficients at the collocation points
+        interface, weights, evaluation = None, None, None
+        if batch_size is not None:
+            if norm_coeff.ndim == 2 and norm_coeff.shape[1] != 1:
+                interface = interface_points(norm_coeff)
+                norm_coeff = interior_coeff(norm_coeff)
+            evaluation = sample_collocation(evaluation_key, colloc, norm_coeff,
+                                            batch_size)
         all_losses = []  # List to store the loss value at each epoch.
         all_epochs = []  # List to store the corresponding epoch numbers.
 
         # Print a message to indicate that training has started.
         print('PINN training started...')
 
-        # Start the training loop, iterate over each epoch of training, which runs for the specified number of epochs.
-        for epoch in range(epochs + 1):
-
-            # Perform a single update step: update the optimizer state and model parameters.
-            opt_state, params = update(opt_state, params, colloc, conds,
-                                       norm_coeff)
-
-            # Compute the current loss value using the updated model parameters.
-            current_loss = loss_fun(params, colloc, conds, norm_coeff)
-
-            # Save the current loss and epoch
-            all_losses.append(current_loss)
-            all_epochs.append(epoch)
-
-            # If the current loss is lower than the best loss encountered so far, update the best parameters and loss.
-            # This ensures that we keep track of the best-performing model during training.
-            if current_loss < best_loss:
-                best_loss = current_loss
-                best_params = params
-                best_epoch = epoch
-
-            # Every 100 epochs, print the current epoch number and the corresponding loss value.
+        # Start the training loop, which runs the epochs 0 to `epochs` in chunks of equal length.
+        length = min(chunk_size, epochs + 1)
+        for first in range(0, epochs + 1, length):
+            if batch_size is not None and sampling == 'residual':
+                weights = jnp.asarray(
+                    residual_weights(carry[0], colloc, norm_coeff, interface))
+            carry, losses = train_chunk(carry, colloc, conds, norm_coeff,
+                                        weights, evaluation, epochs, length,
+                                        batch_size)
+
+            # Save the losses and epochs of the chunk (one transfer from the device)
+            losses = list(np.asarray(losses)[:epochs + 1 - first])
+            all_losses.extend(losses)
+            all_epochs.extend(range(first, first + len(losses)))
+
+            # At the start of every chunk, print the epoch number and the corresponding loss value.
             # This provides a progress update during the training process.
-            if epoch % 100 == 0:
-                print(f'   Epoch={epoch}\t loss={current_loss:.3e}')
+            print(f'   Epoch={first}\t loss={losses[0]:.3e}')
+
+        _, _, best_params, best_loss, best_epoch, _, _ = carry
+        best_epoch = int(best_epoch)
 
         # After training loop, print the best epoch, and loss
         # This provides information about the best-performing model.
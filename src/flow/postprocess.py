@@ -0,0 +1,160 @@
+"""
+Post-processing of 2D Darcy flow solutions: face fluxes, Darcy velocities,
+outlet flux, upscaled permeability and tortuosity, computed with NumPy slicing.
+
+The functions take a pressure field at the nodes, indexed [i, j] with i along
+y and j along x like ``np.meshgrid(x, y)``, so they work on the output of
+`fd_solver.solve_flow_2d` and on PINN predictions reshaped to the grid (for
+example ``neural_net(params, X.reshape(-1, 1), Y.reshape(-1, 1)).reshape(X.shape)``).
+Flow is along x, from the left (x = 0) to the right (x = 1) column.
+"""
+
+# Fluxes use the same harmonic face coefficients as the finite-difference solver.
+import numpy as np
+
+from flow.fd_solver import face_fluxes
+
+
+def darcy_velocity(pressure, coeff, dx, dy):
+    """
+    Computes the Darcy velocity at the nodes as the mean of the fluxes on the
+    faces on both sides of every node (the single face on the boundaries).
+
+    Args:
+        pressure (np.ndarray): A 2D array of pressures at the nodes (NaN for eliminated nodes).
+        coeff (np.ndarray): A 2D array of flow coefficients (k * rho / mu) at the nodes.
+        dx (float): Node spacing along x.
+        dy (float): Node spacing along y.
+
+    Returns:
+        tuple: Contains the x and y components of the velocity.
+            - u: Array (same shape as `pressure`) of velocities along x.
+            - v: Array (same shape as `pressure`) of velocities along y.
+    """
+    q_x, q_y = face_fluxes(pressure, coeff, dx, dy)
+
+    u = np.zeros(np.shape(pressure))
+    u[:, :-1] += q_x
+    u[:, 1:] += q_x
+    u[:, 1:-1] /= 2
+
+    v = np.zeros(np.shape(pressure))
+    v[:-1, :] += q_y
+    v[1:, :] += q_y
+    v[1:-1, :] /= 2
+    return u, v
+
+
+def velocity_magnitude(u, v):
+    """
+    Computes the magnitude of the velocity at the nodes.
+
+    Args:
+        u (np.ndarray): Velocities along x.
+        v (np.ndarray): Velocities along y.
+
+    Returns:
+        np.ndarray: Array of the velocity magnitudes, sqrt(u^2 + v^2).
+    """
+    return np.hypot(u, v)
+
+
+def column_fluxes(q_x, dy):
+    """
+    Integrates the x face fluxes over every column of faces (trapezoidal rule
+    along y). For a converged solution all columns carry the same flux.
+
+    Args:
+        q_x (np.ndarray): Array of shape (ny, nx - 1) of fluxes on the x faces.
+        dy (float): Node spacing along y.
+
+    Returns:
+        np.ndarray: Array of nx - 1 flow rates (per unit depth) through the columns of faces.
+    """
+    weights = np.full(len(q_x), dy)
+    weights[[0, -1]] *= 0.5
+    return weights @ q_x
+
+
+def upscaled_permeability(pressure, coeff, dx, dy, rho=1.0, mu=1.0):
+    """
+    Computes the effective permeability of the domain along x from Darcy's
+    law, k = Q * mu * L / (rho * W * (P_left - P_right)), where Q is the mean
+    flow rate through the columns of faces and L and W are the length and
+    width of the domain. With the default `rho` and `mu`, the result is the
+    effective flow coefficient (same units as `coeff`).
+
+    Args:
+        pressure (np.ndarray): A 2D array of pressures at the nodes (NaN for eliminated nodes).
+        coeff (np.ndarray): A 2D array of flow coefficients (k * rho / mu) at the nodes.
+        dx (float): Node spacing along x.
+        dy (float): Node spacing along y.
+        rho (float): Density of the fluid used in `coeff`. Default is 1.0.
+        mu (float): Dynamic viscosity of the fluid used in `coeff`. Default is 1.0.
+
+    Returns:
+        float: The upscaled permeability.
+    """
+    pressure = np.asarray(pressure, dtype=float)
+    ny, nx = pressure.shape
+    q_x, _ = face_fluxes(pressure, coeff, dx, dy)
+
+    # Mean of the boundary pressures, which are not exact for PINN outputs
+    pressure_drop = np.nanmean(pressure[:, 0]) - np.nanmean(pressure[:, -1])
+    flow = column_fluxes(q_x, dy).mean()
+    return flow * mu * (nx - 1) * dx / (rho * (ny - 1) * dy * pressure_drop)
+
+
+def tortuosity(u, v, mask=None):
+    """
+    Computes the hydraulic tortuosity, the ratio of the mean velocity
+    magnitude to the mean velocity along the flow direction (x), which is 1
+    for straight streamlines.
+
+    Args:
+        u (np.ndarray): Velocities along x.
+        v (np.ndarray): Velocities along y.
+        mask (np.ndarray): Boolean array, True for the nodes to average over (for example the
+            pore space). Default is None (all nodes).
+
+    Returns:
+        float: The tortuosity.
+    """
+    if mask is None:
+        mask = np.ones(np.shape(u), dtype=bool)
+    return velocity_magnitude(u, v)[mask].sum() / u[mask].sum()
+
+
+def flow_metrics(pressure, coeff, dx, dy, rho=1.0, mu=1.0, mask=None):
+    """
+    Computes the summary flow metrics used to compare micromodels against XCT
+    samples.
+
+    Args:
+        pressure (np.ndarray): A 2D array of pressures at the nodes (NaN for eliminated nodes).
+        coeff (np.ndarray): A 2D array of flow coefficients (k * rho / mu) at the nodes.
+        dx (float): Node spacing along x.
+        dy (float): Node spacing along y.
+        rho (float): Density of the fluid used in `coeff`. Default is 1.0.
+        mu (float): Dynamic viscosity of the fluid used in `coeff`. Default is 1.0.
+        mask (np.ndarray): Nodes to average the tortuosity over (see `tortuosity`).
+            Default is None (all nodes).
+
+    Returns:
+        dict: Dictionary with keys 'permeability' (see `upscaled_permeability`), 'outlet_flux'
+            (flow rate through the last column of faces), 'tortuosity', 'mean_velocity' and
+            'max_velocity' (mean and maximum velocity magnitude over `mask`).
+    """
+    q_x, _ = face_fluxes(pressure, coeff, dx, dy)
+    u, v = darcy_velocity(pressure, coeff, dx, dy)
+    speed = velocity_magnitude(u, v)
+    if mask is None:
+        mask = np.ones(speed.shape, dtype=bool)
+    return {
+        'permeability': upscaled_permeability(pressure, coeff, dx, dy, rho,
+                                              mu),
+        'outlet_flux': column_fluxes(q_x, dy)[-1],
+        'tortuosity': tortuosity(u, v, mask),
+        'mean_velocity': speed[mask].mean(),
+        'max_velocity': speed[mask].max()
+    }
@@ -0,0 +1,196 @@
+"""
+Linear solver backends for the sparse pressure systems of the flow package:
+direct solves (SciPy SuperLU or the optional PARDISO through `pypardiso`) and
+preconditioned Krylov solvers (CG or BiCGSTAB with algebraic multigrid,
+incomplete LU or Jacobi preconditioning).
+"""
+
+# `scipy.sparse.linalg` provides the direct and Krylov solvers.
+import time
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+# Optional backends (`pip install pore2chip[extras]` installs pypardiso)
+try:
+    import pyamg
+except ImportError:
+    pyamg = None
+try:
+    import pypardiso
+except ImportError:
+    pypardiso = None
+
+SOLVERS = ['direct', 'pardiso', 'cg', 'bicgstab']
+PRECONDITIONERS = [None, 'jacobi', 'ilu', 'amg']
+
+
+def build_preconditioner(A, preconditioner):
+    """
+    Builds a preconditioner for a Krylov solver.
+
+    Args:
+        A (scipy.sparse matrix): The system matrix.
+        preconditioner (str): None, 'jacobi' (inverse diagonal), 'ilu' (incomplete LU
+            with `spilu`) or 'amg' (classical algebraic multigrid V-cycle, requires `pyamg`).
+
+    Returns:
+        scipy.sparse.linalg.LinearOperator: The preconditioner, or None if `preconditioner` is None.
+    """
+    if preconditioner is None:
+        return None
+
+    # Inverse of the diagonal (zero diagonal entries are left unscaled)
+    if preconditioner == 'jacobi':
+        diagonal = A.diagonal()
+        inverse = np.where(diagonal != 0, 1 / np.where(diagonal != 0,
+                                                       diagonal, 1), 1)
+        return spla.LinearOperator(A.shape, matvec=lambda x: inverse * x)
+
+    # Incomplete LU factorization
+    if preconditioner == 'ilu':
+        factor = spla.spilu(A.tocsc(), drop_tol=1e-5, fill_factor=20)
+        return spla.LinearOperator(A.shape, matvec=factor.solve)
+
+    # One classical (Ruge-Stuben) multigrid V-cycle per application, which
+    # copes with the large permeability contrasts better than aggregation
+    if preconditioner == 'amg':
+        if pyamg is None:
+            raise ImportError("The 'amg' preconditioner requires pyamg")
+        return pyamg.ruge_stuben_solver(A.tocsr()).aspreconditioner(cycle='V')
+
+    raise ValueError("Invalid preconditioner: %s" % preconditioner)
+
+
+def _direct_solve(A, b, solver):
+    """
+    Helper function for solve_linear_system(). Solves with PARDISO if
+    requested and available, otherwise with SciPy's SuperLU.
+    """
+    if solver == 'pardiso' and pypardiso is not None:
+        return pypardiso.spsolve(A.tocsr(), b), 'pardiso'
+    return spla.spsolve(A.tocsc(), b), 'direct'
+
+
+def solve_linear_system(A,
+                        b,
+                        solver='direct',
+                        preconditioner=None,
+                        tol=1e-10,
+                        maxiter=1000,
+                        x0=None,
+                        fallback=True,
+                        record_residuals=False):
+    """
+    Solves the sparse system A x = b with the selected backend and reports the
+    number of iterations and time-to-solution (and the convergence history on
+    request).
+
+    CG requires a symmetric positive definite matrix (for example the systems
+    of `fd_solver.assemble_fd_system`). BiCGSTAB also works on nonsymmetric
+    matrices. If the selected backend is not installed, or if a Krylov solver
+    does not converge, the system is solved directly when `fallback` is True.
+
+    Args:
+        A (scipy.sparse matrix): The system matrix.
+        b (np.ndarray): The load vector.
+        solver (str): 'direct' (SuperLU), 'pardiso' (requires `pypardiso`), 'cg' or 'bicgstab'.
+            Default is 'direct'.
+        preconditioner (str): Preconditioner of the Krylov solvers: None, 'jacobi', 'ilu' or 'amg'.
+            Default is None.
+        tol (float): Relative residual norm ||b - A x|| / ||b|| at which the Krylov solvers stop.
+            Default is 1e-10.
+        maxiter (int): Maximum number of Krylov iterations. Default is 1000.
+        x0 (np.ndarray): Initial guess of the Krylov solvers. Default is None (zeros).
+        fallback (boolean): If True, falls back to a direct solve when the selected backend is not
+            available or does not converge. Default is True.
+        record_residuals (boolean): If True, records the relative residual norm after every Krylov
+            iteration, at the cost of an extra matrix-vector product per iteration (included in
+            'solve_time'). Default is False.
+
+    Returns:
+        tuple: Contains the solution and a dictionary with the solver report.
+            - x: The solution vector.
+            - info: Dictionary with keys 'solver' (backend that produced x), 'preconditioner',
+              'converged' (False if the Krylov solver stopped at `maxiter`), 'iterations',
+              'residuals' (relative residual norm after each iteration if `record_residuals` is
+              True, otherwise empty), 'residual' (final
+              relative residual norm), 'setup_time' and 'solve_time' (seconds), and 'fallback'
+              (True if the direct solve was used instead).
+    """
+    if solver not in SOLVERS:
+        raise ValueError("Invalid solver: %s" % solver)
+    if preconditioner not in PRECONDITIONERS:
+        raise ValueError("Invalid preconditioner: %s" % preconditioner)
+
+    A = sp.csr_matrix(A)
+    b = np.asarray(b, dtype=float)
+    b_norm = np.linalg.norm(b)
+    if b_norm == 0:
+        b_norm = 1.0
+    info = {
+        'solver': solver,
+        'preconditioner': preconditioner,
+        'converged': True,
+        'iterations': 0,
+        'residuals': [],
+        'residual': None,
+        'setup_time': 0.0,
+        'solve_time': 0.0,
+        'fallback': False
+    }
+
+    if solver == 'pardiso' and pypardiso is None and not fallback:
+        raise ImportError("The 'pardiso' solver requires pypardiso")
+
+    # Nothing to solve (for example no spanning pore space)
+    if A.shape[0] == 0:
+        info['residual'] = 0.0
+        return np.zeros(0), info
+
+    if solver in ['direct', 'pardiso']:
+        info['preconditioner'] = None
+        start = time.perf_counter()
+        x, info['solver'] = _direct_solve(A, b, solver)
+        info['solve_time'] = time.perf_counter() - start
+        info['fallback'] = info['solver'] != solver
+    else:
+        # Preconditioner setup
+        start = time.perf_counter()
+        try:
+            M = build_preconditioner(A, preconditioner)
+        except (ImportError, RuntimeError):
+            # Backend not installed or factorization failed (singular matrix)
+            if not fallback:
+                raise
+            M = None
+            info['preconditioner'] = None
+            info['fallback'] = True
+        info['setup_time'] = time.perf_counter() - start
+
+        # Count the iterations (and record the relative residual norm)
+        def record(xk):
+            info['iterations'] += 1
+            if record_residuals:
+                info['residuals'].append(np.linalg.norm(b - A @ xk) / b_norm)
+
+        krylov = spla.cg if solver == 'cg' else spla.bicgstab
+        start = time.perf_counter()
+        x, flag = krylov(A,
+                         b,
+                         x0=x0,
+                         rtol=tol,
+                         maxiter=maxiter,
+                         M=M,
+                         callback=record)
+        info['solve_time'] = time.perf_counter() - start
+        info['converged'] = flag == 0
+
+        if flag != 0 and fallback:
+            start = time.perf_counter()
+            x, info['solver'] = _direct_solve(A, b, 'direct')
+            info['solve_time'] += time.perf_counter() - start
+            info['fallback'] = True
+
+    info['residual'] = np.linalg.norm(b - A @ x) / b_norm
+    return x, info
@@ -0,0 +1,266 @@
+"""
+Functions to cache generated networks and exported designs on disk.
+"""
+
+import os
+import inspect
+import hashlib
+import tempfile
+import numpy as np
+
+from pore2chip.generate import generate_network
+from pore2chip.export import network2svg, network2dxf
+from pore2chip.io import save_network, load_network
+
+# Bump when generation or export output changes for the same inputs, so old
+# cache entries are no longer used
+_CACHE_VERSION = 2
+
+
+def _hash_value(digest, value):
+    r"""
+    Helper function for cache_key(). Adds one input value to a hash.
+    Arrays and lists are hashed by dtype, shape and content, dicts by their
+    sorted items and anything else by its repr.
+    """
+    if isinstance(value, dict) or hasattr(value, 'keys'):
+        digest.update(b'dict')
+        for key in sorted(value.keys()):
+            digest.update(str(key).encode())
+            _hash_value(digest, value[key])
+    elif isinstance(value, (list, tuple, np.ndarray)):
+        array = np.ascontiguousarray(value)
+        if array.dtype == object:
+            digest.update(repr(array.tolist()).encode())
+        else:
+            digest.update(str(array.dtype).encode() +
+                          str(array.shape).encode())
+            digest.update(array.tobytes())
+    else:
+        digest.update(repr(value).encode())
+
+
+def cache_key(function_name, arguments):
+    r"""
+    Compute the content address of a cached result: a SHA-256 digest of the
+    function name, the cache version and every input value.
+
+    Args:
+        function_name (str): Name of the cached function
+        arguments (dict): Input values by argument name
+
+    Returns:
+        str: Hexadecimal digest
+    """
+    digest = hashlib.sha256()
+    digest.update(('%s:%d' % (function_name, _CACHE_VERSION)).encode())
+    for name in sorted(arguments):
+        digest.update(name.encode())
+        _hash_value(digest, arguments[name])
+    return digest.hexdigest()
+
+
+def _bind(function, args, kwargs):
+    r"""
+    Helper function that returns every argument of a call by name, including
+    defaults
+    """
+    bound = inspect.signature(function).bind(*args, **kwargs)
+    bound.apply_defaults()
+    return dict(bound.arguments)
+
+
+def _lookup(cache_dir, key, extension):
+    r"""
+    Helper function that returns the path of a cache entry if it exists and
+    marks it as recently used
+    """
+    path = os.path.join(cache_dir, key + extension)
+    if not os.path.exists(path):
+        return None
+    os.utime(path)
+    return path
+
+
+def _store(cache_dir, key, extension, write):
+    r"""
+    Helper function that writes a cache entry atomically (``write`` is called
+    with a temporary file name) and returns its path
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + extension)
+    handle, tmp_name = tempfile.mkstemp(suffix=extension, dir=cache_dir)
+    os.close(handle)
+    try:
+        write(tmp_name)
+        os.replace(tmp_name, path)
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+    return path
+
+
+def evict(cache_dir, max_bytes):
+    r"""
+    Remove the least recently used entries of a cache directory until its
+    total size is at most ``max_bytes``.
+
+    Args:
+        cache_dir (str): Cache directory
+        max_bytes (int): Largest total size of the cache in bytes
+
+    Returns:
+        int: Number of removed entries
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Already removed by another process
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def cached_generate_network(*args,
+                            cache_dir='pore2chip_cache',
+                            max_bytes=2**30,
+                            **kwargs):
+    r"""
+    Call ``generate.generate_network`` through a disk cache. The result is
+    stored as an .npz file (see ``io.save_network``) addressed by a hash of
+    all inputs (sizes, statistics, options and seed), so the same request is
+    loaded from disk instead of being generated again. The least recently used entries are
+    removed when the cache grows above ``max_bytes``.
+
+    Calls with an ``np.random.Generator`` as ``rng`` are not cached (the
+    result depends on the generator state).
+
+    Args:
+        *args: Positional arguments of ``generate_network``
+        cache_dir (str): Cache directory. Default is 'pore2chip_cache'.
+        max_bytes (int): Largest total size of the cache in bytes. Default is 1 GiB.
+        **kwargs: Keyword arguments of ``generate_network``
+
+    Returns:
+        openpnm.network.Network: Generated network with all pore and throat arrays (and the
+            middle pores if ``return_middle_pores`` is True). A network loaded from the cache
+            has no geometry models attached.
+    """
+    arguments = _bind(generate_network, args, kwargs)
+    if isinstance(arguments['rng'], np.random.Generator):
+        return generate_network(*args, **kwargs)
+
+    key = cache_key('generate_network', arguments)
+    path = _lookup(cache_dir, key, '.npz')
+    if path is None:
+        result = generate_network(*args, **kwargs)
+        if result is None:
+            return None
+        if arguments['return_middle_pores']:
+            network, middle_pores = result
+        else:
+            network, middle_pores = result, None
+        _store(cache_dir, key, '.npz',
+               lambda name: save_network(
+                   network, name, middle_pores, compact=False))
+        evict(cache_dir, max_bytes)
+        return result
+
+    network, middle_pores = load_network(path, return_middle_pores=True)
+    if arguments['return_middle_pores']:
+        return network, middle_pores
+    return network
+
+
+def _cached_export(function, extension, write, fl_name, args, kwargs,
+                   cache_dir, max_bytes):
+    r"""
+    Helper function for cached_network2svg() and cached_network2dxf(). Copies
+    a cached design to ``fl_name``, or exports it and stores it first.
+    """
+    arguments = _bind(function, args, kwargs)
+    rng = arguments['rng']
+    if rng is None or isinstance(rng, np.random.Generator):
+        # Designs drawn from a global or shared random state are not
+        # reproducible from the inputs alone
+        write(function(*args, **kwargs), fl_name)
+        return fl_name
+
+    key = cache_key(function.__name__, arguments)
+    path = _lookup(cache_dir, key, extension)
+    if path is None:
+        design = function(*args, **kwargs)
+        if design is None:
+            return None
+        path = _store(cache_dir, key, extension,
+                      lambda name: write(design, name))
+
+    with open(path, 'rb') as source, open(fl_name, 'wb') as target:
+        target.write(source.read())
+    evict(cache_dir, max_bytes)
+    return fl_name
+
+
+def cached_network2svg(svg_fl_name,
+                       *args,
+                       cache_dir='pore2chip_cache',
+                       max_bytes=2**30,
+                       **kwargs):
+    r"""
+    Call ``export.network2svg`` through a disk cache and save the design to
+    ``svg_fl_name``. The SVG is addressed by a hash of the network arrays and
+    all drawing options, including the seed given as ``rng``. Calls without
+    an integer ``rng`` draw from a random state that is not part of the
+    inputs and are exported without caching.
+
+    Args:
+        svg_fl_name (str): Path of the SVG file to write (including extension).
+        *args: Positional arguments of ``network2svg``
+        cache_dir (str): Cache directory. Default is 'pore2chip_cache'.
+        max_bytes (int): Largest total size of the cache in bytes. Default is 1 GiB.
+        **kwargs: Keyword arguments of ``network2svg``
+
+    Returns:
+        str: ``svg_fl_name``, or None if the export failed
+    """
+    return _cached_export(network2svg, '.svg',
+                          lambda design, name: design.save_svg(name),
+                          svg_fl_name, args, kwargs, cache_dir, max_bytes)
+
+
+def cached_network2dxf(dxf_fl_name,
+                       *args,
+                       cache_dir='pore2chip_cache',
+                       max_bytes=2**30,
+                       **kwargs):
+    r"""
+    Call ``export.network2dxf`` through a disk cache and save the design to
+    ``dxf_fl_name``. Works like ``cached_network2svg``.
+
+    Args:
+        dxf_fl_name (str): Path of the DXF file to write (including extension).
+        *args: Positional arguments of ``network2dxf``
+        cache_dir (str): Cache directory. Default is 'pore2chip_cache'.
+        max_bytes (int): Largest total size of the cache in bytes. Default is 1 GiB.
+        **kwargs: Keyword arguments of ``network2dxf``
+
+    Returns:
+        str: ``dxf_fl_name``, or None if the export failed
+    """
+    return _cached_export(network2dxf, '.dxf',
+                          lambda design, name: design.saveas(name),
+                          dxf_fl_name, args, kwargs, cache_dir, max_bytes)
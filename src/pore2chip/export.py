@@ -5,7 +5,148 @@ Functions to create SVG and DXF files from network .
 import numpy as np
 import drawsvg as dr
 import math
+import os
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import ezdxf
+from ezdxf.addons import r12writer
+from ezdxf.addons.r12writer import R12FastStreamWriter
+import cv2 as cv
+
+
+def _random_source(rng):
+    r"""
+    Random source of the export functions: the global ``np.random`` module
+    when ``rng`` is None, otherwise ``np.random.default_rng(rng)``
+    """
+    if rng is None or rng is np.random:
+        return np.random
+    return np.random.default_rng(rng)
+
+
+def _blob_control_points(radii, rand_radii):
+    r"""
+    Bézier points of the blob pores drawn by ``network2svg``, for all pores
+    at once. Point i of a blob lies on its radius at angle 45i degrees, its
+    control point on the randomized radius at angle 45i - 20 degrees.
+
+    Args:
+        radii (array): Array of N blob radii
+        rand_radii (array): (N, 9) array of randomized control point radii
+
+    Returns:
+        numpy array: (N, 9, 4) array of points (x, y, mx, my) relative to the blob centers
+    """
+    angles = (np.pi / 4) * np.arange(9)
+    control_angles = angles - math.radians(20)
+    points = np.empty((len(radii), 9, 4))
+    points[:, :, 0] = np.cos(angles) * radii[:, None]
+    points[:, :, 1] = np.sin(angles) * radii[:, None]
+    points[:, :, 2] = np.cos(control_angles) * rand_radii
+    points[:, :, 3] = np.sin(control_angles) * rand_radii
+    return points
+
+
+def _blob_path_data(points):
+    r"""
+    SVG path data of blob pores: a move (M) to point 0, a quadratic curve (Q)
+    to point 1 and smooth quadratic curves (T) through points 2 to 8.
+
+    Args:
+        points (array): (N, 9, 4) array returned by _blob_control_points()
+
+    Returns:
+        list: N path data strings
+    """
+    values = np.concatenate(
+        [points[:, 0, :2], points[:, 1, 2:], points[:, 1, :2],
+         points[:, 2:, :2].reshape(len(points), -1)],
+        axis=1)
+    path_format = 'M%.3f,%.3f Q%.3f,%.3f,%.3f,%.3f ' + ' '.join(
+        ['T%.3f,%.3f'] * 7)
+    return [path_format % tuple(row) for row in values.tolist()]
+
+
+def _svg_throat_points(start, end, throat_diameter):
+    r"""
+    Number of circles drawn along each throat by ``network2svg`` and
+    ``network2array``: one circle per throat diameter of length, plus half as
+    many again for overlap. Throats with a NaN or zero diameter get none.
+
+    Args:
+        start (array): (K, 2) array of throat start points
+        end (array): (K, 2) array of throat end points
+        throat_diameter (array): Array of K throat diameters
+
+    Returns:
+        numpy array: Number of circles for each throat
+    """
+    valid = np.isfinite(throat_diameter) & (throat_diameter > 0)
+    length = np.linalg.norm(end - start, axis=1) / np.where(
+        valid, throat_diameter, 1)
+    num_throat_points = np.ceil(np.where(valid, length, 0)).astype(int)
+    return num_throat_points + np.round(num_throat_points / 2).astype(int)
+
+
+def _throat_circles(start,
+                    end,
+                    throat_diameter,
+                    num_throat_points,
+                    throat_random=1,
+                    rand=np.random):
+    r"""
+    Compute the circles that make up the throats of a design in one pass.
+    Circles are spaced evenly from the start point of each throat and shifted
+    perpendicular to the throat by a random amount of up to one throat radius
+    (scaled by ``throat_random``). Throats with a NaN or zero diameter have no
+    circles. The output is shared by the SVG, DXF and array backends.
+
+    Args:
+        start (array): (K, 2) array of throat start points
+        end (array): (K, 2) array of throat end points
+        throat_diameter (array): Array of K throat diameters
+        num_throat_points (array): Number of circles for each throat
+        throat_random (int): Multiplier that decides how random the throat shape will be.
+            A value of 0 makes the throats straight. Default is 1.
+        rand: ``np.random`` module (default) or ``np.random.Generator``
+
+    Returns:
+        tuple: Arrays with the throat index, center (x, y) and radius of every
+            circle, and the base point of each circle before the random shift
+    """
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    throat_diameter = np.asarray(throat_diameter, dtype=float)
+    num_throat_points = np.asarray(num_throat_points, dtype=int)
+
+    # Throats without a diameter have no circles
+    valid = np.isfinite(throat_diameter) & (throat_diameter > 0)
+    num_throat_points = np.where(valid, num_throat_points, 0)
+
+    # Distance between circle base points along each throat
+    segment = (end - start) / np.maximum(num_throat_points, 1)[:, None]
+
+    throat = np.repeat(np.arange(len(start)), num_throat_points)
+    step = np.arange(len(throat)) - np.repeat(
+        np.cumsum(num_throat_points) - num_throat_points, num_throat_points)
+    base_points = start[throat] + segment[throat] * step[:, None]
+
+    # Random side of the throat and random shift for every circle
+    radii = throat_diameter[throat] / 2
+    if rand is np.random:
+        direction = np.random.randint(0, 2, size=len(throat))
+    else:
+        direction = rand.integers(0, 2, size=len(throat))
+    random_shift = rand.uniform(-radii, radii) * throat_random
+    random_shift[direction == 1] *= -1
+
+    perp_vector = np.stack([segment[:, 1], -segment[:, 0]],
+                           axis=-1) / np.where(valid, throat_diameter,
+                                               1)[:, None]
+    centers = base_points + perp_vector[throat] * random_shift[:, None]
+
+    return throat, centers, radii, base_points
 
 
 def network2svg(
@@ -22,7 +163,8 @@ def network2svg(
     no_throats=False,
     middle_pores=None,
     disconnected=None,
-    throat_vector_thres=None): # Boolean to draw perp. lines for throat placement (debugging) 
+    throat_vector_thres=None,
+    rng=None): # Boolean to draw perp. lines for throat placement (debugging) 
 
     r"""
 
@@ -48,6 +190,8 @@ def network2svg(
         middle_pores (array): Array or pore indices that indicate the center channel for debugging
             Renders the middle pores in green. 
             Also writes pore index number next to dot. Default is None.
+        rng (int, np.random.Generator): Seed or generator for the random draws. Default is None
+            (global ``np.random`` state).
 
       Returns:
         dr.Drawing: A drawSvg drawing object representing the network.
@@ -58,9 +202,19 @@ def network2svg(
 
     # Get the number of pores from the network
     num_pores = len(generated_network['pore.coords'])
+    rand = _random_source(rng)
 
     # Draw each pore based on the specified shape
     if pore_shape == 'blob':
+        # Random radii of the Bézier curve control points (9 per pore)
+        radii = np.asarray(generated_network['pore.diameter'],
+                           dtype=float) / 2
+        rand_radii = radii[:, None] + rand.uniform(
+            -0.4 * radii[:, None], 0.4 * radii[:, None], size=(num_pores, 9))
+
+        # Bézier path data of all blobs
+        paths = _blob_path_data(_blob_control_points(radii, rand_radii))
+
         # Draw each pore as random blobs
         fill_color = 'black'  # Default fill color for pores
         if pore_debug:
@@ -77,51 +231,20 @@ def network2svg(
             # Create a path object to define the pore shape and
             # adjust y-coordinate to match OpenPNM network (drawsvg has different origin)
             if middle_pores is not None and pore_index in middle_pores:
-                p = dr.Path(fill='green',
+                p = dr.Path(paths[pore_index],
+                            fill='green',
                             fill_opacity=1.0,
                             close=True,
                             transform='translate(' + str(x_coord) + ',' +
                             str((-y_coord) + d2) + ')')
             else:
-                p = dr.Path(fill=fill_color,
+                p = dr.Path(paths[pore_index],
+                            fill=fill_color,
                             fill_opacity=1.0,
                             close=True,
                             transform='translate(' + str(x_coord) + ',' +
                             str((-y_coord) + d2) + ')')
 
-            positions = []
-            radius = generated_network['pore.diameter'][pore_index] / 2
-
-            # Generate random positions for Bézier curve control points
-            for i in range(9):
-                rand_radius = radius + np.random.uniform(
-                    -0.4 * radius, 0.4 * radius)
-                positions.append({
-                    'x':
-                    math.cos((math.pi / 4) * i) * radius,
-                    'y':
-                    math.sin((math.pi / 4) * i) * radius,
-                    'mx':
-                    math.cos((math.pi / 4) * i - math.radians(20)) *
-                    rand_radius,
-                    'my':
-                    math.sin((math.pi / 4) * i - math.radians(20)) *
-                    rand_radius
-                })
-
-                # Define Bézier curves to create the blob shape using Move (M), Quadratic Bézier (Q),
-                # and Cubic Bézier (T) commands from the drawsvg library
-                if i == 0:
-                    p.M(positions[i]['x'],
-                        positions[i]['y'])  # Move to starting point
-                elif i == 1:
-                    p.Q(positions[i]['mx'], positions[i]['my'],
-                        positions[i]['x'],
-                        positions[i]['y'])  # Quadratic Bézier curve
-                else:
-                    p.T(positions[i]['x'],
-                        positions[i]['y'])  # Cubic Bézier curve
-
             design.append(p)  # Add the pore path to the SVG design
             if pore_debug:
                 design.append(
@@ -181,164 +304,245 @@ def network2svg(
     # Check if 'throat.conns' data exists in the network
     if generated_network.get(
             'throat.conns') is not None and no_throats == False:
-        # Get the number of throats
-        #num_throats = len(generated_network['throat.all']) #This might be a bug
-        num_throats = len(generated_network['throat.conns'])
-
-        for throat_index in range(num_throats):
-            # Get the indices of the pores connected by the throat
-            pore1 = generated_network['throat.conns'][throat_index][0]
-            pore2 = generated_network['throat.conns'][throat_index][1]
-
-            # Get the coordinates of the connected pores
-            pore1_x = generated_network['pore.coords'][pore1][0] * (d1 / n1)
-            pore1_y = generated_network['pore.coords'][pore1][1] * (d2 / n2)
-            pore2_x = generated_network['pore.coords'][pore2][0] * (d1 / n1)
-            pore2_y = generated_network['pore.coords'][pore2][1] * (d2 / n2)
-
-            # Convert coordinates to match the SVG coordinate system
-            pore1_coords = [pore1_x, (-pore1_y) + d2]
-            pore2_coords = [pore2_x, (-pore2_y) + d2]
-
-            # If small throats are vectors
-            if throat_vector_thres is not None:
-                if generated_network['throat.diameter'][throat_index] < throat_vector_thres:
-                    design.append(
-                        dr.Line(pore1_coords[0],
-                                pore1_coords[1],
-                                pore2_coords[0],
-                                pore2_coords[1],
-                                stroke='red',
-                                stroke_width=1))
-                    continue
-
-            # Distance between the two pores
-            distance = math.dist(pore1_coords, pore2_coords)
-
-            # Skip if the throat diameter is not defined
-            if math.isnan(generated_network['throat.diameter'][throat_index]):
-                continue
-
-            # Calculate the number of points (circles) in the throat
-            num_throat_points = math.ceil(
-                distance /
-                (generated_network['throat.diameter'][throat_index]))
-            num_throat_points += round(num_throat_points / 2)
-
-            # Calculate the segment distances and magnitude
-            x_segment = (pore2_coords[0] - pore1_coords[0]) / num_throat_points
-            y_segment = (pore2_coords[1] - pore1_coords[1]) / num_throat_points
-            magnitude = 2 * (
-                generated_network['throat.diameter'][throat_index] / 2)
-
-            # Loop to create each circle representing the throat
-            for i in range(num_throat_points):
-                # Base point for each circle
-                base_point = [
-                    pore1_coords[0] + (x_segment * i),
-                    pore1_coords[1] + (y_segment * i)
-                ]
-
-                # Randomly decide the direction of the perpendicular vector
-                direction = np.random.randint(0, 2)
-                perp_vector = [0, 0]
-
-                if direction == 0:
-                    # Set perpendicular vector in the y-direction
-                    perp_vector = [
-                        y_segment / magnitude, -x_segment / magnitude
-                    ]
-                else:
-                    # Set perpendicular vector in the x-direction
-                    perp_vector = [
-                        -y_segment / magnitude, x_segment / magnitude
-                    ]
-
-                # Random shift based on throat diameter and throat_random parameter
-                throat_radius = generated_network['throat.diameter'][
-                    throat_index] / 2
-                random_shift = np.random.uniform(-throat_radius,
-                                                 throat_radius) * throat_random
-                perp_vector[0] *= random_shift
-                perp_vector[1] *= random_shift
-
-                # Calculate new position for the circle
-                x_new = base_point[0] + perp_vector[0]
-                y_new = base_point[1] + perp_vector[1]
-
-                # Add the circle to the design
-                throat_fill = 'black'
-                if disconnected is not None:
-                    if pore1 in disconnected or pore2 in disconnected:
-                        throat_fill = 'red'
-
+        conns = np.asarray(generated_network['throat.conns'], dtype=int)
+        throat_diameter = np.asarray(generated_network['throat.diameter'],
+                                     dtype=float)
+
+        # Pore coordinates converted to the SVG coordinate system
+        coords = np.asarray(generated_network['pore.coords'], dtype=float)
+        svg_coords = np.stack(
+            [coords[:, 0] * (d1 / n1), -coords[:, 1] * (d2 / n2) + d2],
+            axis=-1)
+        start = svg_coords[conns[:, 0]]
+        end = svg_coords[conns[:, 1]]
+
+        # If small throats are vectors
+        vector = np.zeros(len(conns), dtype=bool)
+        if throat_vector_thres is not None:
+            vector = throat_diameter < throat_vector_thres
+            for p1, p2 in zip(start[vector], end[vector]):
                 design.append(
-                    dr.Circle(x_new,
-                              y_new,
-                              throat_radius,
-                              fill=throat_fill,
-                              fill_opacity=1.0))
+                    dr.Line(p1[0], p1[1], p2[0], p2[1],
+                            stroke='red',
+                            stroke_width=1))
+
+        # Skip throats drawn as vectors and throats without a diameter
+        drawn = np.flatnonzero(~vector & np.isfinite(throat_diameter))
+        throat, centers, radii, base_points = _throat_circles(
+            start[drawn], end[drawn], throat_diameter[drawn],
+            _svg_throat_points(start[drawn], end[drawn],
+                               throat_diameter[drawn]), throat_random, rand)
+        throat = drawn[throat]
+
+        # Throats touching disconnected pores are drawn in red
+        throat_fill = np.full(len(conns), 'black', dtype=object)
+        if disconnected is not None:
+            throat_fill[np.isin(conns, list(disconnected)).any(axis=1)] = 'red'
+
+        # Add the circles to the design
+        for t, center, radius in zip(throat, centers, radii):
+            design.append(
+                dr.Circle(center[0],
+                          center[1],
+                          radius,
+                          fill=throat_fill[t],
+                          fill_opacity=1.0))
 
         # Draw lines for debugging throats (visible only if throat_debug is True)
         if throat_debug:
-            for throat_index in range(num_throats):
-                # Get pore indices connected by the throat
-                pore1 = generated_network['throat.conns'][throat_index][0]
-                pore2 = generated_network['throat.conns'][throat_index][1]
-
-                # Get coordinates of the connected pores
-                pore1_x = generated_network['pore.coords'][pore1][0] * (d1 /
-                                                                        n1)
-                pore1_y = generated_network['pore.coords'][pore1][1] * (d2 /
-                                                                        n2)
-                pore2_x = generated_network['pore.coords'][pore2][0] * (d1 /
-                                                                        n1)
-                pore2_y = generated_network['pore.coords'][pore2][1] * (d2 /
-                                                                        n2)
-
-                # Adjust coordinates for the SVG coordinate system
-                pore1_coords = [pore1_x, (-pore1_y) + d2]
-                pore2_coords = [pore2_x, (-pore2_y) + d2]
-
-                # Draw a red line to represent the connection between pores (throat)
+            # Draw a red line to represent the connection between pores (throat)
+            for p1, p2 in zip(start, end):
                 design.append(
-                    dr.Line(pore1_coords[0],
-                            pore1_coords[1],
-                            pore2_coords[0],
-                            pore2_coords[1],
+                    dr.Line(p1[0],
+                            p1[1],
+                            p2[0],
+                            p2[1],
                             stroke='red',
                             stroke_opacity=0.5,
                             stroke_width=1))
 
-                # Additional debugging for throat_random (visible only if throat_random_debug is True)
-                if throat_random_debug:
-                    for i in range(num_throat_points):
-                        # Base point for the current circle position
-                        base_point = [
-                            pore1_coords[0] + (x_segment * i),
-                            pore1_coords[1] + (y_segment * i)
-                        ]
-
-                        # Calculate the position with the random perpendicular vector applied
-                        x_new = base_point[0] + perp_vector[0]
-                        y_new = base_point[1] + perp_vector[1]
-
-                        # Draw a red line to show the position after applying the random shift
-                        design.append(
-                            dr.Line(base_point[0],
-                                    base_point[1],
-                                    x_new,
-                                    y_new,
-                                    stroke='red',
-                                    stroke_width=1))
+            # Show the random shift of every throat circle from its base point
+            if throat_random_debug:
+                for base_point, center in zip(base_points, centers):
+                    design.append(
+                        dr.Line(base_point[0],
+                                base_point[1],
+                                center[0],
+                                center[1],
+                                stroke='red',
+                                stroke_width=1))
 
     return design
 
 
+def _svg_elements(pore_centers,
+                  pore_radii,
+                  throat_start,
+                  throat_end,
+                  throat_diameter,
+                  pore_shape,
+                  throat_random,
+                  throat_vector_thres=None,
+                  rand=np.random):
+    r"""
+    Helper function for network2svg_stream() and network2tiles(). Generates
+    the SVG text of the given pores and throats, in SVG coordinates, one
+    element at a time. The pores are drawn first, then the throats.
+    """
+    if pore_shape == 'blob':
+        # Same draws and Bézier commands as network2svg
+        rand_radii = pore_radii[:, None] + rand.uniform(
+            -0.4 * pore_radii[:, None],
+            0.4 * pore_radii[:, None],
+            size=(len(pore_radii), 9))
+        paths = _blob_path_data(_blob_control_points(pore_radii, rand_radii))
+        for center, path in zip(pore_centers, paths):
+            yield ('<path d="%s Z" fill="black" '
+                   'transform="translate(%.3f,%.3f)" />\n' %
+                   (path, center[0], center[1]))
+    else:
+        # network2svg draws circle pores with half the pore radius
+        for center, radius in zip(pore_centers, pore_radii):
+            yield ('<circle cx="%.3f" cy="%.3f" r="%.3f" fill="black" />\n' %
+                   (center[0], center[1], radius / 2))
+
+    # If small throats are vectors
+    vector = np.zeros(len(throat_diameter), dtype=bool)
+    if throat_vector_thres is not None:
+        vector = throat_diameter < throat_vector_thres
+        for p1, p2 in zip(throat_start[vector], throat_end[vector]):
+            yield ('<line x1="%.3f" y1="%.3f" x2="%.3f" y2="%.3f" '
+                   'stroke="red" stroke-width="1" />\n' %
+                   (p1[0], p1[1], p2[0], p2[1]))
+
+    # Skip throats drawn as vectors and throats without a diameter
+    drawn = ~vector & np.isfinite(throat_diameter)
+    start = throat_start[drawn]
+    end = throat_end[drawn]
+    throat_diameter = throat_diameter[drawn]
+    num_throat_points = _svg_throat_points(start, end, throat_diameter)
+    _, centers, circle_radii, _ = _throat_circles(start, end, throat_diameter,
+                                                  num_throat_points,
+                                                  throat_random, rand)
+
+    # One group per throat, the circles inherit its fill
+    first = 0
+    for count in num_throat_points:
+        if count == 0:
+            continue
+        circles = [
+            '<circle cx="%.3f" cy="%.3f" r="%.3f" />' % (x, y, r)
+            for (x, y), r in zip(centers[first:first + count],
+                                 circle_radii[first:first + count])
+        ]
+        yield '<g fill="black">%s</g>\n' % ''.join(circles)
+        first += count
+
+
+def network2svg_stream(generated_network,
+                       svg_fl_name,
+                       n1,
+                       n2,
+                       d1,
+                       d2,
+                       pore_shape='blob',
+                       throat_random=1,
+                       no_throats=False,
+                       throat_vector_thres=None,
+                       merge=False,
+                       tolerance=0.5,
+                       rng=None):
+    r"""
+    Write an SVG file of an OpenPNM network without building a drawsvg
+    object tree. Elements are written to the file as they are generated and
+    the circles of each throat share one ``<g>`` group, which keeps memory
+    low and the file small for large chips. The shapes and the
+    ``np.random`` draws are the same as ``network2svg``, so with the same
+    seed both produce the same design.
+
+      Args:
+        generated_network (dict): The OpenPNM network containing pore and throat information.
+        svg_fl_name (str): Path of the SVG file to write (including extension).
+        n1 (int): Number of pores on the x-axis of the model grid
+        n2 (int): Number of pores on the y-axis of the model grid
+        d1 (int): The x length of the SVG image (in pixels).
+        d2 (int): The y length of the SVG image (in pixels).
+        pore_shape (str): Shape of the pore bodies, can be 'blob' or 'circle'. Default is 'blob'.
+        throat_random (int): Multiplier that decides how random the throat shape will be. Default is 1.
+            A value of 0 makes the throats straight.
+        no_throats (boolean): If True, only pore bodies are drawn. Default is False.
+        throat_vector_thres (float): Throats thinner than this are drawn as 1 pixel red lines.
+            Default is None.
+        merge (boolean): If True, pores and throats are merged into simplified polygons
+            (see ``network2polygons``) and written as one path per polygon.
+            ``throat_vector_thres`` is ignored. Default is False.
+        tolerance (float): Simplification tolerance (in pixels) of merged polygons. Default is 0.5.
+        rng (int, np.random.Generator): Seed or generator for the random draws. Default is None
+            (global ``np.random`` state).
+    """
+    if pore_shape not in ['blob', 'circle']:
+        print(
+            'Error: Invalid shape for pore body (Must be \'blob\' or \'circle\')'
+        )
+        return None
+
+    # Pore coordinates converted to the SVG coordinate system
+    coords = np.asarray(generated_network['pore.coords'], dtype=float)
+    svg_coords = np.stack(
+        [coords[:, 0] * (d1 / n1), -coords[:, 1] * (d2 / n2) + d2], axis=-1)
+    radii = np.asarray(generated_network['pore.diameter'], dtype=float) / 2
+
+    with open(svg_fl_name, 'w') as fid:
+        fid.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        fid.write('<svg xmlns="http://www.w3.org/2000/svg" '
+                  'width="%s" height="%s" viewBox="0 0 %s %s">\n' %
+                  (d1, d2, d1, d2))
+
+        if merge:
+            # Holes are cut out of their outer ring by the even-odd rule
+            polygons = network2polygons(generated_network,
+                                        n1,
+                                        n2,
+                                        d1,
+                                        d2,
+                                        pore_shape=pore_shape,
+                                        throat_random=throat_random,
+                                        no_throats=no_throats,
+                                        tolerance=tolerance,
+                                        rng=rng)
+            for rings in polygons:
+                path = ' '.join('M' + ' L'.join('%.3f,%.3f' % (x, y)
+                                                for x, y in ring) + ' Z'
+                                for ring in rings)
+                fid.write('<path d="%s" fill="black" fill-rule="evenodd" />\n'
+                          % path)
+            fid.write('</svg>\n')
+            return None
+
+        if generated_network.get('throat.conns') is not None and not no_throats:
+            conns = np.asarray(generated_network['throat.conns'], dtype=int)
+            throat_start = svg_coords[conns[:, 0]]
+            throat_end = svg_coords[conns[:, 1]]
+            throat_diameter = np.asarray(generated_network['throat.diameter'],
+                                         dtype=float)
+        else:
+            throat_start = throat_end = np.zeros((0, 2))
+            throat_diameter = np.zeros(0)
+
+        for element in _svg_elements(svg_coords, radii, throat_start,
+                                     throat_end, throat_diameter, pore_shape,
+                                     throat_random, throat_vector_thres,
+                                     _random_source(rng)):
+            fid.write(element)
+
+        fid.write('</svg>\n')
+
+
 def network2dxf(
     generated_network,
     throat_random=1,
     no_throats=False,
+    rng=None,
 ):
     r"""
         Create a DXF file from an OpenPNM network. (deprecated)
@@ -351,6 +555,8 @@ def network2dxf(
         generated_network (dict): The OpenPNM network containing pore and throat information.
         throat_random (int): Multiplier that decides how random the throat shape will be. Default is 1.
             A value of 0 makes the throats straight.
+        rng (int, np.random.Generator): Seed or generator for the random draws. Default is None
+            (global ``np.random`` state).
 
       Returns:
         ezdxf.document: An ezdxf document object representing the network.
@@ -362,9 +568,6 @@ def network2dxf(
     # Get the modelspace (the main drawing area) from the document
     modelspace = document.modelspace()
 
-    # Create a hatch object (used to fill closed shapes) with color 7 (default gray)
-    hatch = modelspace.add_hatch(color=7)
-
     # Get the number of pores in the network
     num_pores = len(generated_network['pore.coords'])
 
@@ -394,96 +597,664 @@ def network2dxf(
     # Check if throat connections exist in the network
     if generated_network.get('throat.conns') is not None:
         if no_throats == False:
-            # Get the number of throats in the network
-            num_throats = len(generated_network['throat.conns'])
-
-            # Loop through each throat in the network
-            for throat_index in range(num_throats):
-                # Get the indices of the pores connected by the throat
-                pore1 = generated_network['throat.conns'][throat_index][0]
-                pore2 = generated_network['throat.conns'][throat_index][1]
-
-                # Get the coordinates of the connected pores
-                pore1_x = generated_network['pore.coords'][pore1][0]
-                pore1_y = generated_network['pore.coords'][pore1][1]
-                pore2_x = generated_network['pore.coords'][pore2][0]
-                pore2_y = generated_network['pore.coords'][pore2][1]
-
-                # Set up pore coordinates
-                pore1_coords = [pore1_x, pore1_y]
-                pore2_coords = [pore2_x, pore2_y]
-
-                # Distance between the two pores
-                distance = math.dist(pore1_coords, pore2_coords)
-
-                # Skip if the throat diameter is not defined
-                if math.isnan(
-                        generated_network['throat.diameter'][throat_index]):
-                    continue
-
-                # Calculate the number of points (circles) in the throat
-                # + 2 extra circles for better connectivity
-                num_throat_points = math.ceil(
-                    distance /
-                    (generated_network['throat.diameter'][throat_index])) + 2
-
-                # Calculate the distance between the center of each circle along the path in x and y directions,
-                # and the total magnitude of the distance vector
-                x_segment = (pore2_coords[0] -
-                             pore1_coords[0]) / num_throat_points
-                y_segment = (pore2_coords[1] -
-                             pore1_coords[1]) / num_throat_points
-                magnitude = generated_network['throat.diameter'][throat_index]
-
-                # Loop to create circles representing the throat with random variations
-                for i in range(num_throat_points):
-                    # Calculate the base position for the current circle (along the path between pores)
-                    base_point = [
-                        pore1_coords[0] + (x_segment * i),
-                        pore1_coords[1] + (y_segment * i)
-                    ]
-
-                    # Generate a random direction for the perpendicular vector (affects circle position)
-                    direction = np.random.randint(0, 2)
-                    perp_vector = [0, 0]
-
-                    # Set the perpendicular vector based on the random direction
-                    if direction == 0:
-                        # Clockwise from the throat direction
-                        perp_vector = [
-                            y_segment / magnitude, -x_segment / magnitude
-                        ]
-                    else:
-                        # Counter-clockwise from the throat direction
-                        perp_vector = [
-                            -y_segment / magnitude, x_segment / magnitude
-                        ]
-
-                    # Introduce randomness in the circle position based on throat diameter
-                    throat_radius = generated_network['throat.diameter'][
-                        throat_index] / 2
-                    random_shift = np.random.uniform(
-                        -throat_radius, throat_radius) * throat_random
-
-                    # Apply the random shift to the perpendicular vector
-                    perp_vector[0] *= random_shift
-                    perp_vector[1] *= random_shift
-
-                    # Calculate the final position of the circle (base point + offset from perpendicular vector)
-                    x_new = base_point[0] + perp_vector[0]
-                    y_new = base_point[1] + perp_vector[1]
-
-                    # Add a circle to the modelspace representing the current section of the throat
-                    modelspace.add_circle((x_new, y_new),
-                                          radius=magnitude / 20)
-
-                    # Create a hatch object (likely for defining fill properties) for the circle
-                    hatch = modelspace.add_hatch(color=7)
-
-                    # Add an elliptical hatch for the throat circle
-                    edge_path = hatch.paths.add_edge_path()
-                    edge_path.add_ellipse((x_new, y_new),
-                                          major_axis=(0, magnitude / 20),
-                                          ratio=1)
+            conns = np.asarray(generated_network['throat.conns'], dtype=int)
+            throat_diameter = np.asarray(
+                generated_network['throat.diameter'], dtype=float)
+            coords = np.asarray(generated_network['pore.coords'],
+                                dtype=float)[:, :2]
+
+            # Skip throats without a diameter
+            drawn = np.isfinite(throat_diameter) & (throat_diameter > 0)
+            start = coords[conns[drawn, 0]]
+            end = coords[conns[drawn, 1]]
+            throat_diameter = throat_diameter[drawn]
+
+            # Number of circles per throat
+            # + 2 extra circles for better connectivity
+            num_throat_points = np.ceil(
+                np.linalg.norm(end - start, axis=1) /
+                throat_diameter).astype(int) + 2
+
+            throat, centers, radii, _ = _throat_circles(
+                start, end, throat_diameter, num_throat_points, throat_random,
+                _random_source(rng))
+
+            # Add a hatched circle for every section of the throats, with the
+            # same scaling factor (20) as the pores
+            for center, radius in zip(centers, radii / 10):
+                center = (center[0], center[1])
+                modelspace.add_circle(center, radius=radius)
+                hatch = modelspace.add_hatch(color=7)
+                edge_path = hatch.paths.add_edge_path()
+                edge_path.add_ellipse(center,
+                                      major_axis=(0, radius),
+                                      ratio=1)
 
     return document
+
+
+def _dxf_entities(dxf,
+                  pore_centers,
+                  pore_diameter,
+                  throat_start,
+                  throat_end,
+                  throat_diameter,
+                  throat_random,
+                  fill,
+                  rand=np.random):
+    r"""
+    Helper function for network2dxf_bulk() and network2tiles(). Writes the
+    given pores and throats, with the geometry of network2dxf, to an R12
+    stream writer.
+    """
+    # Same scaling factor (20) as network2dxf
+    centers = [pore_centers]
+    radii = [pore_diameter / 20]
+    layers = [np.full(len(pore_centers), 'PORES', dtype=object)]
+
+    # Skip throats without a diameter
+    drawn = np.isfinite(throat_diameter) & (throat_diameter > 0)
+    start = throat_start[drawn]
+    end = throat_end[drawn]
+    throat_diameter = throat_diameter[drawn]
+
+    # Number of circles per throat
+    # + 2 extra circles for better connectivity
+    num_throat_points = np.ceil(
+        np.linalg.norm(end - start, axis=1) / throat_diameter).astype(int) + 2
+    _, throat_centers, throat_radii, _ = _throat_circles(
+        start, end, throat_diameter, num_throat_points, throat_random, rand)
+
+    centers.append(throat_centers)
+    radii.append(throat_radii / 10)
+    layers.append(np.full(len(throat_centers), 'THROATS', dtype=object))
+
+    centers = np.concatenate(centers)
+    radii = np.concatenate(radii)
+    layers = np.concatenate(layers)
+
+    if fill:
+        # Two half circle arcs (bulge 1) of radius r / 2 and width r cover
+        # the disk of radius r
+        for (x, y), r, layer in zip(centers.tolist(), radii.tolist(), layers):
+            dxf.add_polyline_2d([(x - r / 2, y, 1), (x + r / 2, y, 1)],
+                                format='xyb',
+                                closed=True,
+                                start_width=r,
+                                end_width=r,
+                                layer=layer)
+    else:
+        for center, r, layer in zip(centers.tolist(), radii.tolist(), layers):
+            dxf.add_circle(center, radius=r, layer=layer)
+
+
+def network2dxf_bulk(generated_network,
+                     dxf_fl_name,
+                     throat_random=1,
+                     no_throats=False,
+                     fill=True,
+                     rng=None):
+    r"""
+    Write a DXF file from an OpenPNM network with the same shapes and random
+    draws as ``network2dxf``, but much faster. All geometry is computed as
+    arrays first and the entities are streamed to an R12 DXF file with
+    ``ezdxf.addons.r12writer`` instead of being built one by one in an ezdxf
+    document. Filled circles are written as single closed polylines with
+    width (like the AutoCAD DONUT command) instead of a circle plus a hatch.
+    Pores go on layer 'PORES' and throats on layer 'THROATS'.
+
+      Args:
+        generated_network (dict): The OpenPNM network containing pore and throat information.
+        dxf_fl_name (str): Path of the DXF file to write (including extension).
+        throat_random (int): Multiplier that decides how random the throat shape will be. Default is 1.
+            A value of 0 makes the throats straight.
+        no_throats (boolean): If True, only pore bodies are written. Default is False.
+        fill (boolean): If True, circles are written filled. If False, only circle outlines are
+            written. Default is True.
+        rng (int, np.random.Generator): Seed or generator for the random draws. Default is None
+            (global ``np.random`` state).
+    """
+    coords = np.asarray(generated_network['pore.coords'], dtype=float)[:, :2]
+    pore_diameter = np.asarray(generated_network['pore.diameter'],
+                               dtype=float)
+
+    if generated_network.get('throat.conns') is not None and not no_throats:
+        conns = np.asarray(generated_network['throat.conns'], dtype=int)
+        throat_start = coords[conns[:, 0]]
+        throat_end = coords[conns[:, 1]]
+        throat_diameter = np.asarray(generated_network['throat.diameter'],
+                                     dtype=float)
+    else:
+        throat_start = throat_end = np.zeros((0, 2))
+        throat_diameter = np.zeros(0)
+
+    with r12writer(dxf_fl_name) as dxf:
+        _dxf_entities(dxf, coords, pore_diameter, throat_start, throat_end,
+                      throat_diameter, throat_random, fill,
+                      _random_source(rng))
+
+
+def _stamp_disks(canvas, centers, radii, value):
+    r"""
+    Fill disks (2D canvas) or balls (3D canvas) into an array in vectorised
+    blocks. A pixel/voxel is filled when its center lies within the radius.
+    Centers are given in array index units, with pixel ``i`` covering
+    ``[i, i + 1)`` along each axis.
+
+    Args:
+        canvas (array): 2D or 3D array that is filled in place
+        centers (array): (K, canvas.ndim) array of centers
+        radii (array): Array of K radii
+        value (int): Value written into the filled pixels/voxels
+    """
+    ndim = canvas.ndim
+    centers = np.asarray(centers, dtype=float).reshape(-1, ndim)
+    radii = np.asarray(radii, dtype=float).reshape(-1)
+    valid = np.isfinite(radii) & (radii > 0) & np.all(np.isfinite(centers),
+                                                      axis=1)
+    centers = centers[valid]
+    radii = radii[valid]
+    shape = np.array(canvas.shape)
+
+    # Disks with the same integer reach share one stencil of offsets
+    reach = np.ceil(radii).astype(int)
+    for r in np.unique(reach):
+        members = np.flatnonzero(reach == r)
+        offsets = np.stack(np.meshgrid(*[np.arange(-r, r + 1)] * ndim,
+                                       indexing='ij'),
+                           axis=-1).reshape(-1, ndim)
+        # Keep each block at a few million cells
+        block = max(1, (1 << 21) // len(offsets))
+        for start in range(0, len(members), block):
+            batch = members[start:start + block]
+            center = centers[batch][:, None, :]
+            cells = np.floor(center).astype(int) + offsets[None, :, :]
+            inside = (np.sum((cells + 0.5 - center)**2, axis=-1) <=
+                      radii[batch][:, None]**2)
+            inside &= np.all((cells >= 0) & (cells < shape), axis=-1)
+            canvas[tuple(cells[inside].T)] = value
+
+
+def network2voxels(generated_network,
+                   n1,
+                   n2,
+                   n3,
+                   d1,
+                   d2,
+                   d3,
+                   no_throats=False,
+                   invert=False):
+    r"""
+    Create a 3D voxel image from an OpenPNM network (for example one from
+    ``generate.generate_network_3d``). Pores are drawn as balls and throats as
+    straight tubes of overlapping balls. The result can be written with
+    ``io.voxels2vtk``.
+
+      Args:
+        generated_network (dict): The OpenPNM network containing pore and throat information.
+        n1 (int): Number of pores on the x-axis of the model grid
+        n2 (int): Number of pores on the y-axis of the model grid
+        n3 (int): Number of pores on the z-axis of the model grid
+        d1 (int): The x length of the voxel image (in voxels).
+        d2 (int): The y length of the voxel image (in voxels).
+        d3 (int): The z length of the voxel image (in voxels).
+        no_throats (boolean): If True, only pore bodies are drawn. Default is False.
+        invert (boolean): If True, pore space is 255 and solid is 0 (like
+            ``filter_im`` with ``invert=True``). Default is False (pore space
+            is 0 and solid is 255, like a rasterized design).
+
+      Returns:
+        numpy array: uint8 voxel image of shape (d1, d2, d3) indexed [x, y, z].
+    """
+    pore_value, solid_value = (255, 0) if invert else (0, 255)
+    voxels = np.full((d1, d2, d3), solid_value, dtype=np.uint8)
+
+    scale = np.array([d1 / n1, d2 / n2, d3 / n3])
+    coords = np.asarray(generated_network['pore.coords'], dtype=float) * scale
+
+    # Pore bodies
+    _stamp_disks(voxels, coords,
+                 np.asarray(generated_network['pore.diameter']) / 2,
+                 pore_value)
+
+    # Throats as overlapping balls spaced at most one throat radius apart
+    if generated_network.get('throat.conns') is not None and not no_throats:
+        conns = np.asarray(generated_network['throat.conns'], dtype=int)
+        throat_radius = np.asarray(generated_network['throat.diameter'],
+                                   dtype=float) / 2
+        drawn = np.isfinite(throat_radius) & (throat_radius > 0)
+        conns = conns[drawn]
+        throat_radius = throat_radius[drawn]
+
+        start = coords[conns[:, 0]]
+        end = coords[conns[:, 1]]
+        distance = np.linalg.norm(end - start, axis=1)
+        num_points = np.ceil(distance / throat_radius).astype(int) + 1
+
+        throat = np.repeat(np.arange(len(conns)), num_points)
+        first = np.repeat(np.cumsum(num_points) - num_points, num_points)
+        fraction = ((np.arange(len(throat)) - first) /
+                    np.maximum(num_points[throat] - 1, 1))
+        centers = start[throat] + (end - start)[throat] * fraction[:, None]
+        _stamp_disks(voxels, centers, throat_radius[throat], pore_value)
+
+    return voxels
+
+
+def _blob_polygons(centers, radii, rand_radii, samples=8):
+    r"""
+    Sample the Bézier blob outline drawn by ``network2svg`` (one move, one
+    quadratic and seven smooth quadratic curves) into closed polygons.
+
+    Args:
+        centers (array): (N, 2) array of blob centers (x, y) in image coordinates
+        radii (array): Array of N blob radii
+        rand_radii (array): (N, 9) array of randomized control point radii
+        samples (int): Number of points sampled on each curve
+
+    Returns:
+        numpy array: (N, 8 * samples, 2) array of polygon vertices (x, y)
+    """
+    blob = _blob_control_points(radii, rand_radii)
+    points = blob[:, :, :2]
+    controls = blob[:, :, 2:]
+
+    # The first curve uses its own control point (Q), every following curve
+    # reflects the previous control point about the current point (T)
+    control = np.empty((len(radii), 8, 2))
+    control[:, 0] = controls[:, 1]
+    for i in range(1, 8):
+        control[:, i] = 2 * points[:, i] - control[:, i - 1]
+
+    t = (np.arange(samples) / samples)[None, None, :, None]
+    start = points[:, :-1, None, :]
+    end = points[:, 1:, None, :]
+    curve = ((1 - t)**2 * start + 2 * (1 - t) * t * control[:, :, None, :] +
+             t**2 * end)
+    return curve.reshape(len(radii), -1, 2) + centers[:, None, :]
+
+
+def network2array(generated_network,
+                  n1,
+                  n2,
+                  d1,
+                  d2,
+                  pore_shape='blob',
+                  throat_random=1,
+                  no_throats=False,
+                  throat_vector_thres=None,
+                  invert=False,
+                  rng=None):
+    r"""
+    Create a 2D image array from an OpenPNM network without going through an
+    SVG file. Pores and throats use the same geometry and the same sequence of
+    ``np.random`` draws as ``network2svg``, so with the same seed the array
+    matches a rasterized ``network2svg`` drawing.
+
+      Args:
+        generated_network (dict): The OpenPNM network containing pore and throat information.
+        n1 (int): Number of pores on the x-axis of the model grid
+        n2 (int): Number of pores on the y-axis of the model grid
+        d1 (int): The x length of the image (in pixels).
+        d2 (int): The y length of the image (in pixels).
+        pore_shape (str): Shape of the pore bodies, can be 'blob' or 'circle'. Default is 'blob'.
+        throat_random (int): Multiplier that decides how random the throat shape will be. Default is 1.
+            A value of 0 makes the throats straight.
+        no_throats (boolean): If True, only pore bodies are drawn. Default is False.
+        throat_vector_thres (float): Throats thinner than this are drawn as 1 pixel lines.
+            Default is None.
+        invert (boolean): If True, pore space is 255 and solid is 0. Default is False
+            (pore space is 0 and solid is 255, like a rasterized SVG).
+        rng (int, np.random.Generator): Seed or generator for the random draws. Default is None
+            (global ``np.random`` state).
+
+      Returns:
+        numpy array: uint8 image of shape (d2, d1), with row 0 at the top of the design.
+    """
+    pore_value, solid_value = (255, 0) if invert else (0, 255)
+    image = np.full((d2, d1), solid_value, dtype=np.uint8)
+    rand = _random_source(rng)
+
+    # Pore centers in image coordinates (y axis flipped like the SVG)
+    coords = np.asarray(generated_network['pore.coords'], dtype=float)
+    centers = np.stack([coords[:, 0] * (d1 / n1), d2 - coords[:, 1] * (d2 / n2)],
+                       axis=-1)
+    radii = np.asarray(generated_network['pore.diameter'], dtype=float) / 2
+
+    if pore_shape == 'blob':
+        # Same draws as network2svg: 9 control point radii per pore
+        rand_radii = radii[:, None] + rand.uniform(
+            -0.4 * radii[:, None], 0.4 * radii[:, None], size=(len(radii), 9))
+        polygons = _blob_polygons(centers, radii, rand_radii)
+        # OpenCV places integer coordinates at pixel centers, use 4 bits of
+        # sub-pixel precision
+        polygons = np.round((polygons - 0.5) * 16).astype(np.int32)
+        for polygon in polygons:
+            cv.fillPoly(image, [polygon], int(pore_value), cv.LINE_8, 4)
+    elif pore_shape == 'circle':
+        # network2svg draws circle pores with half the pore radius
+        _stamp_disks(image, centers[:, ::-1], radii / 2, pore_value)
+    else:
+        print(
+            'Error: Invalid shape for pore body (Must be \'blob\' or \'circle\')'
+        )
+        return None
+
+    if generated_network.get('throat.conns') is None or no_throats:
+        return image
+
+    conns = np.asarray(generated_network['throat.conns'], dtype=int)
+    throat_diameter = np.asarray(generated_network['throat.diameter'],
+                                 dtype=float)
+    start = centers[conns[:, 0]]
+    end = centers[conns[:, 1]]
+
+    # Small throats drawn as lines
+    if throat_vector_thres is not None:
+        vector = throat_diameter < throat_vector_thres
+        for p1, p2 in zip(start[vector], end[vector]):
+            p1 = tuple(np.round((p1 - 0.5) * 16).astype(int))
+            p2 = tuple(np.round((p2 - 0.5) * 16).astype(int))
+            cv.line(image, p1, p2, int(pore_value), 1, cv.LINE_8, 4)
+    else:
+        vector = np.zeros(len(conns), dtype=bool)
+
+    # Skip throats drawn as vectors and throats without a diameter
+    drawn = ~vector & np.isfinite(throat_diameter)
+    start = start[drawn]
+    end = end[drawn]
+    throat_diameter = throat_diameter[drawn]
+    _, circle_centers, throat_radius, _ = _throat_circles(
+        start, end, throat_diameter,
+        _svg_throat_points(start, end, throat_diameter), throat_random, rand)
+    _stamp_disks(image, circle_centers[:, ::-1], throat_radius, pore_value)
+
+    return image
+
+
+def network2polygons(generated_network,
+                     n1,
+                     n2,
+                     d1,
+                     d2,
+                     pore_shape='blob',
+                     throat_random=1,
+                     no_throats=False,
+                     resolution=2,
+                     tolerance=0.5,
+                     rng=None):
+    r"""
+    Merge the pores and throat circles of a design into simplified polygons.
+    The design is drawn with ``network2array`` (same geometry and random
+    draws as ``network2svg``), then the outline of every connected piece of
+    pore space is traced and simplified. Each polygon is a list of rings:
+    the outer boundary first, followed by any holes (solid islands).
+
+      Args:
+        generated_network (dict): The OpenPNM network containing pore and throat information.
+        n1 (int): Number of pores on the x-axis of the model grid
+        n2 (int): Number of pores on the y-axis of the model grid
+        d1 (int): The x length of the design (in pixels).
+        d2 (int): The y length of the design (in pixels).
+        pore_shape (str): Shape of the pore bodies, can be 'blob' or 'circle'. Default is 'blob'.
+        throat_random (int): Multiplier that decides how random the throat shape will be. Default is 1.
+            A value of 0 makes the throats straight.
+        no_throats (boolean): If True, only pore bodies are drawn. Default is False.
+        resolution (int): Number of raster pixels per design pixel used to trace the outlines.
+            Outlines pass through the centers of boundary raster pixels, so they sit up to
+            half a raster pixel inside the drawn shapes. Default is 2.
+        tolerance (float): Largest distance (in design pixels) between a simplified outline and
+            the traced one. Default is 0.5.
+        rng (int, np.random.Generator): Seed or generator for the random draws. Default is None
+            (global ``np.random`` state).
+
+      Returns:
+        list: Polygons, each a list of (M, 2) arrays of (x, y) vertices in SVG
+            coordinates (y axis pointing down)
+    """
+    network = {
+        'pore.coords': generated_network['pore.coords'],
+        'pore.diameter':
+        np.asarray(generated_network['pore.diameter'], dtype=float) *
+        resolution
+    }
+    if generated_network.get('throat.conns') is not None:
+        network['throat.conns'] = generated_network['throat.conns']
+        network['throat.diameter'] = np.asarray(
+            generated_network['throat.diameter'], dtype=float) * resolution
+
+    image = network2array(network,
+                          n1,
+                          n2,
+                          d1 * resolution,
+                          d2 * resolution,
+                          pore_shape=pore_shape,
+                          throat_random=throat_random,
+                          no_throats=no_throats,
+                          invert=True,
+                          rng=rng)
+    if image is None:
+        return None
+
+    # Outer boundaries and their holes (two level hierarchy)
+    contours, hierarchy = cv.findContours(image, cv.RETR_CCOMP,
+                                          cv.CHAIN_APPROX_SIMPLE)
+    if hierarchy is None:
+        return []
+    hierarchy = hierarchy[0]
+
+    def simplify(contour):
+        ring = cv.approxPolyDP(contour, tolerance * resolution, True)
+        # Contour points are pixel centers
+        return (ring.reshape(-1, 2) + 0.5) / resolution
+
+    polygons = []
+    for i in np.flatnonzero(hierarchy[:, 3] == -1):
+        rings = [simplify(contours[i])]
+        child = hierarchy[i, 2]
+        while child != -1:
+            rings.append(simplify(contours[child]))
+            child = hierarchy[child, 0]
+        rings = [ring for ring in rings if len(ring) >= 3]
+        if len(rings) > 0:
+            polygons.append(rings)
+    return polygons
+
+
+def polygons2dxf(polygons, d2):
+    r"""
+    Create a DXF document from merged polygons (see ``network2polygons``).
+    Every ring is written as one closed polyline and every polygon as one
+    hatch, so the entity count grows with the number of polygons rather than
+    the number of circles in the design.
+
+      Args:
+        polygons (list): Polygons from ``network2polygons``
+        d2 (int): The y length of the design (in pixels), used to flip the y axis so that
+            the DXF has the same orientation as the SVG.
+
+      Returns:
+        ezdxf.document: An ezdxf document object representing the design.
+    """
+    document = ezdxf.new(dxfversion="R2000")
+    modelspace = document.modelspace()
+
+    for rings in polygons:
+        hatch = modelspace.add_hatch(color=7)
+        for ring in rings:
+            points = [(x, d2 - y) for x, y in ring]
+            modelspace.add_lwpolyline(points, close=True)
+            hatch.paths.add_polyline_path(points, is_closed=True)
+
+    return document
+
+
+def _export_tile(args):
+    r"""
+    Helper function for network2tiles(). Draws the pores and throats owned by
+    one tile from the tile's own random generator and returns the text of
+    their elements.
+    """
+    (file_format, tile_seed, pore_centers, pore_sizes, throat_start,
+     throat_end, throat_diameter, pore_shape, throat_random, fill) = args
+
+    rand = np.random.default_rng(tile_seed)
+    if file_format == 'svg':
+        return ''.join(
+            _svg_elements(pore_centers,
+                          pore_sizes,
+                          throat_start,
+                          throat_end,
+                          throat_diameter,
+                          pore_shape,
+                          throat_random,
+                          rand=rand))
+
+    stream = io.StringIO()
+    dxf = R12FastStreamWriter(stream)
+    # Only keep the entities, the section header is written once per file
+    stream.seek(0)
+    stream.truncate()
+    _dxf_entities(dxf, pore_centers, pore_sizes, throat_start, throat_end,
+                  throat_diameter, throat_random, fill, rand)
+    return stream.getvalue()
+
+
+def network2tiles(generated_network,
+                  fl_name,
+                  n1,
+                  n2,
+                  d1,
+                  d2,
+                  file_format='svg',
+                  tiles=(2, 2),
+                  workers=None,
+                  seed=0,
+                  separate=False,
+                  pore_shape='blob',
+                  throat_random=1,
+                  no_throats=False,
+                  fill=True):
+    r"""
+    Export a large network in parallel. The design is split into a grid of
+    tiles, every pore is assigned to the tile containing its center and every
+    throat to the tile containing its midpoint. Each tile is drawn in a
+    worker process with its own ``np.random.Generator`` (spawned from
+    ``seed`` for the tile position), so the output is identical for any
+    number of workers.
+    SVG tiles use the geometry of ``network2svg_stream`` and DXF tiles the
+    geometry of ``network2dxf_bulk``.
+
+      Args:
+        generated_network (dict): The OpenPNM network containing pore and throat information.
+        fl_name (str): Path of the file to write (including extension). With ``separate``,
+            the tile position is added before the extension.
+        n1 (int): Number of pores on the x-axis of the model grid
+        n2 (int): Number of pores on the y-axis of the model grid
+        d1 (int): The x length of the SVG image (in pixels).
+        d2 (int): The y length of the SVG image (in pixels).
+        file_format (str): 'svg' or 'dxf'. Default is 'svg'.
+        tiles (tuple): Number of tiles along the x and y axes. Default is (2, 2).
+        workers (int): Number of worker processes. Default is None (one per CPU).
+        seed (int): Seed from which the tile seeds are derived. Default is 0.
+        separate (boolean): If True, each tile is written to its own file, all tiles share
+            the coordinate system of the full design. Default is False (one file).
+        pore_shape (str): Shape of the pore bodies in SVG files, can be 'blob' or 'circle'.
+            Default is 'blob'.
+        throat_random (int): Multiplier that decides how random the throat shape will be. Default is 1.
+            A value of 0 makes the throats straight.
+        no_throats (boolean): If True, only pore bodies are drawn. Default is False.
+        fill (boolean): If True, DXF circles are written filled. Default is True.
+
+      Returns:
+        list: Names of the written files.
+    """
+    if file_format not in ['svg', 'dxf']:
+        print('Error: Invalid file format (Must be \'svg\' or \'dxf\')')
+        return None
+    if pore_shape not in ['blob', 'circle']:
+        print(
+            'Error: Invalid shape for pore body (Must be \'blob\' or \'circle\')'
+        )
+        return None
+
+    coords = np.asarray(generated_network['pore.coords'], dtype=float)[:, :2]
+    diameter = np.asarray(generated_network['pore.diameter'], dtype=float)
+    if generated_network.get('throat.conns') is not None and not no_throats:
+        conns = np.asarray(generated_network['throat.conns'],
+                           dtype=int).reshape(-1, 2)
+        throat_diameter = np.asarray(generated_network['throat.diameter'],
+                                     dtype=float)
+    else:
+        conns = np.zeros((0, 2), dtype=int)
+        throat_diameter = np.zeros(0)
+
+    # Tile of every pore center and throat midpoint
+    def tile_index(points):
+        tx = np.clip(np.floor(points[:, 0] / n1 * tiles[0]), 0, tiles[0] - 1)
+        ty = np.clip(np.floor(points[:, 1] / n2 * tiles[1]), 0, tiles[1] - 1)
+        return (tx * tiles[1] + ty).astype(int)
+
+    pore_tile = tile_index(coords)
+    throat_tile = tile_index((coords[conns[:, 0]] + coords[conns[:, 1]]) / 2)
+
+    # Geometry in the units of the output format
+    if file_format == 'svg':
+        centers = np.stack(
+            [coords[:, 0] * (d1 / n1), -coords[:, 1] * (d2 / n2) + d2],
+            axis=-1)
+        sizes = diameter / 2
+    else:
+        centers = coords
+        sizes = diameter
+
+    num_tiles = tiles[0] * tiles[1]
+    tile_seeds = np.random.SeedSequence(seed).spawn(num_tiles)
+    tasks = []
+    for tile in range(num_tiles):
+        pores = pore_tile == tile
+        throats = conns[throat_tile == tile]
+        tasks.append(
+            (file_format, tile_seeds[tile], centers[pores], sizes[pores],
+             centers[throats[:, 0]], centers[throats[:, 1]],
+             throat_diameter[throat_tile == tile], pore_shape, throat_random,
+             fill))
+
+    if workers is None:
+        workers = os.cpu_count()
+    if workers > 1:
+        # Spawn the workers, forking after OpenPNM/porespy have started
+        # threads can deadlock at exit
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')) as executor:
+            fragments = list(executor.map(_export_tile, tasks))
+    else:
+        fragments = [_export_tile(task) for task in tasks]
+
+    # Concatenate the tiles into one file, or write one file per tile
+    if separate:
+        root, extension = os.path.splitext(fl_name)
+        names = [
+            '%s_%d_%d%s' % (root, tile // tiles[1], tile % tiles[1], extension)
+            for tile in range(num_tiles)
+        ]
+        parts = [[fragment] for fragment in fragments]
+    else:
+        names = [fl_name]
+        parts = [fragments]
+
+    for name, part in zip(names, parts):
+        if file_format == 'svg':
+            with open(name, 'w') as fid:
+                fid.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+                fid.write('<svg xmlns="http://www.w3.org/2000/svg" '
+                          'width="%s" height="%s" viewBox="0 0 %s %s">\n' %
+                          (d1, d2, d1, d2))
+                fid.writelines(part)
+                fid.write('</svg>\n')
+        else:
+            with r12writer(name) as dxf:
+                dxf.stream.writelines(part)
+
+    return names
@@ -2,124 +2,440 @@ import math
 import numpy as np
 import openpnm as op
 import random
+import heapq
+from scipy.spatial import cKDTree
+from scipy.sparse.csgraph import minimum_spanning_tree
 from skimage.morphology import diamond
 from itertools import chain
- 
+from collections import deque
+from pore2chip.metrics import network_fidelity
 
-def generate_network(n1,
-                     n2,
-                     pore_diameters,
-                     throat_diameters,
-                     coordination_nums,
-                     pore_pdf=None,
-                     throat_pdf=None,
-                     coord_pdf=None,
-                     average_coord=None,
-                     min_pore_diameter=None,
-                     max_pore_diameter=None,
-                     min_throat_diameter=None,
-                     max_throat_diameter=None,
-                     min_coordination=None,
-                     max_coordination=None,
-                     pore_random_shift=0.2,
-                     lone_pores=True,
-                     center_channel=None,
-                     return_middle_pores=False,
-                     sd=0):
+
+def _random_source(rng, sd):
     r"""
-    Create 2D OpenPNM network with given pore, throat, and coordination 
-    information
+    Random source of the generate functions. With ``rng`` None the global
+    ``random`` and ``np.random`` modules are seeded with ``sd`` and the
+    ``np.random`` module is returned (original behaviour). Otherwise a
+    ``np.random.Generator`` is returned and no global state is touched.
 
     Args:
-        n1 (int): Number of desired pores on x-axis
-        n2 (int): Number of desired pores on y-axis
-        pore_diameters (array): Array of input pore diameters
-        pore_pdf (array): Array of pore size probabilities
-        throat_diameters (array): Array of input throat diameters
-        throat_pdf (array): Array of throat size probabilities
-        coordination_nums (array): Array of pore coordination numbers
-        coord_pdf (array): Array of pore coordination probabilities
-        average_coord (int): Average coordination number (by default, generation 
-            will not target specific average coordination number)
-        lone_pores (Boolean): Trims pores with no connections (coordination number
-            of zero)
-        center_channel (int): Number of pores in the center of the network 
-            to be connected (allows guaranteed connection from top 
-            to bottom)
-        return_middle_pores (Boolean): Boolean that indicates if the function 
-            returns a tuple with the network and an array of indices 
-            of moddle pores for the center channel
+        rng (int, np.random.Generator): Seed or generator, or None
+        sd (int): Seed of the global random modules when ``rng`` is None
 
     Returns:
-        openpnm.models.network : Generated OpenPNM network
+        The ``np.random`` module or a ``np.random.Generator``
     """
+    if rng is None:
+        random.seed(sd)
+        np.random.seed(sd)
+        return np.random
+    return np.random.default_rng(rng)
 
-    random.seed(sd)
-    np.random.seed(sd)
 
-    generated_network = op.network.BodyCenteredCubic([n1, n2, 2])
-    op.topotools.trim(generated_network, pores=generated_network.pores('zmax'))
-    op.topotools.trim(generated_network,
-                      throats=generated_network.throats('body_to_body'))
-    op.topotools.trim(generated_network,
-                      throats=generated_network.throats('corner_to_corner'))
-    generated_network['pore.coords'] *= [1, 1, 0]
+def _choices(rand, population, k):
+    r"""
+    Helper function that draws ``k`` values with replacement, with
+    ``random.choices`` when ``rand`` is the global ``np.random`` module
+    """
+    if rand is np.random:
+        return random.choices(population, k=k)
+    return rand.choice(population, size=k)
 
-    # Add geometry (spheres and cylinders)
-    geo = op.models.collections.geometry.spheres_and_cylinders
-    generated_network.add_model_collection(geo)
-    generated_network.regenerate_models()
 
-    # Shift points and scale (pores reach the edges)
-    for pore_index in range(len(generated_network['pore.coords'])):
-        generated_network['pore.coords'][pore_index][0] -= 0.5
-        generated_network['pore.coords'][pore_index][1] -= 0.5
-        generated_network['pore.coords'][pore_index][0] *= (n1 / (n1 - 1))
-        generated_network['pore.coords'][pore_index][1] *= (n2 / (n2 - 1))
+def _choice(rand, sequence):
+    r"""
+    Helper function that draws one element, with ``random.choice`` when
+    ``rand`` is the global ``np.random`` module
+    """
+    if rand is np.random:
+        return random.choice(sequence)
+    return sequence[rand.integers(len(sequence))]
 
-    # Remove 3D aspects to create 2D image
-    del generated_network.params['dimensionality']
 
-    # Get numbers of pores
-    num_pores = len(generated_network['pore.coords'])
+def _reduce_coordination(network, z, rand=np.random):
+    r"""
+    Same as ``op.topotools.reduce_coordination`` (and the same draws when
+    ``rand`` is the global ``np.random`` module), with the random throat
+    weights and trimming order drawn from ``rand``. Throats on a random
+    minimum spanning tree are kept, so connectivity is preserved
 
-    # Random sizes and coordination numbers based on extracted data
-    # distributions
-    random_diameter = None
-    temp_coordination = None
-    random_coordination = None
+    Args:
+        network (openpnm.network.Network): Network to reduce
+        z (float): Target average coordination number
+        rand: ``np.random`` module (default) or ``np.random.Generator``
 
-    if pore_pdf is not None:
-        random_diameter = np.random.choice(a=pore_diameters,
-                                           size=num_pores,
-                                           replace=True,
-                                           p=pore_pdf)
-    else:
-        random_diameter = random.choices(pore_diameters, k=num_pores)
-    if coord_pdf is not None:
-        temp_coordination = np.random.choice(coordination_nums,
-                                             num_pores,
-                                             replace=True,
-                                             p=coord_pdf)
-        random_coordination = temp_coordination.astype(
-            int)  # convert float to int
-    else:
-        random_coordination = random.choices(coordination_nums, k=num_pores)
+    Returns:
+        array : Boolean mask of the throats to trim
+    """
+    am = network.create_adjacency_matrix(weights=rand.random(network.Nt),
+                                         triu=False)
+    mst = minimum_spanning_tree(am, overwrite=True).tocoo()
 
-    # Assign random pore diameters
-    generated_network['pore.diameter'] = random_diameter
+    # Throats on the spanning tree are never trimmed
+    on_tree = np.zeros(network.Nt, dtype=bool)
+    on_tree[np.hstack(network.find_connecting_throat(mst.row,
+                                                     mst.col))] = True
 
-    if throat_diameters is None:
-        print('Continuing without throats...')
-        op.topotools.trim(generated_network,
-                          throats=generated_network['throat.all'])
-        return generated_network
+    trim = rand.permutation(np.flatnonzero(~on_tree))
+    trim = trim[:int(network.Nt - network.Np * (z / 2))]
+    return network.to_mask(throats=trim)
+
+
+def _build_spatial_index(coords):
+    r"""
+    Build a single KD-tree over the pore coordinates. Every nearby-pore lookup
+    made while generating a network is answered from this index instead of
+    ``find_nearby_pores``, which builds two new trees on every call.
+
+    Args:
+        coords (array): (N, 3) array of pore coordinates
+
+    Returns:
+        scipy.spatial.cKDTree : Spatial index of the pore coordinates
+    """
+    return cKDTree(coords)
+
+
+def _find_nearby_pores(index, pores, r):
+    r"""
+    Batched equivalent of ``find_nearby_pores`` for a prebuilt spatial index
+
+    Args:
+        index (scipy.spatial.cKDTree): Index from ``_build_spatial_index``
+        pores (int or array): Pore index or array of pore indices to query
+        r (float): Search radius
+
+    Returns:
+        list : One sorted array of nearby pore indices for each queried pore
+            (the queried pore itself is excluded)
+    """
+    pores = np.atleast_1d(pores)
+    hits = index.query_ball_point(index.data[pores], r=r, return_sorted=True)
+    nearby = []
+    for pore, hit in zip(pores, hits):
+        hit = np.asarray(hit, dtype=np.int64)
+        nearby.append(hit[hit != pore])
+    return nearby
+
+
+def _uf_find(parent, pore):
+    r"""
+    Helper function for union-find connectivity tracking. Returns the root
+    pore of the cluster that contains ``pore`` (with path halving)
+    """
+    while parent[pore] != pore:
+        parent[pore] = parent[parent[pore]]
+        pore = parent[pore]
+    return pore
+
+
+def _uf_union(parent, size, pore1, pore2):
+    r"""
+    Helper function for union-find connectivity tracking. Merges the
+    clusters that contain ``pore1`` and ``pore2`` (union by size)
+
+    Returns:
+        Boolean : True if two different clusters were merged
+    """
+    root1 = _uf_find(parent, pore1)
+    root2 = _uf_find(parent, pore2)
+    if root1 == root2:
+        return False
+    if size[root1] < size[root2]:
+        root1, root2 = root2, root1
+    parent[root2] = root1
+    size[root1] += size[root2]
+    return True
+
+
+def _union_find(num_pores, conns):
+    r"""
+    Build union-find connectivity from an array of throat connections
+
+    Args:
+        num_pores (int): Number of pores
+        conns (array): (M, 2) array of throat connections
+
+    Returns:
+        Tuple of lists : Parent and cluster size lists of the union-find
+    """
+    parent = list(range(num_pores))
+    size = [1] * num_pores
+    for pore1, pore2 in np.asarray(conns, dtype=np.int64).reshape(
+            -1, 2).tolist():
+        _uf_union(parent, size, pore1, pore2)
+    return parent, size
+
+
+def _cluster_labels(parent):
+    r"""
+    Label each pore with the index of its connected cluster
+
+    Args:
+        parent (list): Parent list of the union-find
+
+    Returns:
+        numpy array : Cluster label of each pore (0 to number of clusters - 1)
+    """
+    roots = [_uf_find(parent, pore) for pore in range(len(parent))]
+    return np.unique(roots, return_inverse=True)[1].reshape(-1)
+
+
+def _spanning_root(parent, inlets, outlets):
+    r"""
+    Find a cluster that contains both an inlet pore and an outlet pore
+
+    Args:
+        parent (list): Parent list of the union-find
+        inlets (array): Pore indices on the inlet face
+        outlets (array): Pore indices on the outlet face
+
+    Returns:
+        int : Root pore of a spanning cluster, or None if no cluster spans
+    """
+    inlet_roots = {_uf_find(parent, pore) for pore in inlets}
+    for pore in outlets:
+        root = _uf_find(parent, pore)
+        if root in inlet_roots:
+            return root
+    return None
+
+
+def _connect_spanning(num_pores, conns, candidates, inlets, outlets):
+    r"""
+    Find the fewest candidate throats that have to be added so that an inlet
+    pore is connected to an outlet pore. Uses a 0-1 breadth first search
+    where existing throats cost nothing and candidate throats cost one.
+
+    Args:
+        num_pores (int): Number of pores
+        conns (array): (M, 2) array of existing throat connections
+        candidates (array): (E, 2) array of candidate throat connections
+        inlets (array): Pore indices on the inlet face
+        outlets (array): Pore indices on the outlet face
+
+    Returns:
+        numpy array : (K, 2) array of throat connections to add
+    """
+    neighbors = [[] for _ in range(num_pores)]
+    for cost, pairs in ((0, conns), (1, candidates)):
+        for pore1, pore2 in np.asarray(pairs, dtype=np.int64).reshape(
+                -1, 2).tolist():
+            neighbors[pore1].append((pore2, cost))
+            neighbors[pore2].append((pore1, cost))
+
+    distance = [math.inf] * num_pores
+    previous = [-1] * num_pores
+    previous_cost = [0] * num_pores
+    queue = deque()
+    for pore in inlets:
+        distance[pore] = 0
+        queue.append(pore)
+    is_outlet = np.zeros(num_pores, dtype=bool)
+    is_outlet[outlets] = True
+
+    while queue:
+        pore = queue.popleft()
+        if is_outlet[pore]:
+            # Walk back to the inlet collecting the candidate throats used
+            added = []
+            while previous[pore] != -1:
+                if previous_cost[pore] == 1:
+                    added.append(sorted((pore, previous[pore])))
+                pore = previous[pore]
+            return np.array(added, dtype=np.int64).reshape(-1, 2)
+        for neighbor, cost in neighbors[pore]:
+            if distance[pore] + cost < distance[neighbor]:
+                distance[neighbor] = distance[pore] + cost
+                previous[neighbor] = pore
+                previous_cost[neighbor] = cost
+                if cost == 0:
+                    queue.appendleft(neighbor)
+                else:
+                    queue.append(neighbor)
+
+    print('No candidate throats connect the inlet to the outlet. '
+          'Continuing...')
+    return np.zeros((0, 2), dtype=np.int64)
+
+
+def _candidate_adjacency(num_pores, candidates):
+    r"""
+    Convert an edge list of candidate throats into per-pore adjacency lists
+
+    Args:
+        num_pores (int): Number of pores in the lattice
+        candidates (array): (E, 2) array of candidate throat connections
+
+    Returns:
+        Tuple of lists : Neighbouring pores and candidate edge indices for
+            each pore
+    """
+    neighbors = [[] for _ in range(num_pores)]
+    edge_ids = [[] for _ in range(num_pores)]
+    for edge, (pore1, pore2) in enumerate(candidates.tolist()):
+        neighbors[pore1].append(pore2)
+        edge_ids[pore1].append(edge)
+        neighbors[pore2].append(pore1)
+        edge_ids[pore2].append(edge)
+    return neighbors, edge_ids
+
+
+def _match_coordination(num_pores, candidates, target, rand=np.random):
+    r"""
+    Select throats from a set of candidate lattice connections so that the
+    coordination of each pore matches a target degree sequence
+
+    The selection is a Havel-Hakimi style pass restricted to the lattice:
+    pores are taken in order of largest remaining demand (ties broken by a
+    random priority drawn from ``rand``) and connected to the
+    neighbours with the largest remaining demand. Any demand left over is
+    then repaired with short augmenting paths that add two throats and
+    remove one, which raises the coordination of two deficient pores
+    without changing any other pore.
+
+    Connectivity of the selected throats is tracked with a union-find while
+    they are assigned, so clusters can be queried without another pass over
+    the network.
+
+    Args:
+        num_pores (int): Number of pores in the lattice
+        candidates (array): (E, 2) array of candidate throat connections
+        target (array): Target coordination number of each pore
+        rand: ``np.random`` module (default) or ``np.random.Generator``
+
+    Returns:
+        Tuple : (M, 2) array of selected throat connections, and the parent
+            and cluster size lists of the union-find over those throats
+    """
+    candidates = np.asarray(candidates, dtype=np.int64).reshape(-1, 2)
+    neighbors, edge_ids = _candidate_adjacency(num_pores, candidates)
+
+    # Remaining demand of each pore (a pore cannot have more throats than
+    # candidate neighbours)
+    available = np.bincount(candidates.ravel(), minlength=num_pores)
+    residual = np.minimum(np.asarray(target, dtype=np.int64),
+                          available).tolist()
+    priority = rand.permutation(num_pores).tolist()
+    used = [False] * len(candidates)
+    parent = list(range(num_pores))
+    size = [1] * num_pores
+
+    # Havel-Hakimi pass (lazy max-heap keyed on remaining demand)
+    heap = [(-residual[pore], priority[pore], pore) for pore in range(num_pores)
+            if residual[pore] > 0]
+    heapq.heapify(heap)
+    finished = [False] * num_pores
+    while heap:
+        demand, _, pore = heapq.heappop(heap)
+        if finished[pore] or -demand != residual[pore]:
+            continue
+        finished[pore] = True
+
+        # Partners with the largest remaining demand first
+        partners = [(-residual[neighbor], priority[neighbor], neighbor, edge)
+                    for neighbor, edge in zip(neighbors[pore], edge_ids[pore])
+                    if not used[edge] and not finished[neighbor]
+                    and residual[neighbor] > 0]
+        partners.sort()
+        for _, _, neighbor, edge in partners[:residual[pore]]:
+            used[edge] = True
+            _uf_union(parent, size, pore, neighbor)
+            residual[neighbor] -= 1
+            if residual[neighbor] > 0:
+                heapq.heappush(
+                    heap, (-residual[neighbor], priority[neighbor], neighbor))
+        residual[pore] -= min(residual[pore], len(partners))
+
+    # Augmenting path repair: pore - x (add), x - y (remove), y - other (add)
+    deficient = [pore for pore in range(num_pores) if residual[pore] > 0]
+    repaired = False
+    for pore in deficient:
+        while residual[pore] > 0:
+            path = _find_augmenting_path(pore, neighbors, edge_ids, used,
+                                         residual)
+            if path is None:
+                break
+            add1, remove, add2, other = path
+            used[add1] = True
+            used[remove] = False
+            used[add2] = True
+            residual[pore] -= 1
+            residual[other] -= 1
+            repaired = True
+
+    conns = candidates[np.flatnonzero(used)]
+    if repaired:
+        # A union-find cannot remove throats, so rebuild it after the repair
+        parent, size = _union_find(num_pores, conns)
+    return conns, parent, size
+
+
+def _find_augmenting_path(pore, neighbors, edge_ids, used, residual):
+    r"""
+    Helper function for _match_coordination(). Finds a path
+    pore - x - y - other of alternating unused, used, unused candidate
+    throats where ``other`` still has remaining demand.
+
+    Returns:
+        tuple : Edge to add, edge to remove, edge to add, and the other
+            deficient pore, or None if no path exists
+    """
+    for x, add1 in zip(neighbors[pore], edge_ids[pore]):
+        if used[add1]:
+            continue
+        for y, remove in zip(neighbors[x], edge_ids[x]):
+            if not used[remove] or y == pore:
+                continue
+            for other, add2 in zip(neighbors[y], edge_ids[y]):
+                if used[add2] or other == x or residual[other] <= 0:
+                    continue
+                if other == pore and (add2 == add1 or residual[pore] < 2):
+                    continue
+                return add1, remove, add2, other
+    return None
+
+
+def coordination_error(network):
+    r"""
+    Compare the coordination numbers of a generated network against the
+    target coordination numbers sampled during generation
+
+    Args:
+        network (openpnm.network.Network): Network from ``generate_network``
+
+    Returns:
+        Tuple : Mean absolute error, maximum absolute error, and array of
+            per-pore errors (achieved minus target)
+    """
+    achieved = np.bincount(np.asarray(network['throat.conns']).ravel(),
+                           minlength=len(network['pore.coords']))
+    error = achieved - network['pore.target_coordination']
+    if error.size == 0:
+        return 0.0, 0, error
+    return float(np.mean(np.abs(error))), int(np.max(np.abs(error))), error
+
+
+def _greedy_coordination(generated_network,
+                         random_coordination,
+                         nearby_pores,
+                         rand=np.random):
+    r"""
+    Helper function for generate_network(). Edits the throats of the lattice
+    pore by pore, randomly removing or adding connections until each pore
+    reaches its sampled coordination number (or runs out of attempts)
+
+    Args:
+        generated_network (openpnm.network.Network): Lattice network to edit
+        random_coordination (array): Sampled coordination number of each pore
+        nearby_pores (list): Nearby pores of each pore from the spatial index
+        rand: ``np.random`` module (default) or ``np.random.Generator``
+    """
 
     # Create list of already visited pores
     visited = []
 
-    # edit connections to get specified coordination numbers
-    for pore_index in range(num_pores):
+    for pore_index in range(len(random_coordination)):
 
         # Get connected throats
         neighbor_throats = generated_network.find_neighbor_throats(pore_index)
@@ -142,7 +458,7 @@ def generate_network(n1,
                 # Otherwise, break the loop
                 if j < len(neighbor_pores):
                     # Pick random neighbor throat
-                    random_throat = np.random.choice(neighbor_throats)
+                    random_throat = rand.choice(neighbor_throats)
 
                     # Makes sure throat index is not above number of throats
                     if random_throat < len(generated_network['throat.conns']):
@@ -163,8 +479,7 @@ def generate_network(n1,
         # If the pore has less throats than what we want...
         elif len(neighbor_throats) < random_coordination[pore_index]:
             # Find pores around the vicinity of this pore
-            neighbor_pores = generated_network.find_nearby_pores(
-                pores=[pore_index], r=1.4, flatten=True)
+            neighbor_pores = nearby_pores[pore_index]
 
             # Number of connections to add
             i = random_coordination[pore_index] - len(neighbor_throats)
@@ -176,7 +491,7 @@ def generate_network(n1,
                 # Otherwise, break the loop
                 if j < len(neighbor_pores):
                     # Pick a random neighbor pore
-                    random_pore = np.random.choice(neighbor_pores)
+                    random_pore = rand.choice(neighbor_pores)
 
                     # If the pore has not already been visited
                     if random_pore not in visited:
@@ -198,57 +513,79 @@ def generate_network(n1,
         # Finished assigning coordination to pore. Now we add it to visited pores
         visited.append(pore_index)
 
-    ##### Middle Throats #####
-    # Getting middle pores
-    middle_pores = []
-    if center_channel is not None:
-        k = center_channel  # middle channel width (4)
-        j = math.floor((n1 - center_channel) / 2)  # outer channel width (3)
 
-        initial_pore = j * n2
+def _candidate_pairs(nearby_pores):
+    r"""
+    Convert the nearby pores of each pore into an edge list of candidate
+    throat connections
 
-        for index in range(initial_pore, initial_pore + (k * n2)):
-            middle_pores.append(index)
+    Args:
+        nearby_pores (list): Nearby pores of each pore from the spatial index
 
-        for index in range(initial_pore + (n1 * n2) - j,
-                           initial_pore + (n1 * n2) - j + (k * (n2 - 1))):
-            middle_pores.append(index)
+    Returns:
+        numpy array : (E, 2) array of candidate connections (each pair once,
+            upper triangular like the rest of the network)
+    """
+    num_pores = len(nearby_pores)
+    lengths = [len(nearby) for nearby in nearby_pores]
+    pores1 = np.repeat(np.arange(num_pores), lengths)
+    pores2 = np.concatenate(nearby_pores) if num_pores else pores1
+    upper = pores1 < pores2
+    return np.column_stack((pores1[upper], pores2[upper]))
 
-        current_pore = middle_pores[0]
-        next_pore = None
 
-        for i in range(n2 + (n2 - 1)):
-            neighbor_pores = generated_network.find_nearby_pores(
-                pores=[current_pore], r=1, flatten=True)
-            next_pore_list = []
-            for ind in neighbor_pores:
-                if ind in middle_pores and generated_network['pore.coords'][
-                        ind][1] > generated_network['pore.coords'][
-                            current_pore][1]:
-                    next_pore_list.append(ind)
-            if len(next_pore_list) != 0:
-                next_pore = random.choice(next_pore_list)
+def _exact_coordination(generated_network,
+                        random_coordination,
+                        nearby_pores,
+                        rand=np.random):
+    r"""
+    Helper function for generate_network(). Replaces the throats of the
+    lattice with a single-pass assignment from ``_match_coordination``,
+    using every pair of nearby pores as a candidate connection
 
-                connected_pores = generated_network.find_neighbor_pores(
-                    [current_pore], flatten=True)
-                if next_pore not in connected_pores:
-                    if current_pore < next_pore:
-                        op.topotools.connect_pores(generated_network,
-                                                   current_pore,
-                                                   next_pore,
-                                                   labels=['middle'])
-                    else:
-                        op.topotools.connect_pores(generated_network,
-                                                   next_pore,
-                                                   current_pore,
-                                                   labels=['middle'])
-                #print('current:',current_pore, 'next:', next_pore)
-                current_pore = next_pore
+    Args:
+        generated_network (openpnm.network.Network): Lattice network to edit
+        random_coordination (array): Sampled coordination number of each pore
+        nearby_pores (list): Nearby pores of each pore from the spatial index
+        rand: ``np.random`` module (default) or ``np.random.Generator``
 
-    # Remove any duplicate throats that may have been formed
-    dupes = op.models.network.duplicate_throats(generated_network)
-    op.topotools.trim(generated_network, throats=dupes)
+    Returns:
+        Tuple of lists : Parent and cluster size lists of the union-find over
+            the assigned throats
+    """
+    num_pores = len(nearby_pores)
+    candidates = _candidate_pairs(nearby_pores)
+    conns, parent, size = _match_coordination(
+        num_pores, candidates, np.asarray(random_coordination).astype(int),
+        rand)
 
+    # Keep lattice throats that were selected and add the missing ones
+    existing = np.sort(generated_network['throat.conns'], axis=1)
+    existing_keys = existing[:, 0] * num_pores + existing[:, 1]
+    selected_keys = conns[:, 0] * num_pores + conns[:, 1]
+    op.topotools.trim(generated_network,
+                      throats=np.flatnonzero(
+                          ~np.isin(existing_keys, selected_keys)))
+    op.topotools.extend(generated_network,
+                        conns=conns[~np.isin(selected_keys, existing_keys)])
+
+    return parent, size
+
+
+def _fix_coordination(generated_network, random_coordination, spatial_index):
+    r"""
+    Helper function for generate_network(). Connects pores left with no
+    throats and trims throats of pores above the largest sampled coordination
+    number after the greedy edit
+
+    Args:
+        generated_network (openpnm.network.Network): Network to edit
+        random_coordination (array): Sampled coordination number of each pore
+        spatial_index (scipy.spatial.cKDTree): Index of the pore coordinates
+
+    Returns:
+        numpy array : Coordination numbers before the fixes were applied
+    """
     # Zero Coordination Fixes
     coord = op.models.network.coordination_number(generated_network)
     # If there is no coordination value of 0 in our random selection
@@ -256,9 +593,8 @@ def generate_network(n1,
     # connect them with a neighbor
     if 0 not in random_coordination and 0 in coord:
         indicies = list(chain.from_iterable(np.where(coord == 0)))
-        for ind in indicies:
-            neighbor_pores = generated_network.find_nearby_pores(
-                pores=ind, r=1.5, flatten=True)
+        lone_nearby = _find_nearby_pores(spatial_index, indicies, 1.5)
+        for ind, neighbor_pores in zip(indicies, lone_nearby):
             pore_to_connect = None
             for neighbor in neighbor_pores:
                 coordination = len(generated_network.find_neighbor_throats(neighbor))
@@ -299,36 +635,298 @@ def generate_network(n1,
                     i -= 1
                 j += 1
 
+    return coord
+
+
+def generate_network(n1,
+                     n2,
+                     pore_diameters,
+                     throat_diameters,
+                     coordination_nums,
+                     pore_pdf=None,
+                     throat_pdf=None,
+                     coord_pdf=None,
+                     average_coord=None,
+                     min_pore_diameter=None,
+                     max_pore_diameter=None,
+                     min_throat_diameter=None,
+                     max_throat_diameter=None,
+                     min_coordination=None,
+                     max_coordination=None,
+                     pore_random_shift=0.2,
+                     lone_pores=True,
+                     center_channel=None,
+                     return_middle_pores=False,
+                     solver='greedy',
+                     spanning_axis=None,
+                     sd=0,
+                     rng=None):
+    r"""
+    Create 2D OpenPNM network with given pore, throat, and coordination 
+    information
+
+    Args:
+        n1 (int): Number of desired pores on x-axis
+        n2 (int): Number of desired pores on y-axis
+        pore_diameters (array): Array of input pore diameters
+        pore_pdf (array): Array of pore size probabilities
+        throat_diameters (array): Array of input throat diameters
+        throat_pdf (array): Array of throat size probabilities
+        coordination_nums (array): Array of pore coordination numbers
+        coord_pdf (array): Array of pore coordination probabilities
+        average_coord (int): Average coordination number (by default, generation 
+            will not target specific average coordination number)
+        lone_pores (Boolean): Trims pores with no connections (coordination number
+            of zero)
+        center_channel (int): Number of pores in the center of the network 
+            to be connected (allows guaranteed connection from top 
+            to bottom)
+        return_middle_pores (Boolean): Boolean that indicates if the function 
+            returns a tuple with the network and an array of indices 
+            of moddle pores for the center channel
+        solver (str): How throats are assigned to reach the sampled
+            coordination numbers. 'greedy' (default) edits the throats of
+            each pore at random and then fixes pores left with no or too many
+            throats. 'exact' assigns all throats in one deterministic pass
+            (O(E log E)) from the candidate lattice connections and prints the
+            achieved versus target coordination error (see
+            ``coordination_error``)
+        spanning_axis (str): If 'x' or 'y', guarantees that one cluster of
+            connected pores spans the network from the minimum to the maximum
+            of that axis by adding the fewest lattice throats needed (no fixed
+            center channel is required). Pores of that cluster are labelled
+            'pore.spanning'. Default is None
+        sd (int): Seed of the global ``random`` and ``np.random`` modules,
+            used when ``rng`` is None. Default is 0
+        rng (int, np.random.Generator): Seed or generator that all random
+            draws are taken from instead of the global modules, so
+            generation is reproducible and independent of other code
+            using the global state. Default is None
+
+    Every pore is labelled with the index of its connected cluster in
+    'pore.cluster', so disconnected pores can be passed straight to
+    ``export.network2svg`` (for example
+    ``disconnected=network.pores('spanning', mode='not')``).
+
+    Returns:
+        openpnm.models.network : Generated OpenPNM network
+    """
+
+    if solver not in ('greedy', 'exact'):
+        print('Error: Invalid coordination solver (Must be \'greedy\' or '
+              '\'exact\')')
+        return None
+    if spanning_axis not in (None, 'x', 'y'):
+        print('Error: Invalid spanning axis (Must be \'x\' or \'y\')')
+        return None
+
+    rand = _random_source(rng, sd)
+
+    generated_network = op.network.BodyCenteredCubic([n1, n2, 2])
+    op.topotools.trim(generated_network, pores=generated_network.pores('zmax'))
+    op.topotools.trim(generated_network,
+                      throats=generated_network.throats('body_to_body'))
+    op.topotools.trim(generated_network,
+                      throats=generated_network.throats('corner_to_corner'))
+    generated_network['pore.coords'] *= [1, 1, 0]
+
+    # Add geometry (spheres and cylinders)
+    geo = op.models.collections.geometry.spheres_and_cylinders
+    generated_network.add_model_collection(geo)
+    if rand is np.random:
+        generated_network.regenerate_models()
+    else:
+        # The OpenPNM pore seed model draws from the global np.random state,
+        # so the seeds are drawn from the generator instead
+        low, high = generated_network.models['pore.seed@all']['num_range']
+        generated_network['pore.seed'] = rand.uniform(low, high,
+                                                      generated_network.Np)
+        generated_network.regenerate_models(exclude=['pore.seed'])
+
+    # Shift points and scale (pores reach the edges)
+    generated_network['pore.coords'][:, 0] -= 0.5
+    generated_network['pore.coords'][:, 1] -= 0.5
+    generated_network['pore.coords'][:, 0] *= (n1 / (n1 - 1))
+    generated_network['pore.coords'][:, 1] *= (n2 / (n2 - 1))
+
+    # Remove 3D aspects to create 2D image
+    del generated_network.params['dimensionality']
+
+    # Get numbers of pores
+    num_pores = len(generated_network['pore.coords'])
+
+    # Pore positions stay fixed until the final random shift, so one spatial
+    # index answers every nearby-pore lookup below
+    spatial_index = _build_spatial_index(generated_network['pore.coords'])
+
+    # Random sizes and coordination numbers based on extracted data
+    # distributions
+    random_diameter = None
+    temp_coordination = None
+    random_coordination = None
+
+    if pore_pdf is not None:
+        random_diameter = rand.choice(a=pore_diameters,
+                                      size=num_pores,
+                                      replace=True,
+                                      p=pore_pdf)
+    else:
+        random_diameter = _choices(rand, pore_diameters, num_pores)
+    if coord_pdf is not None:
+        temp_coordination = rand.choice(coordination_nums,
+                                        num_pores,
+                                        replace=True,
+                                        p=coord_pdf)
+        random_coordination = temp_coordination.astype(
+            int)  # convert float to int
+    else:
+        random_coordination = _choices(rand, coordination_nums, num_pores)
+
+    # Assign random pore diameters
+    generated_network['pore.diameter'] = random_diameter
+
+    if throat_diameters is None:
+        print('Continuing without throats...')
+        op.topotools.trim(generated_network,
+                          throats=generated_network['throat.all'])
+        return generated_network
+
+    # Pores in the vicinity of every pore, queried in a single batch
+    nearby_pores = _find_nearby_pores(spatial_index, np.arange(num_pores),
+                                      1.4)
+    generated_network['pore.target_coordination'] = np.asarray(
+        random_coordination).astype(int)
+
+    # Edit connections to get specified coordination numbers
+    if solver == 'exact':
+        clusters = _exact_coordination(generated_network, random_coordination,
+                                       nearby_pores, rand)
+    else:
+        _greedy_coordination(generated_network, random_coordination,
+                             nearby_pores, rand)
+        clusters = None
+
+    ##### Middle Throats #####
+    # Getting middle pores
+    middle_pores = []
+    if center_channel is not None:
+        k = center_channel  # middle channel width (4)
+        j = math.floor((n1 - center_channel) / 2)  # outer channel width (3)
+
+        initial_pore = j * n2
+
+        for index in range(initial_pore, initial_pore + (k * n2)):
+            middle_pores.append(index)
+
+        for index in range(initial_pore + (n1 * n2) - j,
+                           initial_pore + (n1 * n2) - j + (k * (n2 - 1))):
+            middle_pores.append(index)
+
+        current_pore = middle_pores[0]
+        next_pore = None
+
+        for i in range(n2 + (n2 - 1)):
+            neighbor_pores = _find_nearby_pores(spatial_index, current_pore,
+                                                1)[0]
+            next_pore_list = []
+            for ind in neighbor_pores:
+                if ind in middle_pores and generated_network['pore.coords'][
+                        ind][1] > generated_network['pore.coords'][
+                            current_pore][1]:
+                    next_pore_list.append(ind)
+            if len(next_pore_list) != 0:
+                next_pore = _choice(rand, next_pore_list)
+
+                connected_pores = generated_network.find_neighbor_pores(
+                    [current_pore], flatten=True)
+                if next_pore not in connected_pores:
+                    if clusters is not None:
+                        _uf_union(*clusters, current_pore, next_pore)
+                    if current_pore < next_pore:
+                        op.topotools.connect_pores(generated_network,
+                                                   current_pore,
+                                                   next_pore,
+                                                   labels=['middle'])
+                    else:
+                        op.topotools.connect_pores(generated_network,
+                                                   next_pore,
+                                                   current_pore,
+                                                   labels=['middle'])
+                #print('current:',current_pore, 'next:', next_pore)
+                current_pore = next_pore
+
+    # Remove any duplicate throats that may have been formed
+    dupes = op.models.network.duplicate_throats(generated_network)
+    op.topotools.trim(generated_network, throats=dupes)
+
+    if solver == 'exact':
+        coord = op.models.network.coordination_number(generated_network)
+        mean_error, max_error, _ = coordination_error(generated_network)
+        print('Coordination error: mean = %.3f, max = %d' %
+              (mean_error, max_error))
+    else:
+        coord = _fix_coordination(generated_network, random_coordination,
+                                  spatial_index)
+
+    # Connected clusters (union-find). The exact solver tracks them while
+    # assigning throats, otherwise they are built once from the final throats
+    if clusters is None:
+        clusters = _union_find(num_pores, generated_network['throat.conns'])
+    parent, size = clusters
+
+    spanning_root = None
+    if spanning_axis is not None:
+        positions = generated_network['pore.coords'][:,
+                                                     'xy'.index(spanning_axis)]
+        inlets = np.flatnonzero(np.isclose(positions, positions.min()))
+        outlets = np.flatnonzero(np.isclose(positions, positions.max()))
+        spanning_root = _spanning_root(parent, inlets, outlets)
+        if spanning_root is None:
+            added = _connect_spanning(num_pores,
+                                      generated_network['throat.conns'],
+                                      _candidate_pairs(nearby_pores), inlets,
+                                      outlets)
+            op.topotools.extend(generated_network, conns=added)
+            for pore1, pore2 in added.tolist():
+                _uf_union(parent, size, pore1, pore2)
+            coord = op.models.network.coordination_number(generated_network)
+            spanning_root = _spanning_root(parent, inlets, outlets)
+
+    cluster_labels = _cluster_labels(parent)
+    generated_network['pore.cluster'] = cluster_labels
+    if spanning_axis is not None:
+        generated_network['pore.spanning'] = False
+        if spanning_root is not None:
+            generated_network['pore.spanning'] = (
+                cluster_labels == cluster_labels[spanning_root])
+
     # Remove non-connected pores if flag is true
     if not lone_pores:
         op.topotools.trim(generated_network, pores=np.where(coord == 0))
 
     # Reduce even further to an average coordination
     if average_coord is not None:
-        reduce = op.topotools.reduce_coordination(generated_network,
-                                                  average_coord)
+        reduce = _reduce_coordination(generated_network, average_coord, rand)
         op.topotools.trim(generated_network, throats=reduce)
 
-    # Slightly randomize pore positions
-    for pore_index in range(len(generated_network['pore.coords'])):
-        shift_amount_x = np.random.uniform(-pore_random_shift,
-                                           pore_random_shift)
-        shift_amount_y = np.random.uniform(-pore_random_shift,
-                                           pore_random_shift)
-        generated_network['pore.coords'][pore_index][0] += shift_amount_x
-        generated_network['pore.coords'][pore_index][1] += shift_amount_y
+    # Slightly randomize pore positions (drawn as x, y pairs per pore)
+    shift_amounts = rand.uniform(-pore_random_shift,
+                                 pore_random_shift,
+                                 size=(len(generated_network['pore.coords']),
+                                       2))
+    generated_network['pore.coords'][:, :2] += shift_amounts
 
     # Assign random pore throat diameters
     num_throats = len(generated_network['throat.conns'])
     random_throat_diameter = None
     if throat_pdf is not None:
-        random_throat_diameter = np.random.choice(throat_diameters,
-                                                  num_throats,
-                                                  replace=True,
-                                                  p=throat_pdf)
+        random_throat_diameter = rand.choice(throat_diameters,
+                                             num_throats,
+                                             replace=True,
+                                             p=throat_pdf)
     else:
-        random_throat_diameter = random.choices(throat_diameters,
-                                                k=num_throats)
+        random_throat_diameter = _choices(rand, throat_diameters,
+                                          num_throats)
 
     generated_network['throat.diameter'] = random_throat_diameter
 
@@ -354,3 +952,260 @@ def generate_network(n1,
         return generated_network, middle_pores
     else:
         return generated_network
+
+
+def generate_ensemble(num_candidates,
+                      n1,
+                      n2,
+                      pore_diameters,
+                      throat_diameters,
+                      coordination_nums,
+                      max_score=0.1,
+                      porosity=None,
+                      d1=None,
+                      d2=None,
+                      first_seed=0,
+                      **kwargs):
+    r"""
+    Generate candidate networks for a range of seeds and keep only the ones
+    that match the input statistics (see ``metrics.network_fidelity``).
+    Candidates are scored on the network arrays right after generation, so
+    export and image analysis only run for promising seeds.
+
+    Args:
+        num_candidates (int): Number of seeds to try
+        n1 (int): Number of desired pores on x-axis
+        n2 (int): Number of desired pores on y-axis
+        pore_diameters (array): Array of input pore diameters
+        throat_diameters (array): Array of input throat diameters
+        coordination_nums (array): Array of pore coordination numbers
+        max_score (float): Largest fidelity score that is accepted.
+            Default is 0.1
+        porosity (float): Target porosity of the design (optional, needs d1
+            and d2)
+        d1 (int): The x length of the design (in pixels)
+        d2 (int): The y length of the design (in pixels)
+        first_seed (int): First seed to try. Seeds first_seed to
+            first_seed + num_candidates - 1 are used
+        **kwargs : Extra arguments passed to ``generate_network`` (for
+            example pore_pdf, coord_pdf, solver or spanning_axis). ``rng`` is
+            not accepted, since each candidate is generated from its seed
+
+    Yields:
+        Tuple : Seed, network and fidelity dictionary of each accepted
+            candidate. ``generate_network(..., sd=seed)`` with the same
+            arguments reproduces the network
+    """
+    if 'rng' in kwargs:
+        raise ValueError('generate_ensemble seeds each candidate from '
+                         'first_seed, rng is not accepted')
+    kwargs.pop('return_middle_pores', None)
+    for sd in range(first_seed, first_seed + num_candidates):
+        network = generate_network(n1, n2, pore_diameters, throat_diameters,
+                                   coordination_nums, sd=sd, **kwargs)
+        if network is None:
+            return
+        fidelity = network_fidelity(network,
+                                    pore_diameters,
+                                    coordination_nums,
+                                    throat_diameters=throat_diameters,
+                                    pore_pdf=kwargs.get('pore_pdf'),
+                                    throat_pdf=kwargs.get('throat_pdf'),
+                                    coord_pdf=kwargs.get('coord_pdf'),
+                                    porosity=porosity,
+                                    n1=n1,
+                                    n2=n2,
+                                    d1=d1,
+                                    d2=d2)
+        if fidelity['score'] <= max_score:
+            yield sd, network, fidelity
+
+
+def _bcc_lattice(n1, n2, n3):
+    r"""
+    Pore coordinates of a body-centered cubic lattice, ordered like
+    ``openpnm.network.BodyCenteredCubic`` (corner pores, then body pores,
+    x-axis slowest). Corner pores sit on integer positions.
+
+    Args:
+        n1 (int): Number of corner pores on x-axis
+        n2 (int): Number of corner pores on y-axis
+        n3 (int): Number of corner pores on z-axis
+
+    Returns:
+        numpy array : (N, 3) array of pore coordinates
+    """
+    corners = np.stack(np.meshgrid(np.arange(n1),
+                                   np.arange(n2),
+                                   np.arange(n3),
+                                   indexing='ij'),
+                       axis=-1).reshape(-1, 3)
+    bodies = np.stack(np.meshgrid(np.arange(n1 - 1),
+                                  np.arange(n2 - 1),
+                                  np.arange(n3 - 1),
+                                  indexing='ij'),
+                      axis=-1).reshape(-1, 3) + 0.5
+    return np.vstack((corners, bodies)).astype(float)
+
+
+def generate_network_3d(n1,
+                        n2,
+                        n3,
+                        pore_diameters,
+                        throat_diameters,
+                        coordination_nums,
+                        pore_pdf=None,
+                        throat_pdf=None,
+                        coord_pdf=None,
+                        min_pore_diameter=None,
+                        max_pore_diameter=None,
+                        min_throat_diameter=None,
+                        max_throat_diameter=None,
+                        pore_random_shift=0.2,
+                        lone_pores=True,
+                        spanning_axis=None,
+                        sd=0,
+                        rng=None):
+    r"""
+    Create 3D OpenPNM network with given pore, throat, and coordination
+    information (for multi-layer or 3D printed micromodels)
+
+    The network is built on a full body-centered cubic lattice. Candidate
+    throats connect every pair of pores closer than 1.4 lattice units (corner
+    to body and axial neighbours, up to 14 per pore) and are assigned in one
+    pass with the same exact coordination solver as
+    ``generate_network(solver='exact')``, so networks of 10^5 - 10^6 pores
+    can be generated.
+
+    Args:
+        n1 (int): Number of desired pores on x-axis
+        n2 (int): Number of desired pores on y-axis
+        n3 (int): Number of desired pores on z-axis
+        pore_diameters (array): Array of input pore diameters
+        throat_diameters (array): Array of input throat diameters
+        coordination_nums (array): Array of pore coordination numbers
+        pore_pdf (array): Array of pore size probabilities
+        throat_pdf (array): Array of throat size probabilities
+        coord_pdf (array): Array of pore coordination probabilities
+        lone_pores (Boolean): Trims pores with no connections (coordination
+            number of zero) when False
+        spanning_axis (str): If 'x', 'y' or 'z', guarantees that one cluster
+            of connected pores spans the network along that axis (pores of
+            the cluster are labelled 'pore.spanning'). Default is None
+        sd (int): Seed of the global ``random`` and ``np.random`` modules,
+            used when ``rng`` is None. Default is 0
+        rng (int, np.random.Generator): Seed or generator that all random
+            draws are taken from instead of the global modules. Default is
+            None
+
+    Returns:
+        openpnm.models.network : Generated OpenPNM network
+    """
+
+    if spanning_axis not in (None, 'x', 'y', 'z'):
+        print('Error: Invalid spanning axis (Must be \'x\', \'y\' or \'z\')')
+        return None
+
+    rand = _random_source(rng, sd)
+
+    coords = _bcc_lattice(n1, n2, n3)
+    num_pores = len(coords)
+
+    # Candidate throats between nearby pores (one batched query), in lattice
+    # units so that the neighbours do not depend on the network size
+    spatial_index = _build_spatial_index(coords)
+    candidates = spatial_index.query_pairs(r=1.4, output_type='ndarray')
+    candidates = candidates[np.lexsort((candidates[:, 1], candidates[:, 0]))]
+
+    # Lattice scaled so that pores reach the edges (as in generate_network)
+    coords *= [n / (n - 1) if n > 1 else 1 for n in (n1, n2, n3)]
+
+    # Random sizes and coordination numbers based on extracted data
+    # distributions
+    random_diameter = rand.choice(pore_diameters,
+                                  num_pores,
+                                  replace=True,
+                                  p=pore_pdf)
+    random_coordination = rand.choice(coordination_nums,
+                                      num_pores,
+                                      replace=True,
+                                      p=coord_pdf).astype(int)
+
+    if throat_diameters is None:
+        print('Continuing without throats...')
+        conns = np.zeros((0, 2), dtype=np.int64)
+        parent, size = _union_find(num_pores, conns)
+    else:
+        conns, parent, size = _match_coordination(num_pores, candidates,
+                                                   random_coordination, rand)
+
+    spanning_root = None
+    if spanning_axis is not None and len(conns) > 0:
+        positions = coords[:, 'xyz'.index(spanning_axis)]
+        inlets = np.flatnonzero(np.isclose(positions, positions.min()))
+        outlets = np.flatnonzero(np.isclose(positions, positions.max()))
+        spanning_root = _spanning_root(parent, inlets, outlets)
+        if spanning_root is None:
+            added = _connect_spanning(num_pores, conns, candidates, inlets,
+                                      outlets)
+            conns = np.vstack((conns, added))
+            for pore1, pore2 in added.tolist():
+                _uf_union(parent, size, pore1, pore2)
+            spanning_root = _spanning_root(parent, inlets, outlets)
+
+    generated_network = op.network.Network(coords=coords, conns=conns)
+    generated_network['pore.diameter'] = random_diameter
+    generated_network['pore.target_coordination'] = random_coordination
+
+    cluster_labels = _cluster_labels(parent)
+    generated_network['pore.cluster'] = cluster_labels
+    if spanning_axis is not None:
+        generated_network['pore.spanning'] = False
+        if spanning_root is not None:
+            generated_network['pore.spanning'] = (
+                cluster_labels == cluster_labels[spanning_root])
+
+    if throat_diameters is not None:
+        mean_error, max_error, _ = coordination_error(generated_network)
+        print('Coordination error: mean = %.3f, max = %d' %
+              (mean_error, max_error))
+
+    # Remove non-connected pores if flag is true
+    if not lone_pores:
+        coord = np.bincount(conns.ravel(), minlength=num_pores)
+        op.topotools.trim(generated_network, pores=np.where(coord == 0))
+
+    # Slightly randomize pore positions
+    generated_network['pore.coords'] += rand.uniform(
+        -pore_random_shift,
+        pore_random_shift,
+        size=generated_network['pore.coords'].shape)
+
+    # Assign random pore throat diameters
+    if throat_diameters is not None:
+        generated_network['throat.diameter'] = rand.choice(
+            throat_diameters,
+            len(generated_network['throat.conns']),
+            replace=True,
+            p=throat_pdf)
+
+    # Assign minimum and maximum diameters
+    if min_pore_diameter is not None:
+        generated_network['pore.diameter'][np.where(
+            generated_network['pore.diameter'] <
+            min_pore_diameter)] = min_pore_diameter
+    if max_pore_diameter is not None:
+        generated_network['pore.diameter'][np.where(
+            generated_network['pore.diameter'] >
+            max_pore_diameter)] = max_pore_diameter
+    if throat_diameters is not None:
+        if min_throat_diameter is not None:
+            generated_network['throat.diameter'][np.where(
+                generated_network['throat.diameter'] <
+                min_throat_diameter)] = min_throat_diameter
+        if max_throat_diameter is not None:
+            generated_network['throat.diameter'][np.where(
+                generated_network['throat.diameter'] >
+                max_throat_diameter)] = max_throat_diameter
+
+    return generated_network
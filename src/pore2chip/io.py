@@ -1,6 +1,9 @@
 import numpy as np
 import cv2 as cv
 import copy
+import struct
+import zipfile
+import openpnm as op
 
 def _write_vtk(vtk_fl_name, num_nodes, num_elements, nodes_per_element, \
                     coord_matrix, connectivity_matrix, mat_id_matrix, **kwargs):
@@ -164,3 +167,199 @@ def img2vtk(image, vtk_fl_name, dims, **kwargs):
 
     print("Finished writing to: %s.vtk" % vtk_fl_name)
     return
+
+
+def voxels2vtk(voxels, vtk_fl_name, dims, **kwargs):
+    r"""
+        Converts 3D voxel image array to 3D vtk model (for example the output
+        of ``export.network2voxels``)
+
+      Args:
+        voxels (3D array): 3D image array indexed [x, y, z]
+        vtk_fl_name (str): Filename/filepath
+        dims (array): Size 3 Array-like for x, y, and z dimentions respectively
+        **kwargs : Extra arguements to write to VTK file (one value per
+            element, see ``img2vtk``)
+
+      Returns:
+        None
+    """
+    xseed, yseed, depth = voxels.shape
+
+    num_elements = (depth - 1) * (xseed - 1) * (yseed - 1)
+    num_nodes = (depth) * (xseed) * (yseed)
+
+    Lx = dims[0] / 1000
+    Ly = dims[1] / 1000
+    Lz = dims[2] / 1000
+
+    xcoord_list = np.linspace(0, 0.1 * Lx, xseed)
+    ycoord_list = np.linspace(0, 0.1 * Ly, yseed)
+    zcoord_list = np.linspace(0, 0.1 * Lz, depth)
+
+    # Right-handed coordinate system, node = i + j * xseed + k * xseed * yseed
+    zcoord, ycoord, xcoord = np.meshgrid(zcoord_list,
+                                         ycoord_list,
+                                         xcoord_list,
+                                         indexing='ij')
+    coord_list = np.column_stack(
+        (xcoord.ravel(), ycoord.ravel(), zcoord.ravel()))
+
+    # Connectivity matrix -- Structured grid (same node order as img2vtk)
+    k, j, i = np.meshgrid(np.arange(depth - 1),
+                          np.arange(yseed - 1),
+                          np.arange(xseed - 1),
+                          indexing='ij')
+    index = (i + j * xseed + k * xseed * yseed).ravel()
+    offsets = np.array([
+        0, 1, 1 + xseed, xseed, xseed * yseed, 1 + xseed * yseed,
+        1 + xseed + xseed * yseed, xseed + xseed * yseed
+    ])
+    connectivity_list = index[:, None] + offsets[None, :]
+
+    # Material ids, element = i + j * (xseed - 1) + k * (xseed - 1) * (yseed - 1)
+    th3_id_list = voxels[:-1, :-1, :-1].ravel(order='F')
+
+    nodes_per_element = 8
+
+    _write_vtk(vtk_fl_name, num_nodes, num_elements, nodes_per_element, \
+                    coord_list, connectivity_list, th3_id_list, **kwargs)
+
+    print("Finished writing to: %s.vtk" % vtk_fl_name)
+    return
+
+
+def _compact(array):
+    r"""
+    Helper function for save_network(). Stores floating point arrays as
+    float32 and integer arrays as int32.
+    """
+    array = np.asarray(array)
+    if np.issubdtype(array.dtype, np.floating):
+        return array.astype(np.float32, copy=False)
+    if np.issubdtype(array.dtype, np.integer):
+        return array.astype(np.int32, copy=False)
+    return array
+
+
+def save_network(network,
+                 fl_name,
+                 middle_pores=None,
+                 compact=True,
+                 compressed=False):
+    r"""
+        Save a network to a compact .npz file. Coordinates and other floating
+        point arrays are stored as float32, connections and other integer
+        arrays as int32 and labels as boolean arrays. Uncompressed files can
+        be loaded memory-mapped with ``load_network``.
+
+      Args:
+        network (openpnm.network.Network or dict): Network with 'pore.coords' and
+            'throat.conns' and any other pore and throat arrays
+        fl_name (str): Filename/filepath (including extension)
+        middle_pores (array): Optional pore indices of the middle pores, as
+            returned by ``generate.generate_network``. Default is None.
+        compact (boolean): If False, keeps the original data types (for
+            example float64) so the loaded arrays are exact. Default is True.
+        compressed (boolean): If True, compresses the arrays. Compressed files
+            are smaller but can not be memory-mapped. Default is False.
+
+      Returns:
+        None
+    """
+    arrays = {}
+    for key in network.keys():
+        array = np.asarray(network[key])
+        if array.dtype == object:
+            print("Skipping %s (object arrays are not supported)" % key)
+            continue
+        arrays[key] = _compact(array) if compact else array
+    if middle_pores is not None:
+        arrays['middle_pores'] = np.asarray(middle_pores, dtype=np.int32)
+
+    with open(fl_name, 'wb') as fid:
+        if compressed:
+            np.savez_compressed(fid, **arrays)
+        else:
+            np.savez(fid, **arrays)
+    return
+
+
+def _mmap_member(fl_name, fid, info, mmap_mode):
+    r"""
+    Helper function for load_network(). Maps an uncompressed .npy member of
+    an .npz file directly from disk, or reads it if it can not be mapped.
+    """
+    if info.compress_type != zipfile.ZIP_STORED:
+        return None
+
+    # The member data starts after its local file header
+    fid.seek(info.header_offset)
+    header = fid.read(30)
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    fid.seek(info.header_offset + 30 + name_length + extra_length)
+
+    version = np.lib.format.read_magic(fid)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fid)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fid)
+    if dtype.hasobject:
+        return None
+    if int(np.prod(shape)) == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(fl_name,
+                     dtype=dtype,
+                     mode=mmap_mode,
+                     shape=shape,
+                     order='F' if fortran_order else 'C',
+                     offset=fid.tell())
+
+
+def load_network(fl_name, mmap_mode=None, return_middle_pores=False):
+    r"""
+        Load a network saved with ``save_network``. With ``mmap_mode`` the
+        arrays of an uncompressed file are memory-mapped instead of read, so
+        loading takes almost no time and processes that load the same file
+        share its pages.
+
+      Args:
+        fl_name (str): Filename/filepath (including extension)
+        mmap_mode (str): None to read the arrays into memory, or a memory-map
+            mode of ``numpy.memmap`` ('r', 'r+' or 'c'). Default is None.
+        return_middle_pores (boolean): If True, also returns the stored middle
+            pores (None if the file has none). Default is False.
+
+      Returns:
+        openpnm.network.Network: Network with all stored pore and throat arrays
+            (and the middle pores if ``return_middle_pores`` is True)
+    """
+    if mmap_mode not in [None, 'r', 'r+', 'c']:
+        print("Invalid mmap_mode: %s" % mmap_mode)
+        return None
+
+    arrays = {}
+    with zipfile.ZipFile(fl_name) as archive, open(fl_name, 'rb') as fid:
+        for info in archive.infolist():
+            key = info.filename[:-len('.npy')]
+            array = None
+            if mmap_mode is not None:
+                array = _mmap_member(fl_name, fid, info, mmap_mode)
+            if array is None:
+                with archive.open(info) as member:
+                    array = np.lib.format.read_array(member)
+            arrays[key] = array
+
+    # Setting the arrays on an empty network keeps them memory-mapped
+    network = op.network.Network()
+    network['pore.coords'] = arrays.pop('pore.coords')
+    network['throat.conns'] = arrays.pop('throat.conns')
+    middle_pores = arrays.pop('middle_pores', None)
+    for key, array in arrays.items():
+        network[key] = array
+
+    if return_middle_pores:
+        if middle_pores is not None:
+            middle_pores = middle_pores.tolist()
+        return network, middle_pores
+    return network
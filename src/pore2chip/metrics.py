@@ -180,3 +180,152 @@ def get_percent_probability(arr):
     uniques, counts = np.unique(arr, return_counts=True)
     percentages = dict(zip(uniques, counts * 100 / len(arr)))
     return percentages
+
+
+def _ks_distance(sample, reference, reference_pdf=None):
+    r"""
+    Kolmogorov-Smirnov distance between a sample and a (weighted) reference
+    set of values
+
+    Args:
+        sample (array): Array of sampled values
+        reference (array): Array of reference values
+        reference_pdf (array): Probability of each reference value (uniform
+            if not given)
+
+    Returns:
+        float : Largest absolute difference between the two cumulative
+            distributions
+    """
+    sample = np.asarray(sample, dtype=float)
+    sample = np.sort(sample[np.isfinite(sample)])
+    reference = np.asarray(reference, dtype=float)
+    if reference_pdf is None:
+        weights = np.ones(len(reference))
+    else:
+        weights = np.asarray(reference_pdf, dtype=float)
+    if len(sample) == 0 or len(reference) == 0:
+        return 1.0
+
+    order = np.argsort(reference)
+    reference = reference[order]
+    reference_cdf = np.cumsum(weights[order]) / np.sum(weights)
+
+    points = np.concatenate((sample, reference))
+    sample_cdf = np.searchsorted(sample, points, side='right') / len(sample)
+    index = np.searchsorted(reference, points, side='right')
+    reference_cdf = np.where(index > 0, reference_cdf[index - 1], 0.0)
+    return float(np.max(np.abs(sample_cdf - reference_cdf)))
+
+
+def estimate_porosity(network, n1, n2, d1, d2):
+    r"""
+    Estimate the porosity of the 2D design drawn from a network, without
+    exporting it. Pores count as disks of their diameter and throats as
+    rectangles of their diameter between the pore edges (the geometry used
+    by ``export.network2svg``).
+
+    Args:
+        network (openpnm.network.Network): Generated network
+        n1 (int): Number of pores on the x-axis of the model grid
+        n2 (int): Number of pores on the y-axis of the model grid
+        d1 (int): The x length of the design (in pixels)
+        d2 (int): The y length of the design (in pixels)
+
+    Returns:
+        float : Estimated fraction of the design that is pore space
+    """
+    coords = np.asarray(network['pore.coords'])[:, :2] * [d1 / n1, d2 / n2]
+    radii = np.asarray(network['pore.diameter'], dtype=float) / 2
+    pore_area = np.sum(np.pi * radii**2)
+
+    throat_area = 0.0
+    if network.get('throat.conns') is not None:
+        conns = np.asarray(network['throat.conns'], dtype=int).reshape(-1, 2)
+        diameters = np.asarray(network['throat.diameter'], dtype=float)
+        length = (np.linalg.norm(coords[conns[:, 0]] - coords[conns[:, 1]],
+                                 axis=1) - radii[conns[:, 0]] -
+                  radii[conns[:, 1]])
+        throat_area = np.nansum(np.clip(length, 0, None) * diameters)
+
+    return float(min((pore_area + throat_area) / (d1 * d2), 1.0))
+
+
+def network_fidelity(network,
+                     pore_diameters,
+                     coordination_nums,
+                     throat_diameters=None,
+                     pore_pdf=None,
+                     throat_pdf=None,
+                     coord_pdf=None,
+                     porosity=None,
+                     n1=None,
+                     n2=None,
+                     d1=None,
+                     d2=None):
+    r"""
+    Score how closely a generated network matches the input pore statistics,
+    using only the network arrays (no export or rasterization). Useful to
+    reject candidate networks before running the expensive export and image
+    analysis steps.
+
+    Args:
+        network (openpnm.network.Network): Generated network
+        pore_diameters (array): Array of input pore diameters
+        coordination_nums (array): Array of input coordination numbers
+        throat_diameters (array): Array of input throat diameters (optional)
+        pore_pdf (array): Array of pore size probabilities
+        throat_pdf (array): Array of throat size probabilities
+        coord_pdf (array): Array of pore coordination probabilities
+        porosity (float): Target porosity. If given with n1, n2, d1 and d2,
+            the estimated porosity of the design is compared against it
+        n1, n2 (int): Number of pores on the x and y axis of the model grid
+        d1, d2 (int): The x and y length of the design (in pixels)
+
+    Returns:
+        dict : Distances between network and input statistics:
+            - 'coordination': total variation distance between the
+              coordination number distributions
+            - 'pore_diameter': KS distance between pore diameters
+            - 'throat_diameter': KS distance between throat diameters (None
+              if throat_diameters is not given)
+            - 'porosity': absolute porosity difference (None if not computed)
+            - 'score': the largest of the distances above (0 is a perfect
+              match)
+    """
+    # Coordination number distributions over integer values
+    num_pores = len(network['pore.coords'])
+    conns = network.get('throat.conns')
+    if conns is None:
+        conns = np.zeros((0, 2), dtype=int)
+    achieved = np.bincount(np.asarray(conns, dtype=int).ravel(),
+                           minlength=num_pores)
+    target = np.asarray(coordination_nums).astype(int)
+    if coord_pdf is None:
+        target_weights = np.ones(len(target))
+    else:
+        target_weights = np.asarray(coord_pdf, dtype=float)
+    size = max(achieved.max(initial=0), target.max(initial=0)) + 1
+    achieved_pmf = np.bincount(achieved, minlength=size) / max(num_pores, 1)
+    target_pmf = np.bincount(target, weights=target_weights,
+                             minlength=size) / np.sum(target_weights)
+
+    fidelity = {
+        'coordination':
+        float(0.5 * np.sum(np.abs(achieved_pmf - target_pmf))),
+        'pore_diameter':
+        _ks_distance(network['pore.diameter'], pore_diameters, pore_pdf),
+        'throat_diameter': None,
+        'porosity': None
+    }
+    if throat_diameters is not None and network.get(
+            'throat.diameter') is not None:
+        fidelity['throat_diameter'] = _ks_distance(
+            network['throat.diameter'], throat_diameters, throat_pdf)
+    if porosity is not None and None not in (n1, n2, d1, d2):
+        fidelity['porosity'] = abs(
+            estimate_porosity(network, n1, n2, d1, d2) - porosity)
+
+    fidelity['score'] = max(value for value in fidelity.values()
+                            if value is not None)
+    return fidelity
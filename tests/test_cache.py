@@ -0,0 +1,94 @@
+import sys
+import os
+import tempfile
+import numpy as np
+from pathlib import Path
+
+# Uncomment and modify these lines if the pore2chip package is not in the PYTHONPATH
+#mod_path = Path("__file__").resolve().parents[2]
+#sys.path.append(os.path.abspath(mod_path))
+
+# Importing functions from the pore2chip package
+import pore2chip.cache
+from pore2chip.cache import (cache_key, cached_generate_network,
+                             cached_network2svg, evict)
+
+
+def test_cached_generate_network():
+    """
+    Generates the same network twice through the cache and checks that the
+    second call is loaded from the single cache entry with the same arrays,
+    and that a different seed gets its own entry
+    """
+    pore_diameters = np.linspace(2.0, 8.0, 10)
+    throat_diameters = np.linspace(1.0, 3.0, 10)
+    coordination_nums = np.array([2, 3, 3, 4, 4, 4, 5, 6])
+    with tempfile.TemporaryDirectory() as cache_dir:
+        first = cached_generate_network(6, 6, pore_diameters,
+                                        throat_diameters, coordination_nums,
+                                        sd=2, cache_dir=cache_dir)
+        second = cached_generate_network(6, 6, pore_diameters,
+                                         throat_diameters, coordination_nums,
+                                         sd=2, cache_dir=cache_dir)
+        assert len(os.listdir(cache_dir)) == 1
+        for key in ['pore.coords', 'pore.diameter', 'throat.conns',
+                    'throat.diameter']:
+            assert np.array_equal(first[key], second[key])
+
+        cached_generate_network(6, 6, pore_diameters, throat_diameters,
+                                coordination_nums, sd=3, cache_dir=cache_dir)
+        assert len(os.listdir(cache_dir)) == 2
+
+        # Eviction removes the least recently used entries first
+        assert evict(cache_dir, 0) == 2
+        assert len(os.listdir(cache_dir)) == 0
+
+
+def test_cached_network2svg():
+    """
+    Exports the same design twice through the cache and checks that both
+    files are identical
+    """
+    network = {
+        "pore.coords": np.array([(0.5, 0.5, 0), (1.5, 0.5, 0)]),
+        "pore.diameter": np.array([20.0, 20.0]),
+        "throat.conns": np.array([(0, 1)]),
+        "throat.diameter": np.array([5.0])
+    }
+    with tempfile.TemporaryDirectory() as cache_dir:
+        texts = []
+        for i in range(2):
+            svg_fl_name = os.path.join(cache_dir, 'design_%d.svg' % i)
+            cached_network2svg(svg_fl_name, network, 2, 1, 100, 50, rng=1,
+                               cache_dir=os.path.join(cache_dir, 'cache'))
+            with open(svg_fl_name) as fid:
+                texts.append(fid.read())
+        assert texts[0] == texts[1]
+        assert len(os.listdir(os.path.join(cache_dir, 'cache'))) == 1
+
+
+def test_cache_key_version():
+    """
+    Checks that the cache key depends on the cache version, so entries
+    written by an older version are not used
+    """
+    arguments = {'sd': 2, 'pore_diameters': np.linspace(2.0, 8.0, 10)}
+    key = cache_key('network2svg', arguments)
+    assert cache_key('network2svg', arguments) == key
+
+    version = pore2chip.cache._CACHE_VERSION
+    try:
+        pore2chip.cache._CACHE_VERSION = version + 1
+        assert cache_key('network2svg', arguments) != key
+    finally:
+        pore2chip.cache._CACHE_VERSION = version
+
+
+def main():
+    test_cached_generate_network()
+    test_cached_network2svg()
+    test_cache_key_version()
+
+
+if __name__ == "__main__":
+    main()
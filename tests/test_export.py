@@ -9,6 +9,8 @@ import ezdxf
 from svglib.svglib import svg2rlg
 from reportlab.graphics import renderPM
 from pathlib import Path
+import tempfile
+import xml.etree.ElementTree as ET
 
 # Set up the module path (I am in tests folder)
 # Modify these lines if the pore2chip package is not in the PYTHONPATH
@@ -18,7 +20,8 @@ sys.path.append(os.path.abspath(mod_path))
 # Importing specific functions for exporting network data to SVG and DXF formats
 import pore2chip
 #from pore2chip.src.pore2chip.export import network2svg, network2dxf
-from pore2chip.export import network2svg, network2dxf
+from pore2chip.export import network2svg, network2dxf, network2voxels, network2array, network2svg_stream, network2polygons, polygons2dxf, network2dxf_bulk, network2tiles
+from pore2chip.export import _svg_throat_points, _throat_circles
 
 
 def generate_network():
@@ -91,6 +94,248 @@ def test_network2dxf(network):
     dxf_result.saveas("test_dxf_1.dxf")
 
 
+def test_network2voxels():
+    """
+    Test network2voxels on a two pore network stacked along z. Both pores and
+    the straight throat between them should be pore space (0).
+    """
+    network = {
+        "pore.coords": np.array([(1.0, 1.0, 1.0), (1.0, 1.0, 3.0)]),
+        "pore.diameter": np.array([6.0, 6.0]),
+        "throat.conns": np.array([(0, 1)]),
+        "throat.diameter": np.array([2.0])
+    }
+    voxels = network2voxels(network, 2, 2, 4, 20, 20, 40)
+    assert voxels.shape == (20, 20, 40)
+    assert voxels[10, 10, 10] == 0 and voxels[10, 10, 30] == 0
+    assert np.all(voxels[10, 10, 10:30] == 0)
+    assert voxels[0, 0, 0] == 255
+
+
+def test_network2array():
+    """
+    Test network2array on the 3x3 grid with straight throats. Pore centers and
+    throat midpoints should be pore space (0), grid cell centers solid (255),
+    and both pore shapes should use the same random draws as network2svg.
+    """
+    network = generate_network()
+    network['pore.diameter'] = [40 for _ in range(9)]
+    network['throat.diameter'] = [10 for _ in range(12)]
+    image = network2array(network, 3, 3, 300, 300, pore_shape='circle',
+                          throat_random=0)
+    assert image.shape == (300, 300) and image.dtype == np.uint8
+    # Pore 4 is drawn at row 200, column 100 and throat 3-4 runs along row 200
+    assert image[200, 100] == 0
+    assert image[200, 50] == 0
+    assert image[150, 150] == 255
+    inverted = network2array(network, 3, 3, 300, 300, pore_shape='circle',
+                             throat_random=0, invert=True)
+    assert np.all(inverted == 255 - image)
+
+    for pore_shape in ['blob', 'circle']:
+        np.random.seed(0)
+        network2svg(network, 3, 3, 300, 300, pore_shape=pore_shape)
+        after_svg = np.random.uniform()
+        np.random.seed(0)
+        network2array(network, 3, 3, 300, 300, pore_shape=pore_shape)
+        assert np.random.uniform() == after_svg
+
+    # A seeded generator gives the same design every time
+    images = [network2array(network, 3, 3, 300, 300, rng=7) for _ in range(2)]
+    assert np.array_equal(images[0], images[1])
+
+
+def test_network2svg_stream():
+    """
+    Test network2svg_stream on the 3x3 grid. The file should be valid SVG with
+    one circle per pore and one group per throat, and use the same random
+    draws as network2svg.
+    """
+    network = generate_network()
+    network['pore.diameter'] = [40 for _ in range(9)]
+    network['throat.diameter'] = [10 for _ in range(12)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        svg_fl_name = os.path.join(tmp_dir, 'grain_network.svg')
+        np.random.seed(0)
+        network2svg_stream(network, svg_fl_name, 3, 3, 300, 300,
+                           pore_shape='circle')
+        after_stream = np.random.uniform()
+        root = ET.parse(svg_fl_name).getroot()
+
+    namespace = '{http://www.w3.org/2000/svg}'
+    assert root.get('width') == '300'
+    assert len(root.findall(namespace + 'circle')) == 9
+    assert len(root.findall(namespace + 'g')) == 12
+
+    np.random.seed(0)
+    network2svg(network, 3, 3, 300, 300, pore_shape='circle')
+    assert np.random.uniform() == after_stream
+
+
+def test_throat_circles():
+    """
+    Test the vectorised throat circles against the per-throat loop that
+    network2svg used before, with the same random draws. Throats with a NaN
+    or zero diameter should get no circles.
+    """
+    start = np.array([[0.0, 0.0], [10.0, 5.0], [3.0, 3.0], [5.0, 0.0],
+                      [0.0, 7.0]])
+    end = np.array([[10.0, 0.0], [4.0, 13.0], [8.0, 3.0], [5.0, 9.0],
+                    [7.5, 7.0]])
+    diameter = np.array([2.0, 1.5, np.nan, 0.0, 0.7])
+    num_throat_points = _svg_throat_points(start, end, diameter)
+    throat, centers, radii, base_points = _throat_circles(
+        start, end, diameter, num_throat_points, throat_random=1,
+        rand=np.random.default_rng(3))
+
+    # Per-throat loop, replaying the draws of the vectorised pass
+    counts = []
+    for p1, p2, d in zip(start, end, diameter):
+        count = 0
+        if np.isfinite(d) and d > 0:
+            count = math.ceil(math.dist(p1, p2) / d)
+            count += round(count / 2)
+        counts.append(count)
+    circle_radii = np.repeat(diameter, counts) / 2
+    rng = np.random.default_rng(3)
+    direction = rng.integers(0, 2, size=sum(counts))
+    shift = rng.uniform(-circle_radii, circle_radii)
+    expected = []
+    circle = 0
+    for p1, p2, d, count in zip(start, end, diameter, counts):
+        x_segment = (p2[0] - p1[0]) / max(count, 1)
+        y_segment = (p2[1] - p1[1]) / max(count, 1)
+        for i in range(count):
+            base_point = [p1[0] + x_segment * i, p1[1] + y_segment * i]
+            if direction[circle] == 0:
+                perp_vector = [y_segment / d, -x_segment / d]
+            else:
+                perp_vector = [-y_segment / d, x_segment / d]
+            expected.append(base_point +
+                            [base_point[0] + perp_vector[0] * shift[circle],
+                             base_point[1] + perp_vector[1] * shift[circle],
+                             d / 2])
+            circle += 1
+    expected = np.array(expected)
+
+    assert list(num_throat_points) == counts
+    assert counts[2] == counts[3] == 0
+    assert np.array_equal(throat, np.repeat(np.arange(5), counts))
+    assert np.allclose(base_points, expected[:, :2])
+    assert np.allclose(centers, expected[:, 2:4])
+    assert np.allclose(radii, expected[:, 4])
+
+
+def test_blob_paths():
+    """
+    Test the blob pores on the 3x3 grid. network2svg and network2svg_stream
+    should draw the same blob outlines for the same seed, each starting on
+    the pore radius and passing through nine points.
+    """
+    network = generate_network()
+    network['pore.diameter'] = [40 for _ in range(9)]
+    network['throat.diameter'] = [10 for _ in range(12)]
+    design = network2svg(network, 3, 3, 300, 300, no_throats=True, rng=0)
+    paths = [element.args['d'] for element in design.elements
+             if isinstance(element, dr.Path)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        svg_fl_name = os.path.join(tmp_dir, 'grain_network.svg')
+        network2svg_stream(network, svg_fl_name, 3, 3, 300, 300,
+                           no_throats=True, rng=0)
+        root = ET.parse(svg_fl_name).getroot()
+    stream_paths = [
+        element.get('d')
+        for element in root.iter('{http://www.w3.org/2000/svg}path')
+    ]
+
+    assert len(paths) == 9
+    assert stream_paths == [path + ' Z' for path in paths]
+    assert paths[0].startswith('M20.000,0.000 Q')
+    assert paths[0].count('T') == 7
+
+
+def test_network2polygons():
+    """
+    Test network2polygons on the 3x3 grid with straight throats. All pores
+    and throats should merge into one polygon with four holes (the grid
+    cells), which polygons2dxf writes as five polylines and one hatch.
+    """
+    network = generate_network()
+    network['pore.diameter'] = [40 for _ in range(9)]
+    network['throat.diameter'] = [10 for _ in range(12)]
+    polygons = network2polygons(network, 3, 3, 300, 300, pore_shape='circle',
+                                throat_random=0)
+    assert len(polygons) == 1
+    assert len(polygons[0]) == 5
+    # The outer ring reaches the left edge and the pores at x = 200
+    assert polygons[0][0][:, 0].min() < 1 and polygons[0][0][:, 0].max() > 200
+
+    document = polygons2dxf(polygons, 300)
+    entities = [entity.dxftype() for entity in document.modelspace()]
+    assert entities.count('LWPOLYLINE') == 5
+    assert entities.count('HATCH') == 1
+
+
+def test_network2dxf_bulk():
+    """
+    Test network2dxf_bulk on the 3x3 grid with straight throats. It should
+    write one entity per pore and per throat circle, on the same circles as
+    network2dxf.
+    """
+    network = generate_network()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dxf_fl_name = os.path.join(tmp_dir, 'test_dxf_bulk.dxf')
+        network2dxf_bulk(network, dxf_fl_name, throat_random=0, fill=False)
+        modelspace = ezdxf.readfile(dxf_fl_name).modelspace()
+        circles = [(tuple(e.dxf.center)[:2], e.dxf.radius)
+                   for e in modelspace]
+        layers = [e.dxf.layer for e in modelspace]
+
+    # 9 pores and 12 throats of 4 circles each (2 + 2 extra)
+    assert layers.count('PORES') == 9
+    assert layers.count('THROATS') == 48
+
+    reference = [(tuple(e.dxf.center)[:2], e.dxf.radius)
+                 for e in network2dxf(network, throat_random=0).modelspace()
+                 if e.dxftype() == 'CIRCLE']
+    assert np.allclose(np.array([c + (r,) for c, r in circles]),
+                       np.array([c + (r,) for c, r in reference]))
+
+
+def test_network2tiles():
+    """
+    Test network2tiles on the 3x3 grid. The merged file should be the same
+    for one and two workers, and every pore and throat should be written
+    exactly once.
+    """
+    network = generate_network()
+    network['pore.diameter'] = [40 for _ in range(9)]
+    network['throat.diameter'] = [10 for _ in range(12)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        texts = []
+        for workers in [1, 2]:
+            svg_fl_name = os.path.join(tmp_dir, 'tiles_%d.svg' % workers)
+            network2tiles(network, svg_fl_name, 3, 3, 300, 300,
+                          pore_shape='circle', tiles=(2, 2), workers=workers)
+            with open(svg_fl_name) as fid:
+                texts.append(fid.read())
+        names = network2tiles(network, os.path.join(tmp_dir, 'tile.dxf'), 3,
+                              3, 300, 300, file_format='dxf', tiles=(2, 2),
+                              workers=1, separate=True)
+        layers = [
+            e.dxf.layer for name in names
+            for e in ezdxf.readfile(name).modelspace()
+        ]
+
+    assert texts[0] == texts[1]
+    root = ET.fromstring(texts[0])
+    namespace = '{http://www.w3.org/2000/svg}'
+    assert len(root.findall(namespace + 'circle')) == 9
+    assert len(root.findall(namespace + 'g')) == 12
+    assert len(names) == 4
+    assert layers.count('PORES') == 9
+
+
 def main():
     """
     Main function to orchestrate network generation and testing of SVG and DXF export functions.
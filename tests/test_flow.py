@@ -1,11 +1,20 @@
 import sys
 import os
 import time
+import tempfile
 import numpy as np
+import jax
+import optax
 from skimage.draw import ellipse
 
 import flow.pinn_utilities
 import flow.plotting_results
+from flow.fd_solver import solve_flow_2d, assemble_fd_system, spanning_pore_space
+from flow.solvers import solve_linear_system
+from flow.network_flow import solve_network_flow, throat_conductance
+from flow.postprocess import darcy_velocity, flow_metrics
+from flow.multilevel import coarsen_coeff, prolong_pressure, solve_flow_multilevel
+from flow.batch import fd_system_template, fill_fd_system, solve_flow_batch
 
 
 def test_plot_xct(image):
@@ -36,6 +45,351 @@ def test_generate_boundary(image):
     return
 
 
+def test_pde_residual():
+    """
+    Checks the PDE residual on an analytic pressure field, with the
+    coefficients given on the full grid and at the collocation points.
+    """
+    xx, yy = np.meshgrid(np.linspace(0, 1, 6), np.linspace(0, 1, 5))
+    colloc = flow.pinn_utilities.generate_BCs_and_colloc_xct(
+        xx, yy, 1.0, 0.0, 0.0, 0.0)[-1]
+    norm_coeff = np.arange(30.0).reshape(5, 6)
+    coeff = flow.pinn_utilities.interior_coeff(norm_coeff)
+    assert coeff.shape == (12, 1)
+
+    P = lambda x, y: x**3 + 3 * y**2 + x * y
+    x_c, y_c = colloc[:, [0]], colloc[:, [1]]
+    expected = coeff * (6 * x_c + 6)
+    for c in [norm_coeff, coeff]:
+        residual = flow.pinn_utilities.pde_flow_2d_hetero_resiual(
+            x_c, y_c, P, c)
+        assert np.allclose(residual, expected, rtol=1e-5)
+
+
+def test_sample_collocation():
+    """
+    Checks the interface points of a pore channel, that sampled points come
+    with their own coefficients, and mini-batch training with residual-based
+    sampling.
+    """
+    xx, yy = np.meshgrid(np.linspace(0, 1, 8), np.linspace(0, 1, 7))
+    *_, conds, colloc = flow.pinn_utilities.generate_BCs_and_colloc_xct(
+        xx, yy, 1.0, 0.0, 0.0, 0.0)
+    norm_coeff = np.full((7, 8), 1e-12)
+    norm_coeff[2:4, :] = 1.0
+    coeff = flow.pinn_utilities.interior_coeff(norm_coeff)
+
+    # Rows 1 (solid below the channel) to 4 (solid above it) are interfaces
+    interface = flow.pinn_utilities.interface_points(norm_coeff)
+    assert np.array_equal(
+        interface.reshape(5, 6),
+        np.ones((5, 6), dtype=bool) & (np.arange(5) < 4)[:, None])
+
+    # Every point is drawn with the coefficient of its grid node
+    key = jax.random.PRNGKey(1)
+    points, values = flow.pinn_utilities.sample_collocation(
+        key, colloc, coeff, 50)
+    assert points.shape == (50, 2) and values.shape == (50, 1)
+    rows = np.rint(np.asarray(points[:, 1]) * 6).astype(int)
+    cols = np.rint(np.asarray(points[:, 0]) * 7).astype(int)
+    assert np.allclose(values[:, 0], norm_coeff[rows, cols])
+
+    # All weight on one point
+    weights = np.zeros(len(colloc))
+    weights[7] = 1.0
+    points, values = flow.pinn_utilities.sample_collocation(
+        key, colloc, coeff, 20, weights)
+    assert np.allclose(points, colloc[7]) and np.allclose(values, coeff[7])
+
+    # Chunked residual weights, with the uniform part and the interface weight
+    params = flow.pinn_utilities.init_params([2, 8, 1])
+    weights = flow.pinn_utilities.residual_weights(params,
+                                                   colloc,
+                                                   coeff,
+                                                   interface,
+                                                   c=0.5)
+    assert np.allclose(
+        flow.pinn_utilities.residual_weights(params,
+                                             colloc,
+                                             coeff,
+                                             interface,
+                                             c=0.5,
+                                             chunk_size=7), weights)
+    assert np.all(weights[~interface] >= 0.5) and np.all(
+        weights[interface] >= 1.5)
+
+    # Mini-batch training on the full-grid coefficients. The losses are taken
+    # on a fixed evaluation batch, which only depends on the seed
+    runs = {}
+    with tempfile.TemporaryDirectory() as results_dir:
+        for sampling, seed in [('residual', 0), ('uniform', 0), ('uniform', 0),
+                               ('uniform', 1)]:
+            runs.setdefault((sampling, seed), []).append(
+                flow.pinn_utilities.train_PINN(params,
+                                               25,
+                                               optax.adam(1e-3),
+                                               flow.pinn_utilities.loss_fun,
+                                               colloc,
+                                               conds,
+                                               norm_coeff,
+                                               1,
+                                               8,
+                                               1e-3,
+                                               results_dir + '/',
+                                               chunk_size=10,
+                                               batch_size=8,
+                                               sampling=sampling,
+                                               seed=seed))
+    _, best_loss, losses, epochs = runs[('residual', 0)][0]
+    assert len(losses) == 26 and epochs == list(range(26))
+    assert np.isfinite(best_loss) and best_loss == min(losses)
+    assert runs[('uniform', 0)][0][2][0] == losses[0]
+    assert runs[('uniform', 0)][0][2] == runs[('uniform', 0)][1][2]
+    assert runs[('uniform', 1)][0][2][0] != losses[0]
+
+
+def test_solve_flow_2d():
+    """
+    Solves flow on a uniform field, where the pressure is linear in x, and on
+    a layered field, where every column carries the same total flux.
+    """
+    ny, nx = 20, 30
+    dx, dy = 1 / (nx - 1), 1 / (ny - 1)
+    pressure, q_x, q_y = solve_flow_2d(np.ones((ny, nx)), dx, dy, 2.0, 1.0)
+    assert pressure.shape == (ny, nx)
+    assert np.allclose(pressure, 2.0 - np.linspace(0, 1, nx)[None, :])
+    assert np.allclose(q_x, 1.0) and np.allclose(q_y, 0.0)
+
+    # Layers of high and low coefficients along x
+    coeff = np.where(np.arange(ny)[:, None] % 4 < 2, 1e3, 1e-3) * np.ones(
+        (ny, nx))
+    pressure, q_x, q_y = solve_flow_2d(coeff, dx, dy, 2.0, 1.0)
+    weights = np.full(ny, dy)
+    weights[[0, -1]] *= 0.5
+    column_flux = (q_x * weights[:, None]).sum(axis=0)
+    assert np.allclose(column_flux, column_flux[0])
+
+
+def test_eliminate_solids():
+    """
+    Solves flow through a channel next to an isolated pore with the solid
+    nodes and the non-spanning pore eliminated from the pressure system.
+    """
+    ny, nx = 20, 30
+    dx, dy = 1 / (nx - 1), 1 / (ny - 1)
+    coeff = np.full((ny, nx), 1e-25)
+    coeff[5:10, :] = 1.0
+    coeff[14:17, 10:20] = 1.0
+    channel = (coeff == 1.0) & (np.arange(ny)[:, None] < 10)
+    assert np.array_equal(spanning_pore_space(coeff), channel)
+
+    pressure, q_x, q_y, info = solve_flow_2d(coeff,
+                                             dx,
+                                             dy,
+                                             2.0,
+                                             1.0,
+                                             solver='cg',
+                                             preconditioner='amg',
+                                             eliminate_solids=True,
+                                             return_info=True)
+    assert info['converged'] and not info['fallback']
+    assert np.isnan(pressure[14:17, 10:20]).all()
+    assert np.allclose(pressure[5:10], 2.0 - np.linspace(0, 1, nx)[None, :])
+    assert np.allclose(q_x[5:10], 1.0) and np.allclose(q_y[5:10], 0.0)
+    assert np.all(q_x[14:17] == 0) and np.all(q_y[13:17] == 0)
+
+    # A uniform field is all pore space
+    assert spanning_pore_space(np.ones((ny, nx))).all()
+    pressure, q_x, _ = solve_flow_2d(np.ones((ny, nx)),
+                                     dx,
+                                     dy,
+                                     2.0,
+                                     1.0,
+                                     eliminate_solids=True)
+    assert np.allclose(pressure, 2.0 - np.linspace(0, 1, nx)[None, :])
+    assert np.allclose(q_x, 1.0)
+
+
+def test_solve_flow_multilevel():
+    """
+    Checks the harmonic coarsening and bilinear prolongation between levels,
+    and that the coarse-to-fine solve matches a direct solve with fewer
+    fine-grid iterations than a solve without initial guess.
+    """
+    coeff = np.ones((9, 9))
+    coeff[::2, ::2] = 3.0
+    coarse = coarsen_coeff(coeff)
+    assert coarse.shape == (5, 5)
+    assert np.isclose(coarse[2, 2], 4 / (1 / 3 + 3)) and coarse[0, 0] == 3.0
+    X, Y = np.meshgrid(np.linspace(0, 1, 9), np.linspace(0, 1, 5))
+    fine_X, fine_Y = np.meshgrid(np.linspace(0, 1, 17), np.linspace(0, 1, 9))
+    assert np.allclose(prolong_pressure(X + 2 * Y, (9, 17), 0.0, 1.0),
+                       fine_X + 2 * fine_Y)
+
+    rng = np.random.default_rng(0)
+    n = 65
+    coeff = np.exp(2 * rng.standard_normal((n, n)))
+    direct, _, _ = solve_flow_2d(coeff, 1 / (n - 1), 1 / (n - 1), 2.0, 1.0)
+    _, _, _, info = solve_flow_2d(coeff,
+                                  1 / (n - 1),
+                                  1 / (n - 1),
+                                  2.0,
+                                  1.0,
+                                  solver='cg',
+                                  preconditioner='jacobi',
+                                  return_info=True)
+    pressure, _, _, reports = solve_flow_multilevel(coeff,
+                                                    1 / (n - 1),
+                                                    1 / (n - 1),
+                                                    2.0,
+                                                    1.0,
+                                                    preconditioner='jacobi',
+                                                    return_info=True)
+    assert len(reports) == 3 and reports[0]['solver'] == 'direct'
+    assert all(report['converged'] for report in reports)
+    assert reports[-1]['iterations'] < info['iterations']
+    assert np.allclose(pressure, direct, atol=1e-6)
+
+    # A single level uses the requested solver on the fine grid
+    pressure, _, _, reports = solve_flow_multilevel(coeff,
+                                                    1 / (n - 1),
+                                                    1 / (n - 1),
+                                                    2.0,
+                                                    1.0,
+                                                    levels=1,
+                                                    preconditioner='jacobi',
+                                                    return_info=True)
+    assert len(reports) == 1 and reports[0]['solver'] == 'cg'
+    assert reports[0]['iterations'] == info['iterations']
+    assert np.allclose(pressure, direct, atol=1e-6)
+
+
+def test_solve_flow_batch():
+    """
+    Checks that a filled template gives the system of assemble_fd_system, and
+    that the batched solves (serial and in a process pool) give the metrics of
+    individual solves.
+    """
+    rng = np.random.default_rng(0)
+    coeffs = [np.exp(2 * rng.standard_normal((15, 20))) for _ in range(3)]
+    coeffs.append(np.ones((10, 10)))
+    dx = dy = 0.1
+
+    A, b, _, _ = assemble_fd_system(coeffs[0], dx, dy, 2.0, 1.0, 0.5, -0.5)
+    template = fd_system_template((15, 20), dx, dy, 2.0, 1.0, 0.5, -0.5)
+    filled_A, filled_b = fill_fd_system(template, coeffs[0])
+    assert np.allclose(filled_A.toarray(), A.toarray())
+    assert np.allclose(filled_b, b)
+
+    for workers in [1, 2]:
+        table = solve_flow_batch(coeffs, dx, dy, 2.0, 1.0, workers=workers)
+        assert np.array_equal(table['sample'], np.arange(4))
+        assert table['converged'].all() and len(table['solve_time']) == 4
+        for coeff, permeability in zip(coeffs, table['permeability']):
+            pressure, _, _ = solve_flow_2d(coeff, dx, dy, 2.0, 1.0)
+            assert np.isclose(permeability,
+                              flow_metrics(pressure, coeff, dx,
+                                           dy)['permeability'])
+    assert np.isclose(table['permeability'][-1], 1.0)
+    assert np.isclose(table['outlet_flux'][-1], 1.0)
+
+
+def test_flow_metrics():
+    """
+    Computes the flow metrics of a layered field, whose permeability is the
+    width-weighted mean of the layers and whose streamlines are straight, and
+    of a PINN-like linear pressure field on a uniform field.
+    """
+    ny, nx = 21, 31
+    dx, dy = 1 / (nx - 1), 1 / (ny - 1)
+    coeff = np.where(np.arange(ny)[:, None] < 10, 3.0, 1.0) * np.ones(
+        (ny, nx))
+    pressure, _, _ = solve_flow_2d(coeff, dx, dy, 2.0, 1.0)
+    metrics = flow_metrics(pressure, coeff, dx, dy, rho=2.0, mu=4.0)
+    weights = np.full(ny, dy)
+    weights[[0, -1]] *= 0.5
+    assert np.isclose(metrics['permeability'], 2 * weights @ coeff[:, 0])
+    assert np.isclose(metrics['outlet_flux'], weights @ coeff[:, 0])
+    assert np.isclose(metrics['tortuosity'], 1.0)
+    assert np.isclose(metrics['max_velocity'], 3.0)
+
+    # Linear pressure with a small error, like a PINN prediction
+    X, Y = np.meshgrid(np.linspace(0, 1, nx), np.linspace(0, 1, ny))
+    pressure = 2.0 - X + 1e-3 * np.sin(np.pi * X) * np.sin(np.pi * Y)
+    u, v = darcy_velocity(pressure, np.ones((ny, nx)), dx, dy)
+    assert np.allclose(u, 1.0, atol=1e-2) and np.allclose(v, 0.0, atol=1e-2)
+    metrics = flow_metrics(pressure, np.ones((ny, nx)), dx, dy)
+    assert np.isclose(metrics['permeability'], 1.0, atol=1e-3)
+    assert 1.0 < metrics['tortuosity'] < 1.01
+
+
+def test_solve_network_flow():
+    """
+    Solves network flow through two parallel chains of pores, where the
+    conduit conductances add in series, and a dead-end pore with no flow.
+    """
+    x = np.tile(np.arange(5) * 10.0, 2)
+    y = np.repeat([0.0, 10.0], 5)
+    chain = np.column_stack((np.arange(4), np.arange(1, 5)))
+    network = {
+        'pore.coords': np.column_stack((np.append(x, 20.0), np.append(y, 5.0),
+                                        np.zeros(11))),
+        'throat.conns': np.vstack((chain, chain + 5, [[2, 10]])),
+        'throat.diameter': np.append(np.full(8, 2.0), 1.0),
+        'pore.diameter': np.full(11, 4.0)
+    }
+    conductance = throat_conductance(network)
+    assert np.allclose(
+        conductance[0], 1 / (2 / (np.pi * 4**4 / (128 * 2)) + 1 /
+                             (np.pi * 2**4 / (128 * 6))))
+
+    pressure, rate, permeability = solve_network_flow(network,
+                                                      P_in=2.0,
+                                                      P_out=1.0)
+    assert np.allclose(pressure[:5], [2.0, 1.75, 1.5, 1.25, 1.0])
+    assert np.isclose(pressure[10], 1.5) and rate[-1] == 0
+    flow = 2 * conductance[0] / 4
+    assert np.allclose(rate[:8], flow / 2)
+    assert np.isclose(permeability, flow * 40 / 10)
+
+
+def test_solve_linear_system():
+    """
+    Solves a heterogeneous pressure system with every solver backend and
+    checks that they agree with the direct solve, and that a Krylov solver
+    that runs out of iterations falls back to the direct solve.
+    """
+    rng = np.random.default_rng(0)
+    coeff = np.where(rng.random((30, 30)) < 0.3, 1e-6, 1.0)
+    A, b, _, _ = assemble_fd_system(coeff, 1 / 29, 1 / 29, 2.0, 1.0)
+    direct, info = solve_linear_system(A, b)
+    assert info['solver'] == 'direct' and info['residual'] < 1e-10
+
+    for solver, preconditioner in [('cg', None), ('cg', 'jacobi'),
+                                   ('cg', 'ilu'), ('cg', 'amg'),
+                                   ('bicgstab', 'amg')]:
+        x, info = solve_linear_system(A,
+                                      b,
+                                      solver,
+                                      preconditioner,
+                                      tol=1e-12,
+                                      maxiter=5000,
+                                      record_residuals=True)
+        assert info['converged'] and not info['fallback']
+        assert info['iterations'] == len(info['residuals']) > 0
+        # Preconditioned CG stops on the preconditioned residual
+        assert info['residuals'][-1] < 1e-10
+        assert np.allclose(x, direct, atol=1e-6)
+
+    # Without the history, only the iterations are counted
+    _, info = solve_linear_system(A, b, 'cg', 'amg', tol=1e-12)
+    assert info['iterations'] > 0 and info['residuals'] == []
+
+    x, info = solve_linear_system(A, b, 'cg', maxiter=1)
+    assert not info['converged'] and info['fallback']
+    assert info['solver'] == 'direct' and np.allclose(x, direct)
+
+
 def main():
     """
     Main function to generate a test image and apply plotting and boundary generation functions.
@@ -2,6 +2,7 @@ import sys
 import os
 import time
 import numpy as np
+import pytest
 from pathlib import Path
 
 # Uncomment and modify these lines if the pore2chip package is not in the PYTHONPATH
@@ -9,7 +10,11 @@ from pathlib import Path
 #sys.path.append(os.path.abspath(mod_path))
 
 # Importing functions from the pore2chip package
-from pore2chip.generate import generate_network
+import openpnm as op
+from pore2chip.generate import (generate_network, generate_network_3d,
+                                generate_ensemble, coordination_error,
+                                _build_spatial_index, _find_nearby_pores,
+                                _match_coordination)
 from pore2chip.metrics import get_probability_density
 
 
@@ -96,6 +101,185 @@ def test_generate_network2(properties, pdfs, avg_coord=None, n=5, cc=None):
     print(network)
 
 
+def test_find_nearby_pores():
+    """
+    Checks that the shared spatial index returns the same nearby pores as
+    OpenPNM's find_nearby_pores on a lattice like the one used in generation
+    """
+    network = op.network.BodyCenteredCubic([6, 6, 2])
+    index = _build_spatial_index(network['pore.coords'])
+    pores = np.arange(network.Np)
+    nearby = _find_nearby_pores(index, pores, 1.4)
+    for pore in pores:
+        expected = network.find_nearby_pores(pores=[pore], r=1.4, flatten=True)
+        assert np.array_equal(nearby[pore], expected)
+
+
+def test_match_coordination():
+    """
+    Checks that the exact solver hits a feasible target degree sequence on a
+    small lattice of candidate connections
+    """
+    np.random.seed(0)
+    # 3x3 grid with horizontal, vertical and one diagonal per cell
+    candidates = np.array([(0, 1), (1, 2), (3, 4), (4, 5), (6, 7), (7, 8),
+                           (0, 3), (1, 4), (2, 5), (3, 6), (4, 7), (5, 8),
+                           (0, 4), (1, 5), (3, 7), (4, 8)])
+    target = np.array([2, 3, 2, 3, 4, 3, 2, 3, 2])
+    conns, parent, size = _match_coordination(9, candidates, target)
+    achieved = np.bincount(conns.ravel(), minlength=9)
+    assert np.array_equal(achieved, target)
+    assert len(np.unique(conns, axis=0)) == len(conns)
+    # Every pore has at least one throat, so the union-find holds one cluster
+    assert max(size) == 9
+
+
+def test_generate_network_exact():
+    """
+    Generates a network with the exact coordination solver and checks that
+    it matches the sampled coordination numbers more closely than the greedy
+    solver
+    """
+    pore_diameters = np.linspace(2.0, 8.0, 10)
+    throat_diameters = np.linspace(1.0, 3.0, 10)
+    coordination_nums = np.array([2, 3, 3, 4, 4, 4, 5, 6])
+    exact = generate_network(15, 15, pore_diameters, throat_diameters,
+                             coordination_nums, solver='exact', sd=1)
+    greedy = generate_network(15, 15, pore_diameters, throat_diameters,
+                              coordination_nums, sd=1)
+    assert coordination_error(exact)[0] < coordination_error(greedy)[0]
+    assert len(exact['throat.diameter']) == len(exact['throat.conns'])
+
+
+def test_generate_network_rng():
+    """
+    Generates networks from a seeded generator and checks that they are
+    reproducible and leave the global random state untouched
+    """
+    pore_diameters = np.linspace(2.0, 8.0, 10)
+    throat_diameters = np.linspace(1.0, 3.0, 10)
+    coordination_nums = np.array([2, 3, 3, 4, 4, 4, 5, 6])
+    np.random.seed(0)
+    expected = np.random.uniform()
+    np.random.seed(0)
+    networks = [
+        generate_network(8, 8, pore_diameters, throat_diameters,
+                         coordination_nums, average_coord=3,
+                         rng=np.random.default_rng(5)) for _ in range(2)
+    ]
+    assert np.random.uniform() == expected
+    assert np.array_equal(networks[0]['pore.coords'],
+                          networks[1]['pore.coords'])
+    assert np.array_equal(networks[0]['throat.conns'],
+                          networks[1]['throat.conns'])
+
+    # The OpenPNM pore seeds do not depend on the global state either
+    np.random.seed(1)
+    network = generate_network(8, 8, pore_diameters, throat_diameters,
+                               coordination_nums, average_coord=3,
+                               rng=np.random.default_rng(5))
+    assert np.array_equal(network['pore.seed'], networks[0]['pore.seed'])
+
+
+def test_generate_network_spanning():
+    """
+    Generates a sparse network and checks that the pores labelled as the
+    spanning cluster are connected and reach both ends of the chosen axis
+    """
+    pore_diameters = np.linspace(2.0, 8.0, 10)
+    throat_diameters = np.linspace(1.0, 3.0, 10)
+    coordination_nums = np.array([1, 1, 1, 2, 2, 3])
+    network = generate_network(12, 12, pore_diameters, throat_diameters,
+                               coordination_nums, solver='exact',
+                               spanning_axis='x', sd=2)
+    spanning = network['pore.spanning']
+    x = network['pore.coords'][:, 0]
+    assert x[spanning].min() < x.min() + 0.5
+    assert x[spanning].max() > x.max() - 0.5
+    assert len(np.unique(network['pore.cluster'][spanning])) == 1
+
+
+def test_generate_network_3d():
+    """
+    Generates a small 3D network and checks that pores fill the full lattice
+    depth and that a cluster spans the network along z
+    """
+    pore_diameters = np.linspace(2.0, 8.0, 10)
+    throat_diameters = np.linspace(1.0, 3.0, 10)
+    coordination_nums = np.arange(2, 9)
+    network = generate_network_3d(6, 6, 4, pore_diameters, throat_diameters,
+                                  coordination_nums, spanning_axis='z', sd=1)
+    assert network.Np == 6 * 6 * 4 + 5 * 5 * 3
+    assert np.ptp(network['pore.coords'][:, 2]) > 3
+    assert len(network['throat.diameter']) == network.Nt
+    assert network['pore.spanning'].any()
+    assert coordination_error(network)[0] < 0.5
+
+
+def test_generate_network_3d_small():
+    """
+    Generates 2x2x2 and 3x3x3 networks, where the scaled lattice spacing is
+    well above one, and checks that every pore can still reach its axial and
+    body-centre neighbours
+    """
+    pore_diameters = np.linspace(2.0, 8.0, 10)
+    throat_diameters = np.linspace(1.0, 3.0, 10)
+    coordination_nums = np.array([20])
+    for n, max_throats in [(2, 12 + 8), (3, 54 + 12 + 64)]:
+        network = generate_network_3d(n, n, n, pore_diameters,
+                                      throat_diameters, coordination_nums,
+                                      sd=1)
+        # Every candidate throat is used when all pores want 20 neighbours
+        assert network.Nt == max_throats
+        assert np.isclose(np.ptp(network['pore.coords'][:, 0]), n, atol=0.5)
+
+
+def test_generate_ensemble():
+    """
+    Checks that the ensemble generator only yields candidates whose fidelity
+    score is below the requested threshold
+    """
+    pore_diameters = np.linspace(2.0, 8.0, 10)
+    throat_diameters = np.linspace(1.0, 3.0, 10)
+    coordination_nums = np.array([2, 3, 3, 4, 4, 4, 5, 6])
+    accepted = list(
+        generate_ensemble(4, 8, 8, pore_diameters, throat_diameters,
+                          coordination_nums, max_score=0.15, solver='exact'))
+    assert len(accepted) > 0
+    for sd, network, fidelity in accepted:
+        assert fidelity['score'] <= 0.15
+        assert 0 <= sd < 4
+
+
+def test_generate_ensemble_seeds():
+    """
+    Checks that the accepted candidates differ, that each one is reproduced
+    by generate_network with its yielded seed, and that an rng (which would
+    override the seeds) is rejected
+    """
+    pore_diameters = np.linspace(2.0, 8.0, 10)
+    throat_diameters = np.linspace(1.0, 3.0, 10)
+    coordination_nums = np.array([2, 3, 3, 4, 4, 4, 5, 6])
+    accepted = list(
+        generate_ensemble(3, 8, 8, pore_diameters, throat_diameters,
+                          coordination_nums, max_score=1.0, first_seed=5,
+                          average_coord=3))
+    assert [sd for sd, _, _ in accepted] == [5, 6, 7]
+    assert not np.array_equal(accepted[0][1]['pore.coords'],
+                              accepted[1][1]['pore.coords'])
+    for sd, network, _ in accepted:
+        regenerated = generate_network(8, 8, pore_diameters, throat_diameters,
+                                       coordination_nums, sd=sd,
+                                       average_coord=3)
+        for key in ['pore.coords', 'pore.diameter', 'throat.conns',
+                    'throat.diameter']:
+            assert np.array_equal(network[key], regenerated[key])
+
+    with pytest.raises(ValueError):
+        next(generate_ensemble(1, 8, 8, pore_diameters, throat_diameters,
+                               coordination_nums, rng=1))
+
+
 def main():
     """
     Main function to generate properties for a network, create and test network generation with different parameters.
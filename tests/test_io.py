@@ -0,0 +1,76 @@
+import sys
+import os
+import tempfile
+import numpy as np
+import openpnm as op
+from pathlib import Path
+
+# Uncomment and modify these lines if the pore2chip package is not in the PYTHONPATH
+#mod_path = Path("__file__").resolve().parents[2]
+#sys.path.append(os.path.abspath(mod_path))
+
+# Importing functions from the pore2chip package
+from pore2chip.io import save_network, load_network
+
+
+def create_network():
+    """
+    Create a 4x3 cubic network with random pore and throat diameters
+    """
+    network = op.network.Cubic(shape=[4, 3, 1])
+    network['pore.diameter'] = np.random.rand(network.Np)
+    network['throat.diameter'] = np.random.rand(network.Nt)
+    return network
+
+
+def test_save_load_network():
+    """
+    Saves a network with middle pores and loads it back, read into memory and
+    memory-mapped. Coordinates and diameters should be float32, connections
+    int32, and labels and middle pores should be kept.
+    """
+    network = create_network()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fl_name = os.path.join(tmp_dir, 'network.npz')
+        save_network(network, fl_name, middle_pores=[1, 5])
+        for mmap_mode in [None, 'r']:
+            loaded, middle_pores = load_network(fl_name,
+                                                mmap_mode=mmap_mode,
+                                                return_middle_pores=True)
+            assert loaded.Np == network.Np and loaded.Nt == network.Nt
+            assert loaded['pore.coords'].dtype == np.float32
+            assert loaded['throat.conns'].dtype == np.int32
+            assert np.array_equal(loaded['throat.conns'],
+                                  network['throat.conns'])
+            assert np.allclose(loaded['pore.diameter'],
+                               network['pore.diameter'])
+            assert np.array_equal(loaded['pore.left'], network['pore.left'])
+            assert middle_pores == [1, 5]
+            if mmap_mode is not None:
+                assert isinstance(loaded['pore.coords'], np.memmap)
+            del loaded
+
+
+def test_save_network_exact():
+    """
+    Saves a network without compacting and with compression. The loaded
+    arrays should be exact, and memory-mapping falls back to reading.
+    """
+    network = create_network()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fl_name = os.path.join(tmp_dir, 'network.npz')
+        save_network(network, fl_name, compact=False, compressed=True)
+        loaded = load_network(fl_name, mmap_mode='r')
+        assert not isinstance(loaded['pore.coords'], np.memmap)
+        for key in network.keys():
+            assert np.array_equal(loaded[key], network[key])
+        assert load_network(fl_name, mmap_mode='w') is None
+
+
+def main():
+    test_save_load_network()
+    test_save_network_exact()
+
+
+if __name__ == "__main__":
+    main()
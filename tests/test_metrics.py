@@ -14,6 +14,8 @@ import matplotlib.pyplot as plt
 
 import pore2chip
 from pore2chip.metrics import extract_diameters, feret_diameter, extract_diameters_alt, extract_diameters2
+from pore2chip.metrics import network_fidelity, _ks_distance
+from scipy.stats import ks_2samp
 
 
 def test_feret_diameter(test_image):
@@ -73,6 +75,30 @@ def test_extract_diameters2(image):
     return diameters
 
 
+def test_network_fidelity():
+    """
+    Checks the network-level fidelity score on a hand-made network: the KS
+    distance matches SciPy, and a network that reproduces its own statistics
+    scores zero
+    """
+    rng = np.random.default_rng(1)
+    sample = rng.normal(5, 1, 200)
+    reference = rng.normal(5.5, 1, 300)
+    assert np.isclose(_ks_distance(sample, reference),
+                      ks_2samp(sample, reference).statistic)
+
+    network = {
+        "pore.coords": np.array([(0, 0, 0), (1, 0, 0), (2, 0, 0)]),
+        "pore.diameter": np.array([2.0, 4.0, 6.0]),
+        "throat.conns": np.array([(0, 1), (1, 2)]),
+        "throat.diameter": np.array([1.0, 1.0])
+    }
+    fidelity = network_fidelity(network, [2.0, 4.0, 6.0], [1, 2, 1])
+    assert fidelity['score'] == 0
+    fidelity = network_fidelity(network, [2.0, 4.0, 6.0], [3, 3, 3])
+    assert fidelity['coordination'] == 1
+
+
 def main():
     """
     Main function to generate test images, extract pore/throat sizes, 